@@ -0,0 +1,486 @@
+"""
+Load test for every API route, run in-process against local AWS stand-ins.
+
+Seeds a dataset (posts, comments, votes and attachments) through the API,
+then drives each route in ``routes/*/routes.py`` with concurrent requests
+through the ASGI app and reports throughput, latency percentiles and
+DynamoDB/S3 calls per request as JSON. By default it runs on the
+in-memory storage backend (``STORAGE_BACKEND=memory``); point it at
+DynamoDB Local / LocalStack with ``--endpoint-url`` (the table and bucket
+are created if missing), or at in-process moto mocks with ``--moto``::
+
+    cd api
+    python -m benchmarks.api_bench --posts 200 --comments 5 --votes 5 \\
+        --output bench.json
+    python -m benchmarks.api_bench --baseline bench.json
+    python -m benchmarks.api_bench --endpoint-url http://localhost:4566
+
+With ``--baseline`` the run is compared with an earlier result and exits
+non-zero when a route's p95 latency or DynamoDB calls per request regress.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+import boto3
+import httpx
+
+ROUTE_TABLES = (
+    ("posts", "POST_ROUTES"),
+    ("comments", "COMMENT_ROUTES"),
+    ("votes", "VOTE_ROUTES"),
+    ("attachments", "ATTACHMENT_ROUTES"),
+    ("utility", "UTILITY_ROUTES"),
+    ("auth", "AUTH_ROUTES"),
+    ("stream", "STREAM_ROUTES"),
+)
+
+# Auth routes call Supabase and cannot run offline; streams never finish
+SKIPPED_ROUTES = {
+    "auth": "calls Supabase",
+    "stream": "long-lived event stream",
+}
+
+# Absolute floor under which a p95 change is treated as noise
+P95_NOISE_SECONDS = 0.005
+
+PDF_BYTES = (b"%PDF-1.4\n1 0 obj <<>> endobj\ntrailer <<>>\n%%EOF\n"
+             + b"0" * 4096)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def configure_environment(args) -> None:
+    """Settings that must be in place before the app is imported."""
+    os.environ.setdefault("DYNAMO_DB_TABLE", args.table)
+    os.environ.setdefault("S3_BUCKET", args.bucket)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    # Local stand-ins accept any credentials
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    if args.endpoint_url:
+        os.environ["AWS_ENDPOINT_URL"] = args.endpoint_url
+    os.environ["STORAGE_BACKEND"] = backend(args)
+
+
+def backend(args) -> str:
+    return "aws" if args.endpoint_url or args.moto else "memory"
+
+
+def ensure_resources(table_name: str, bucket: str) -> None:
+    """Create the forum table and attachment bucket if missing."""
+    dynamodb = boto3.client("dynamodb")
+    if table_name not in dynamodb.list_tables()["TableNames"]:
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"},
+                       {"AttributeName": "SK", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb.get_waiter("table_exists").wait(TableName=table_name)
+
+    s3 = boto3.client("s3")
+    buckets = {entry["Name"] for entry in s3.list_buckets()["Buckets"]}
+    if bucket not in buckets:
+        s3.create_bucket(Bucket=bucket)
+
+
+def dynamodb_calls(counts: Dict[Tuple[str, ...], float]) -> Dict[str, float]:
+    """Calls per AWS service in a snapshot of ``metrics.aws_calls``."""
+    totals: Dict[str, float] = {}
+    for (_, service, _), count in counts.items():
+        totals[service] = totals.get(service, 0.0) + count
+    return totals
+
+
+class Dataset:
+    """Ids of the seeded objects, handed out round-robin to scenarios."""
+
+    def __init__(self) -> None:
+        self.posts: List[str] = []
+        self.comments: List[Tuple[str, str]] = []
+        self.files: List[Tuple[str, str]] = []
+        self.voters: List[Tuple[str, str]] = []
+        # One-shot objects consumed by DELETE routes
+        self.disposable_posts: List[str] = []
+        self.disposable_comments: List[Tuple[str, str]] = []
+        self.disposable_files: List[Tuple[str, str]] = []
+        self._cursors: Dict[str, Any] = {}
+
+    def next(self, name: str):
+        cursor = self._cursors.get(name)
+        if cursor is None:
+            cursor = self._cursors[name] = itertools.cycle(getattr(self, name))
+        return next(cursor)
+
+    def take(self, name: str):
+        return getattr(self, name).pop()
+
+
+def _post_body(author: str, index: int) -> Dict[str, Any]:
+    return {
+        "title": f"Benchmark post {index} about solar inverters",
+        "content": ("Notes on panel efficiency, battery storage and grid "
+                    f"tie inverters, revision {index}. ") * 4,
+        "tags": [f"tag{index % 7}", "benchmark"],
+        "author_id": author,
+        "is_anonymous": False,
+    }
+
+
+def _comment_body(author: str) -> Dict[str, Any]:
+    return {"content": "Thanks, the wiring diagram helped a lot.",
+            "author_id": author, "is_anonymous": False}
+
+
+def _upload(user_id: str) -> Dict[str, Any]:
+    return {"data": {"user_id": user_id},
+            "files": {"file": ("notes.pdf", PDF_BYTES, "application/pdf")}}
+
+
+# Request for one call of a route: (method, path, httpx request kwargs)
+Request = Tuple[str, str, Dict[str, Any]]
+
+SCENARIOS: Dict[str, Callable[[Dataset], Request]] = {
+    # posts
+    "CREATE_POST": lambda d: (
+        "POST", "/posts", {"json": _post_body(f"user-{uuid.uuid4()}", 0)}),
+    "GET_ALL_POSTS": lambda d: (
+        "GET", "/posts", {"params": {"sort": "new", "limit": 20}}),
+    "GET_POST_BY_ID": lambda d: ("GET", f"/posts/{d.next('posts')}", {}),
+    "GET_POST_SUMMARY": lambda d: (
+        "GET", f"/posts/{d.next('posts')}/summary", {}),
+    "UPDATE_POST": lambda d: (
+        "PUT", f"/posts/{d.next('posts')}",
+        {"json": _post_body("bench-author", 1)}),
+    "PATCH_POST": lambda d: (
+        "PATCH", f"/posts/{d.next('posts')}",
+        {"json": {"content": "Patched by the benchmark."}}),
+    "DELETE_POST": lambda d: (
+        "DELETE", f"/posts/{d.take('disposable_posts')}", {}),
+    # comments
+    "CREATE_COMMENT": lambda d: (
+        "POST", f"/posts/{d.next('posts')}/comments",
+        {"json": _comment_body("bench-commenter")}),
+    "GET_ALL_COMMENTS": lambda d: (
+        "GET", f"/posts/{d.next('posts')}/comments", {}),
+    "GET_COMMENT_BY_ID": lambda d: (
+        "GET", "/posts/{}/comments/{}".format(*d.next("comments")), {}),
+    "UPDATE_COMMENT": lambda d: _comment_update(d, "PUT",
+                                                _comment_body("bench")),
+    "PATCH_COMMENT": lambda d: _comment_update(
+        d, "PATCH", {"content": "Edited by the benchmark."}),
+    "DELETE_COMMENT": lambda d: (
+        "DELETE",
+        "/posts/{}/comments/{}".format(*d.take("disposable_comments")), {}),
+    # votes
+    "VOTE_POST": lambda d: _vote(d, "POST"),
+    "REMOVE_POST_VOTE": lambda d: _vote(d, "DELETE"),
+    "GET_USER_VOTES": lambda d: (
+        "GET", "/posts/{}/votes/{}".format(*d.next("voters")), {}),
+    # attachments
+    "UPLOAD_FILE": lambda d: (
+        "POST", f"/posts/{d.next('posts')}/files", _upload("bench-uploader")),
+    "GET_POST_FILES": lambda d: (
+        "GET", f"/posts/{d.next('files')[0]}/files", {}),
+    "DELETE_FILE": lambda d: (
+        "DELETE", "/posts/{}/files/{}".format(*d.take("disposable_files")),
+        {}),
+    "GET_FILE_META": lambda d: (
+        "GET", f"/files/{d.next('files')[1]}/meta", {}),
+    # utility
+    "GET_HEALTH_CHECK": lambda d: ("GET", "/health", {}),
+    "GET_METRICS": lambda d: ("GET", "/metrics", {}),
+    "SEARCH_POSTS": lambda d: (
+        "GET", "/search", {"params": {"q": "solar inverters"}}),
+    "GET_TRENDING": lambda d: ("GET", "/trending", {}),
+    "GET_RECENT_POSTS": lambda d: ("GET", "/recent", {}),
+}
+
+
+def _comment_update(dataset: Dataset, method: str, body: Dict) -> Request:
+    post_id, comment_id = dataset.next("comments")
+    return (method, f"/comments/{comment_id}",
+            {"params": {"post_id": post_id}, "json": body})
+
+
+def _vote(dataset: Dataset, method: str) -> Request:
+    post_id, user_id = dataset.next("voters")
+    return (method, f"/posts/{post_id}/vote",
+            {"json": {"vote_type": "up", "user_id": user_id}})
+
+
+def discover_routes() -> List[Dict[str, Any]]:
+    """Every route declared in ``routes/*/routes.py``."""
+    import importlib
+
+    routes = []
+    for group, table in ROUTE_TABLES:
+        module = importlib.import_module(f"routes.{group}.routes")
+        for name, spec in getattr(module, table).items():
+            routes.append({"group": group, "name": name,
+                           "methods": spec["methods"], "path": spec["path"]})
+    return routes
+
+
+async def _check(response: httpx.Response) -> Dict[str, Any]:
+    if response.status_code >= 400:
+        raise RuntimeError(f"Seeding failed: {response.request.method} "
+                           f"{response.request.url} -> "
+                           f"{response.status_code} {response.text}")
+    return response.json()
+
+
+async def seed(client: httpx.AsyncClient, args) -> Dataset:
+    """Create the benchmark dataset through the API itself."""
+    dataset = Dataset()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def create_post(index: int) -> str:
+        async with semaphore:
+            body = await _check(await client.post(
+                "/posts", json=_post_body(f"author-{index % 25}", index)))
+        return body["post"]["post_id"]
+
+    async def create_comment(post_id: str) -> Tuple[str, str]:
+        async with semaphore:
+            body = await _check(await client.post(
+                f"/posts/{post_id}/comments",
+                json=_comment_body(f"commenter-{uuid.uuid4().hex[:8]}")))
+        return post_id, body["comment"]["id"]
+
+    async def vote(post_id: str, index: int) -> Tuple[str, str]:
+        user_id = f"voter-{index}"
+        async with semaphore:
+            await _check(await client.post(
+                f"/posts/{post_id}/vote",
+                json={"vote_type": "up" if index % 3 else "down",
+                      "user_id": user_id}))
+        return post_id, user_id
+
+    async def upload(post_id: str) -> Tuple[str, str]:
+        async with semaphore:
+            body = await _check(await client.post(
+                f"/posts/{post_id}/files", **_upload("uploader")))
+        return post_id, body["file_meta"]["file_id"]
+
+    dataset.posts = await asyncio.gather(
+        *(create_post(i) for i in range(args.posts)))
+    dataset.comments = await asyncio.gather(
+        *(create_comment(post_id) for post_id in dataset.posts
+          for _ in range(args.comments)))
+    dataset.voters = await asyncio.gather(
+        *(vote(post_id, i) for post_id in dataset.posts
+          for i in range(args.votes)))
+    with_files = dataset.posts[:max(1, int(len(dataset.posts)
+                                           * args.attachment_ratio))]
+    dataset.files = await asyncio.gather(
+        *(upload(post_id) for post_id in with_files))
+
+    # DELETE routes each consume one object per request
+    dataset.disposable_posts = await asyncio.gather(
+        *(create_post(i) for i in range(args.requests)))
+    dataset.disposable_comments = await asyncio.gather(
+        *(create_comment(dataset.posts[i % len(dataset.posts)])
+          for i in range(args.requests)))
+    dataset.disposable_files = await asyncio.gather(
+        *(upload(dataset.posts[i % len(dataset.posts)])
+          for i in range(args.requests)))
+    return dataset
+
+
+async def drive(client: httpx.AsyncClient, route: Dict[str, Any],
+                dataset: Dataset, args) -> Dict[str, Any]:
+    """Send ``args.requests`` requests to one route, ``args.concurrency``
+    at a time, and summarize them."""
+    from services import metrics
+
+    scenario = SCENARIOS[route["name"]]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def one() -> None:
+        method, path, kwargs = scenario(dataset)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        status = str(response.status_code)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    before = dynamodb_calls(metrics.aws_calls.values())
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    wall = time.perf_counter() - started
+    after = dynamodb_calls(metrics.aws_calls.values())
+
+    errors = sum(count for status, count in statuses.items()
+                 if int(status) >= 400)
+    return {
+        "method": route["methods"][0],
+        "path": route["path"],
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "wall_seconds": round(wall, 4),
+        "requests_per_second": round(len(latencies) / wall, 2),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies),
+        "dynamodb_calls_per_request": round(
+            (after.get("dynamodb", 0) - before.get("dynamodb", 0))
+            / len(latencies), 2),
+        "s3_calls_per_request": round(
+            (after.get("s3", 0) - before.get("s3", 0)) / len(latencies), 2),
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    import main as api
+
+    if backend(args) == "aws":
+        ensure_resources(os.environ["DYNAMO_DB_TABLE"],
+                         os.environ["S3_BUCKET"])
+    routes = discover_routes()
+    if args.routes:
+        routes = [route for route in routes if route["name"] in args.routes]
+
+    await api.app.router.startup()
+    transport = httpx.ASGITransport(app=api.app)
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    try:
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="http://bench",
+                                     timeout=args.timeout) as client:
+            started = time.perf_counter()
+            dataset = await seed(client, args)
+            seed_seconds = time.perf_counter() - started
+
+            for route in routes:
+                if route["group"] in SKIPPED_ROUTES:
+                    skipped[route["name"]] = SKIPPED_ROUTES[route["group"]]
+                elif route["name"] not in SCENARIOS:
+                    skipped[route["name"]] = "no scenario"
+                else:
+                    results[route["name"]] = await drive(client, route,
+                                                         dataset, args)
+    finally:
+        await api.app.router.shutdown()
+
+    return {
+        "config": {"posts": args.posts, "comments": args.comments,
+                   "votes": args.votes,
+                   "attachment_ratio": args.attachment_ratio,
+                   "requests": args.requests,
+                   "concurrency": args.concurrency,
+                   "backend": ("moto" if args.moto
+                               else args.endpoint_url or "memory")},
+        "seed_seconds": round(seed_seconds, 3),
+        "routes": results,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Regressions of ``current`` against ``baseline``, one line each."""
+    regressions = []
+    for name, result in current["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        if (result["p95"] > previous["p95"] * threshold
+                and result["p95"] - previous["p95"] > P95_NOISE_SECONDS):
+            regressions.append(
+                f"{name}: p95 {previous['p95'] * 1000:.1f}ms -> "
+                f"{result['p95'] * 1000:.1f}ms")
+        if (result["dynamodb_calls_per_request"]
+                > previous["dynamodb_calls_per_request"] + 0.5):
+            regressions.append(
+                f"{name}: DynamoDB calls/request "
+                f"{previous['dynamodb_calls_per_request']} -> "
+                f"{result['dynamodb_calls_per_request']}")
+        if result["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> "
+                               f"{result['errors']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--endpoint-url",
+                        default=os.getenv("AWS_ENDPOINT_URL"),
+                        help="DynamoDB Local / LocalStack endpoint")
+    target.add_argument("--moto", action="store_true",
+                        help="run against in-process moto mocks")
+    parser.add_argument("--table", default="forum-bench")
+    parser.add_argument("--bucket", default="forum-bench")
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=3,
+                        help="comments per post")
+    parser.add_argument("--votes", type=int, default=3,
+                        help="votes per post")
+    parser.add_argument("--attachment-ratio", type=float, default=0.2,
+                        help="share of posts with an attachment")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--routes", nargs="*",
+                        help="only these route names (e.g. GET_ALL_POSTS)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="allowed p95 ratio against the baseline")
+    args = parser.parse_args()
+
+    configure_environment(args)
+
+    if args.moto:
+        from moto import mock_aws  # test-only dependency
+
+        with mock_aws():
+            report = asyncio.run(run(args))
+    else:
+        report = asyncio.run(run(args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput and failure benchmark for the shared LLM client.
+
+Summarizes synthetic documents through ``summarize_document`` against the
+local stub server (``python -m benchmarks.llm_stub_server``) and reports
+wall time, call latency percentiles and failures::
+
+    cd api
+    python -m benchmarks.llm_bench --documents 20 --pages 40 --rate 600
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from services import openrouter_api
+from services.llm_client import LLMClient, LLMError
+from services.rate_limiter import TokenBucket
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(args) -> dict:
+    client = LLMClient(
+        api_key="stub",
+        base_url=args.base_url,
+        rate_limiter=TokenBucket(args.rate / 60, args.burst),
+        timeout=args.timeout,
+    )
+    latencies = []
+
+    async def timed_complete(prompt):
+        started = time.perf_counter()
+        try:
+            return await client.complete(openrouter_api.API_MODEL, prompt)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    openrouter_api.complete = timed_complete
+    page = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 50
+    documents = [[page + "\n"] * args.pages for _ in range(args.documents)]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(openrouter_api.summarize_document(pages, args.concurrency)
+          for pages in documents),
+        return_exceptions=True,
+    )
+    wall = time.perf_counter() - started
+    await client.aclose()
+
+    failures = [r for r in results if isinstance(r, LLMError)]
+    return {
+        "documents": args.documents,
+        "pages_per_document": args.pages,
+        "wall_seconds": round(wall, 3),
+        "calls": len(latencies),
+        "calls_per_second": round(len(latencies) / wall, 2),
+        "call_p50": percentile(latencies, 0.50),
+        "call_p95": percentile(latencies, 0.95),
+        "call_mean": statistics.fmean(latencies) if latencies else None,
+        "failed_documents": len(failures),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8900/v1")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--concurrency", type=int,
+                        default=openrouter_api.SUMMARY_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=600,
+                        help="client rate limit, requests per minute")
+    parser.add_argument("--burst", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers ``POST /v1/chat/completions`` with canned summaries after a
+configurable delay, and injects rate limiting and server errors at
+configurable rates, so the LLM client's throughput and failure handling
+can be measured offline::
+
+    cd api
+    python -m benchmarks.llm_stub_server --latency 0.5 --error-rate 0.05
+
+Point the API or worker at it with
+``LLM_BASE_URL=http://127.0.0.1:8900/v1``. ``GET /stats`` reports what
+the stub has served.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency: float = 0.5, jitter: float = 0.1,
+               error_rate: float = 0.0, throttle_rate: float = 0.0,
+               retry_after: float = 1.0) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    stats = Counter()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        roll = random.random()
+
+        if roll < throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+        await asyncio.sleep(max(0.0, random.gauss(latency, jitter)))
+        if roll < throttle_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "Upstream error", "code": 502}},
+                status_code=502,
+            )
+
+        prompt = body["messages"][-1]["content"]
+        stats["completed"] += 1
+        stats["prompt_chars"] += len(prompt)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": (f"- Stub summary of {len(prompt)} "
+                                f"characters\n- {prompt[:80]!r}"),
+                },
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4,
+                      "completion_tokens": 20,
+                      "total_tokens": len(prompt) // 4 + 20},
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1,
+                        help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 502")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate,
+                     args.throttle_rate, args.retry_after)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
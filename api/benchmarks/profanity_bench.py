@@ -0,0 +1,312 @@
+"""
+Throughput and latency benchmark for the profanity checker.
+
+Generates a deterministic English, Tagalog and Taglish corpus from short
+comments to 50 KB posts, plus adversarial inputs (near-misses that the
+automaton matches but word boundaries reject, look-alike substitutions,
+dense hits and non-ASCII text), and times ``check_text``, ``check_many``
+and each language provider on it::
+
+    cd api
+    python -m benchmarks.profanity_bench
+    python -m benchmarks.profanity_bench --save-baseline
+    python -m benchmarks.profanity_bench --baseline --threshold 1.3
+
+Before timing anything, a fixed set of inputs (``EXPECTED_HITS``), including
+affixed Tagalog forms and near-misses, is checked for the exact hits it must
+produce; a mismatch fails the run.
+
+Throughput is also reported relative to a calibration loop run on the same
+machine, and the baseline gate compares those relative scores, so a
+baseline saved on one machine stays meaningful on another. The run exits
+non-zero when any case is slower than the baseline by more than
+``--threshold``.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from services.profanity import checker
+from services.profanity.providers.english_filter import EnglishFilter
+from services.profanity.providers.tagalog_filter import TagalogFilter
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines",
+                                "profanity.json")
+SIZES = {
+    "comment": 80,
+    "short_post": 1024,
+    "post": 8 * 1024,
+    "long_post": 50 * 1024,
+}
+
+ENGLISH_WORDS = """
+    the solar panel output dropped after we moved the inverter closer to
+    the battery bank and the charge controller kept reporting a fault on
+    cloudy days so I checked the wiring again measured the voltage at each
+    string and found one connector loose which explains the flicker thanks
+    for the guide it really helped our thesis group plan the installation
+""".split()
+TAGALOG_WORDS = """
+    salamat po sa tulong ninyo kasi hindi namin alam kung paano ikabit ang
+    mga panel sa bubong ng bahay at medyo mahal pa ang baterya kaya naghanap
+    kami ng ibang paraan para makatipid sa kuryente tuwing tag-init lalo na
+    kapag mainit at maaraw buong araw sa probinsya
+""".split()
+# Substitutions the engine folds (see engine.SUBSTITUTIONS)
+LEET = {"a": "4", "e": "3", "i": "1", "o": "0", "s": "$", "t": "7"}
+NON_ASCII_WORDS = ["señor", "niño", "café", "mañana", "piña", "☀️", "🔋",
+                   "naïve", "Ñoño"]
+
+# Inputs and the hits they must produce
+EXPECTED_HITS: List[Tuple[str, List[str]]] = [
+    ("shit happens", ["shit"]),
+    ("sh1t", ["sh1t"]),
+    ("first class assignment", []),
+    ("mga bobo", ["bobo"]),
+    # Tagalog linker and prefixes attached to the word
+    ("gagong bata", ["gagong"]),
+    ("bobong tao", ["bobong"]),
+    ("tarantadong driver", ["tarantadong"]),
+    ("nakakagago naman", ["nakakagago"]),
+    ("kagago ka", ["kagago"]),
+    ("botohan na bukas", []),
+    ("nakakatuwa ang panel", []),
+]
+
+
+def check_expected() -> List[str]:
+    """Inputs in ``EXPECTED_HITS`` whose hits differ from the expected."""
+    mismatches = []
+    for text, expected in EXPECTED_HITS:
+        checker._hits_cache.clear()
+        words = [hit.text for hit in checker.scan(text)]
+        if words != expected:
+            mismatches.append(f"{text!r}: expected {expected}, got {words}")
+    return mismatches
+
+
+def _profanities() -> Tuple[List[str], List[str]]:
+    english = [word for word in EnglishFilter().badwords if " " not in word]
+    tagalog = [word for word in TagalogFilter().badwords if " " not in word]
+    return english, tagalog
+
+
+def _leet(word: str, rng: random.Random) -> str:
+    return "".join(LEET.get(char, char) if rng.random() < 0.5 else char
+                   for char in word)
+
+
+def _fill(rng: random.Random, size: int,
+          next_word: Callable[[random.Random], str]) -> str:
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = next_word(rng)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def build_corpus(seed: int = 7) -> Dict[str, Dict[str, str]]:
+    """``{kind: {size_name: text}}`` for every corpus kind and size."""
+    rng = random.Random(seed)
+    english_bad, tagalog_bad = _profanities()
+
+    def clean(vocabulary, bad, rate):
+        def next_word(rng):
+            if rng.random() < rate:
+                return rng.choice(bad)
+            return rng.choice(vocabulary)
+        return next_word
+
+    def near_miss(rng):
+        # Matches a pattern, then fails the trailing word-boundary check
+        word = rng.choice(english_bad + tagalog_bad)
+        return word + rng.choice("xyzq") if rng.random() < 0.5 else \
+            rng.choice("xyzq") + word
+
+    def prefixes(rng):
+        # Long partial matches that keep the automaton deep in the trie
+        word = rng.choice(english_bad)
+        return word[:max(1, len(word) - 1)] * rng.randint(1, 4)
+
+    def leetspeak(rng):
+        return _leet(rng.choice(english_bad + ENGLISH_WORDS), rng)
+
+    def non_ascii(rng):
+        if rng.random() < 0.3:
+            return rng.choice(NON_ASCII_WORDS)
+        return rng.choice(ENGLISH_WORDS + TAGALOG_WORDS)
+
+    generators = {
+        "english": clean(ENGLISH_WORDS, english_bad, 0.005),
+        "tagalog": clean(TAGALOG_WORDS, tagalog_bad, 0.005),
+        "taglish": clean(ENGLISH_WORDS + TAGALOG_WORDS,
+                         english_bad + tagalog_bad, 0.005),
+        "adversarial_near_miss": near_miss,
+        "adversarial_prefixes": prefixes,
+        "adversarial_leetspeak": leetspeak,
+        "adversarial_dense_hits": clean(ENGLISH_WORDS, english_bad, 0.5),
+        "adversarial_non_ascii": non_ascii,
+    }
+    return {kind: {name: _fill(rng, size, generator)
+                   for name, size in SIZES.items()}
+            for kind, generator in generators.items()}
+
+
+def _uncached(function: Callable[[str], object]) -> Callable[[str], object]:
+    # The checker memoizes results by content hash; measure the scan itself
+    def call(text: str) -> object:
+        checker._hits_cache.clear()
+        return function(text)
+    return call
+
+
+def targets() -> Dict[str, Callable[[str], object]]:
+    english = EnglishFilter()
+    tagalog = TagalogFilter()
+    english.engine, tagalog.engine, checker.lexicon.engine  # compile/load
+    return {
+        "check_text": _uncached(checker.check_text),
+        "check_many": _uncached(
+            lambda text: checker.check_many({"title": text[:120],
+                                             "content": text})),
+        "english_filter": english.find_profanities,
+        "tagalog_filter": tagalog.find_profanities,
+    }
+
+
+def measure(function: Callable[[str], object], text: str,
+            min_seconds: float, min_calls: int) -> List[float]:
+    """Per-call latencies of ``function(text)`` in seconds."""
+    latencies: List[float] = []
+    total = 0.0
+    while total < min_seconds or len(latencies) < min_calls:
+        started = time.perf_counter()
+        function(text)
+        latency = time.perf_counter() - started
+        latencies.append(latency)
+        total += latency
+    return latencies
+
+
+def summarize(text: str, latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    size = len(text.encode("utf-8"))
+    return {
+        "bytes": size,
+        "calls": len(latencies),
+        # From the fastest call: noise from GC and other processes only
+        # ever adds time, so the minimum is the most repeatable figure
+        "mb_per_second": round(size / latencies[0] / 1e6, 3),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p95_us": round(latencies[int(len(latencies) * 0.95)] * 1e6, 1),
+    }
+
+
+def calibrate(min_seconds: float) -> float:
+    """MB/s of a reference per-character dict-lookup loop on this machine."""
+    text = _fill(random.Random(0), 64 * 1024,
+                 lambda rng: rng.choice(ENGLISH_WORDS))
+    table = {char: index for index, char in enumerate(sorted(set(text)))}
+
+    def reference(text: str) -> int:
+        state = 0
+        for char in text:
+            state = table.get(char, 0)
+        return state
+
+    return summarize(text, measure(reference, text, min_seconds, 5))[
+        "mb_per_second"]
+
+
+def run(args) -> Dict:
+    corpus = build_corpus(args.seed)
+    cases = [(f"{target}/{kind}/{size_name}", function, text)
+             for target, function in targets().items()
+             for kind, texts in corpus.items()
+             for size_name, text in texts.items()]
+    latencies: Dict[str, List[float]] = {name: [] for name, _, _ in cases}
+    references: List[float] = []
+
+    # Shared machines speed up and slow down over seconds; interleaving
+    # rounds (each with its own calibration) lets every case and the
+    # reference see the same conditions, and the best round wins
+    for _ in range(args.rounds):
+        references.append(calibrate(args.min_seconds))
+        for name, function, text in cases:
+            latencies[name] += measure(function, text,
+                                       args.min_seconds / args.rounds,
+                                       args.min_calls)
+
+    reference = max(references)
+    results: Dict[str, Dict] = {}
+    for name, _, text in cases:
+        result = summarize(text, latencies[name])
+        result["relative"] = round(result["mb_per_second"] / reference, 4)
+        results[name] = result
+
+    return {"reference_mb_per_second": round(reference, 3),
+            "cases": results}
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Cases whose relative throughput fell by more than ``threshold``x."""
+    regressions = []
+    for case, result in current["cases"].items():
+        previous = baseline["cases"].get(case)
+        if previous and result["relative"] * threshold < previous["relative"]:
+            regressions.append(
+                f"{case}: {previous['relative']:.4f} -> "
+                f"{result['relative']:.4f} of reference "
+                f"({result['mb_per_second']} MB/s)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-seconds", type=float, default=0.2,
+                        help="minimum time spent per case")
+    parser.add_argument("--min-calls", type=int, default=5,
+                        help="minimum calls per case and round")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="interleaved passes over all cases")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        metavar="PATH", help="store this run as the baseline")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE,
+                        metavar="PATH", help="compare with a stored baseline")
+    parser.add_argument("--threshold", type=float, default=1.3,
+                        help="allowed slowdown factor against the baseline")
+    args = parser.parse_args()
+
+    mismatches = check_expected()
+    for line in mismatches:
+        print(f"MISMATCH {line}", file=sys.stderr)
+    if mismatches:
+        sys.exit(1)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
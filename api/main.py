@@ -6,7 +6,15 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
-from services.aws_clients import AWSClients
+from middleware import MetricsMiddleware, RateLimitMiddleware
+from services import metrics
+from services.aws_clients import get_aws_clients
+from services.auth_gateway import close_auth_gateway
+from services.event_bus import close_event_bus
+from services.feed_snapshots import start_feed_snapshots
+from services.process_pool import shutdown_process_pools
+from services.profanity import checker
+from services.task_supervisor import drain_task_supervisor, finish_invocation
 from routes import router
 
 class App(FastAPI):
@@ -24,6 +32,9 @@ class App(FastAPI):
             description=description,
         )
 
+        # Before any AWS client exists, so every client is instrumented
+        self._init_instrumentation()
+
         # Uncomment only if you have the necessary environment variables set
         self._init_clients()
 
@@ -31,24 +42,44 @@ class App(FastAPI):
 
         self._init_routes()
 
+        self._init_lifecycle()
+
+    def _init_instrumentation(self) -> None:
+        """Count AWS calls and consumed capacity per request"""
+        metrics.instrument()
+
     def _init_clients(self) -> None:
         """Initialize AWS service clients"""
-        self.state.clients = AWSClients()
+        self.state.clients = get_aws_clients()
 
     def _init_middleware(self) -> None:
         """Add application middleware"""
+        # Added first so it runs inside CORS: 429s still get CORS headers
+        self.add_middleware(RateLimitMiddleware)
         self.add_middleware(
             CORSMiddleware,
             allow_origins=["*"],
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Next-Cursor", "X-Snapshot-Age"],
         )
+        # Outermost, so throttled and failed requests are measured too
+        self.add_middleware(MetricsMiddleware)
 
     def _init_routes(self) -> None:
         """Register all API routes"""
         self.include_router(router)
 
+    def _init_lifecycle(self) -> None:
+        """Register startup and shutdown hooks"""
+        self.add_event_handler("startup", checker.start_pool)
+        self.add_event_handler("startup", start_feed_snapshots)
+        self.add_event_handler("shutdown", close_auth_gateway)
+        self.add_event_handler("shutdown", drain_task_supervisor)
+        self.add_event_handler("shutdown", close_event_bus)
+        self.add_event_handler("shutdown", shutdown_process_pools)
+
 def main() -> None:
     """Main entry point for the application"""
     return App(
@@ -58,7 +89,18 @@ def main() -> None:
     )
 
 app = main()
-handler = Mangum(app)
+# Mangum would run the lifespan on every invocation; Lambda has no process
+# shutdown to hook into, so the hooks above only run under uvicorn
+_mangum = Mangum(app, lifespan="off")
+
+
+def handler(event, context):
+    """Lambda entry point"""
+    try:
+        return _mangum(event, context)
+    finally:
+        # Nothing runs once the response is returned and the process freezes
+        finish_invocation(context)
 
 if __name__ == "__main__":
     import uvicorn
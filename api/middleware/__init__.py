@@ -0,0 +1,2 @@
+from .metrics import MetricsMiddleware
+from .rate_limit import RateLimitMiddleware
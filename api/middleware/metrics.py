@@ -0,0 +1,57 @@
+import time
+
+from starlette.routing import Match
+
+from services.cache import LRUCache
+from services.metrics import finish_request, start_request
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each request and the AWS calls it makes.
+
+    Latency, AWS call counts and consumed DynamoDB capacity are recorded
+    per route template (``/posts/{post_id}``), never per raw path, so the
+    number of series stays bounded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._routes = LRUCache(maxsize=4096)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats, token = start_request()
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish_request(token, stats, scope["method"],
+                           self._route(scope), status,
+                           time.perf_counter() - started)
+
+    def _route(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is None:
+            route = UNMATCHED_ROUTE
+            for candidate in scope["app"].router.routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = candidate.path
+                    break
+            self._routes.set(key, route)
+        return route
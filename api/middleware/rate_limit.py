@@ -0,0 +1,373 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+import jwt
+from botocore.exceptions import ClientError
+from starlette.routing import compile_path
+
+from services.aws_clients import get_aws_clients
+from services.cache import LRUCache, TTLCache
+from services.rate_limiter import TokenBucket
+from services.token_verifier import get_token_verifier, token_cache_key
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_TTL = 300  # seconds a verified token -> user id is reused
+MAX_MEMORY_BUCKETS = 100_000
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """``rate`` requests per ``per`` seconds, bursting to ``burst``.
+
+    ``key`` is ``"user"`` (falling back to the client IP for anonymous
+    requests) or ``"ip"``.
+    """
+    name: str
+    methods: Tuple[str, ...]
+    path: str
+    rate: float
+    per: float
+    burst: float
+    key: str = "user"
+
+    @property
+    def regex(self) -> Pattern:
+        return compile_path(self.path)[0]
+
+
+# Write-heavy and email-sending routes
+DEFAULT_RULES: List[RateLimitRule] = [
+    RateLimitRule("vote", ("POST", "DELETE"), "/posts/{post_id}/vote",
+                  rate=30, per=60, burst=10),
+    RateLimitRule("comment", ("POST",), "/posts/{post_id}/comments",
+                  rate=10, per=60, burst=5),
+    RateLimitRule("post", ("POST",), "/posts", rate=5, per=60, burst=3),
+    RateLimitRule("upload", ("POST",), "/posts/{post_id}/files",
+                  rate=10, per=60, burst=5),
+    RateLimitRule("login", ("POST",), "/auth/login",
+                  rate=10, per=60, burst=5, key="ip"),
+    RateLimitRule("register", ("POST",), "/auth/register",
+                  rate=3, per=3600, burst=3, key="ip"),
+    RateLimitRule("resend", ("POST",), "/auth/resend-confirmation",
+                  rate=3, per=3600, burst=2, key="ip"),
+    RateLimitRule("reset", ("POST",), "/auth/reset-password",
+                  rate=3, per=3600, burst=2, key="ip"),
+]
+
+
+def global_rule_from_env() -> Optional[RateLimitRule]:
+    """Per-IP limit on every request, off unless
+    ``RATE_LIMIT_GLOBAL_PER_MINUTE`` is set.
+
+    Clients behind one NAT or an untrusted proxy share an IP, and so this
+    bucket; ``RATE_LIMIT_GLOBAL_BURST`` defaults to a third of the rate.
+    """
+    per_minute = float(os.getenv("RATE_LIMIT_GLOBAL_PER_MINUTE") or 0)
+    if per_minute <= 0:
+        return None
+    burst = float(os.getenv("RATE_LIMIT_GLOBAL_BURST") or
+                  max(1.0, per_minute / 3))
+    return RateLimitRule("global", (), "/{path:path}", rate=per_minute,
+                         per=60, burst=burst, key="ip")
+
+
+# (subject, rule) pairs a request is checked against, e.g.
+# ("user:<id>", <vote rule>)
+Buckets = List[Tuple[str, RateLimitRule]]
+
+
+class MemoryStore:
+    """Token buckets in this process; the default for a single worker."""
+
+    def __init__(self, maxsize: int = MAX_MEMORY_BUCKETS) -> None:
+        self._buckets = LRUCache(maxsize=maxsize)
+
+    async def consume(self, buckets: Buckets) -> float:
+        """Take a token from every bucket, or from none of them.
+
+        Returns 0 on success, otherwise the seconds until all of them
+        have a token.
+        """
+        token_buckets = []
+        for subject, rule in buckets:
+            key = f"{rule.name}:{subject}"
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rule.rate / rule.per, rule.burst)
+                self._buckets.set(key, bucket)
+            token_buckets.append(bucket)
+        # No await between the check and the take, so nothing else on the
+        # loop can spend these tokens in between
+        wait = max(bucket.wait_time() for bucket in token_buckets)
+        if wait:
+            return wait
+        for bucket in token_buckets:
+            bucket.try_acquire()
+        return 0.0
+
+
+class DynamoDBStore:
+    """
+    Token buckets shared by every worker, stored in a DynamoDB table.
+
+    A subject's buckets for every rule live in one ``RATELIMIT#<subject>``
+    item updated with an optimistic, conditional write, so a request costs one
+    read (a BatchGet when the user and IP rules both apply) and one
+    conditional PutItem per subject; a throttled request costs the read
+    only. Full buckets are dropped from the item, and items expire through
+    the table's TTL attribute (``expires_at``) once every bucket in them
+    would be full again. Works against DynamoDB Local as well.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, table, dynamodb=None) -> None:
+        self.table = table
+        self.dynamodb = dynamodb
+
+    async def consume(self, buckets: Buckets) -> float:
+        """Take a token from every bucket, or from none of them.
+
+        Returns 0 on success, otherwise the seconds until all of them
+        have a token.
+        """
+        return await asyncio.to_thread(self._consume, buckets)
+
+    def _consume(self, buckets: Buckets) -> float:
+        rules: Dict[str, List[RateLimitRule]] = {}
+        for subject, rule in buckets:
+            rules.setdefault(subject, []).append(rule)
+
+        for _ in range(self.MAX_ATTEMPTS):
+            now = time.time()
+            items = self._get(list(rules))
+            wait = 0.0
+            writes = []
+            for subject, subject_rules in rules.items():
+                item = items.get(subject)
+                state = {name: bucket
+                         for name, bucket in (item or {}).get("buckets",
+                                                              {}).items()
+                         if float(bucket["full_at"]) > now}
+                for rule in subject_rules:
+                    rate = rule.rate / rule.per
+                    tokens = rule.burst
+                    bucket = state.get(rule.name)
+                    if bucket:
+                        elapsed = now - float(bucket["updated_at"])
+                        tokens = min(rule.burst,
+                                     float(bucket["tokens"]) + elapsed * rate)
+                    if tokens < 1:
+                        wait = max(wait, (1 - tokens) / rate)
+                    state[rule.name] = {
+                        "tokens": str(tokens - 1),
+                        "updated_at": str(now),
+                        "full_at": str(now + (rule.burst - tokens + 1) / rate),
+                    }
+                writes.append((subject, item, state))
+            if wait:
+                return wait
+
+            try:
+                for subject, item, state in writes:
+                    self._put(subject, item, state, now)
+                    # Committed; a retry only re-checks the other subjects
+                    del rules[subject]
+                return 0.0
+            except ClientError as e:
+                if (e.response["Error"]["Code"]
+                        != "ConditionalCheckFailedException"):
+                    raise
+        # Heavily contended bucket: treat as exhausted for a moment
+        return max(rule.per / rule.rate
+                   for subject_rules in rules.values()
+                   for rule in subject_rules)
+
+    @staticmethod
+    def _key(subject: str) -> Dict[str, str]:
+        return {"PK": f"RATELIMIT#{subject}", "SK": "BUCKETS"}
+
+    def _get(self, subjects: List[str]) -> Dict[str, Dict[str, Any]]:
+        if len(subjects) == 1 or self.dynamodb is None:
+            items = {}
+            for subject in subjects:
+                item = self.table.get_item(Key=self._key(subject),
+                                           ConsistentRead=True).get("Item")
+                if item:
+                    items[subject] = item
+            return items
+
+        request = {self.table.name: {
+            "Keys": [self._key(subject) for subject in subjects],
+            "ConsistentRead": True,
+        }}
+        items = {}
+        while request:
+            response = self.dynamodb.batch_get_item(RequestItems=request)
+            for item in response["Responses"].get(self.table.name, []):
+                items[item["PK"][len("RATELIMIT#"):]] = item
+            request = response.get("UnprocessedKeys")
+        return items
+
+    def _put(self, subject: str, item: Optional[Dict[str, Any]],
+             state: Dict[str, Dict[str, str]], now: float) -> None:
+        condition = ("updated_at = :previous" if item
+                     else "attribute_not_exists(PK)")
+        values = {":previous": item["updated_at"]} if item else {}
+        self.table.put_item(
+            Item={**self._key(subject),
+                  "buckets": state,
+                  "updated_at": str(now),
+                  "expires_at": int(max(float(bucket["full_at"])
+                                        for bucket in state.values())) + 1},
+            ConditionExpression=condition,
+            **({"ExpressionAttributeValues": values} if values else {}),
+        )
+
+
+def create_store():
+    """Store named by ``RATE_LIMIT_STORE`` (``memory`` or ``dynamodb``)."""
+    backend = os.getenv("RATE_LIMIT_STORE", "memory").lower()
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "dynamodb":
+        table_name = (os.getenv("RATE_LIMIT_TABLE")
+                      or os.getenv("DYNAMO_DB_TABLE"))
+        aws_clients = get_aws_clients()
+        return DynamoDBStore(aws_clients.dynamodb.Table(table_name),
+                             aws_clients.dynamodb)
+    raise ValueError(f"Unknown RATE_LIMIT_STORE: {backend}")
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying token-bucket limits per user, IP and route.
+
+    Only the write and auth routes in ``rules`` are limited, plus, if
+    configured, every request per IP (``global_rule``).
+
+    Limits are checked before the request reaches any route, so a
+    throttled request costs no DynamoDB or Supabase call and gets a 429
+    with ``Retry-After``. The caller is identified by the ``sub`` of a
+    locally verified bearer token, falling back to the client IP. Behind
+    a load balancer that IP is the balancer's unless ``trust_forwarded``
+    is set, when the last ``X-Forwarded-For`` entry is used instead.
+    """
+
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None,
+                 global_rule: Optional[RateLimitRule] = None,
+                 store=None, trust_forwarded: Optional[bool] = None) -> None:
+        self.app = app
+        self.rules = [(rule, rule.regex)
+                      for rule in (DEFAULT_RULES if rules is None else rules)]
+        self.global_rule = (global_rule_from_env() if global_rule is None
+                            else global_rule)
+        self.store = store or create_store()
+        self.trust_forwarded = (
+            os.getenv("RATE_LIMIT_TRUST_FORWARDED", "").lower() == "true"
+            if trust_forwarded is None else trust_forwarded
+        )
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+        self._identities = TTLCache(maxsize=10_000, ttl=IDENTITY_CACHE_TTL)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (not self.enabled or scope["type"] != "http"
+                or scope["method"] == "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self._check(scope)
+        if retry_after:
+            await self._reject(send, retry_after)
+            return
+        await self.app(scope, receive, send)
+
+    def _matching_rules(self, scope) -> List[RateLimitRule]:
+        method, path = scope["method"], scope["path"]
+        rules = [rule for rule, regex in self.rules
+                 if method in rule.methods and regex.match(path)]
+        if self.global_rule:
+            rules.append(self.global_rule)
+        return rules
+
+    async def _check(self, scope) -> float:
+        """Seconds until the request would be allowed; 0 if it is."""
+        rules = self._matching_rules(scope)
+        if not rules:
+            return 0.0
+        ip = self._client_ip(scope)
+        user = None
+        if any(rule.key == "user" for rule in rules):
+            user = await self._user_id(scope)
+
+        buckets = [(f"user:{user}" if rule.key == "user" and user
+                    else f"ip:{ip}", rule) for rule in rules]
+        # Every rule is checked before any token is taken, so a request
+        # refused by one rule doesn't use up the others
+        wait = await self.store.consume(buckets)
+        if wait:
+            logger.info(f"Rate limited {user or ip} on "
+                        f"{scope['method']} {scope['path']}")
+        return wait
+
+    def _client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            forwarded = [value.decode("latin-1")
+                         for name, value in scope.get("headers", [])
+                         if name == b"x-forwarded-for"]
+            if forwarded:
+                # The proxy appends the address it saw; entries before it
+                # come from the client and can be forged
+                return forwarded[-1].split(",")[-1].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _user_id(self, scope) -> Optional[str]:
+        """``sub`` of a valid bearer token, or None."""
+        token = None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                header = value.decode("latin-1")
+                if header.startswith("Bearer "):
+                    token = header[7:]
+                break
+        if not token:
+            return None
+
+        cache_key = token_cache_key(token)
+        user_id = self._identities.get(cache_key)
+        if user_id is not None:
+            return user_id or None
+
+        verifier = get_token_verifier()
+        user_id = ""
+        if verifier.is_configured:
+            try:
+                # May fetch the JWKS once, so keep it off the event loop
+                claims = await asyncio.to_thread(verifier.verify, token)
+                user_id = claims["sub"]
+            except (jwt.PyJWTError, KeyError):
+                pass
+        self._identities.set(cache_key, user_id)
+        return user_id or None
+
+    @staticmethod
+    async def _reject(send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too many requests"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(math.ceil(retry_after)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
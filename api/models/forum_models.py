@@ -30,6 +30,12 @@ def comment_sk(comment_id: str) -> str:
 def vote_sk(user_id: str) -> str:
     return f"VOTE#USER#{user_id}"
 
+def job_sk(job_id: str) -> str:
+    return f"JOB#{job_id}"
+
+def timeline_sk(created_at: str, post_id: str) -> str:
+    return f"{created_at}#{post_id}"
+
 # ============ MODELS ============
 class UserModel:
     def __init__(self, username: str, email: str, password_hash: str,
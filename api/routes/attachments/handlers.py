@@ -52,6 +52,8 @@ async def upload_file(
 
     try:
         result = attachment_service.upload_file(post_id, file, user_id)
+        post_service.add_summary(post_id, [result["s3_key"]],
+                                 digests={result["s3_key"]: result["sha256"]})
         return {"message": "File uploaded successfully", "file_meta": result}
     except Exception as e:
         traceback.print_exc()
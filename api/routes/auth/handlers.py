@@ -11,7 +11,7 @@ async def register(user_data: UserCreate,
                   aws_clients: AWSClients = Depends(get_aws_clients)):
     service = AuthService(aws_clients)
     try:
-        result = service.register(
+        result = await service.register(
             username=user_data.username,
             email=user_data.email,
             password=user_data.password,
@@ -29,7 +29,7 @@ async def login(data: Dict[str, Any],
                aws_clients: AWSClients = Depends(get_aws_clients)):
     service = AuthService(aws_clients)
     try:
-        result = service.login(data.get("username"), data.get("password"))
+        result = await service.login(data.get("username"), data.get("password"))
         # Return the user data directly (not wrapped in success/data)
         return result
     except ValueError as e:
@@ -41,7 +41,7 @@ async def resend_confirmation(data: Dict[str, Any],
                              aws_clients: AWSClients = Depends(get_aws_clients)):
     service = AuthService(aws_clients)
     try:
-        result = service.resend_confirmation(data.get("email"))
+        result = await service.resend_confirmation(data.get("email"))
         return {
             "success": True,
             "message": "Confirmation email sent successfully"
@@ -55,7 +55,7 @@ async def reset_password(data: Dict[str, Any],
                         aws_clients: AWSClients = Depends(get_aws_clients)):
     service = AuthService(aws_clients)
     try:
-        result = service.reset_password(data.get("email"))
+        result = await service.reset_password(data.get("email"))
         return {
             "success": True,
             "message": "Password reset email sent successfully"
@@ -75,7 +75,7 @@ async def logout(authorization: Optional[str] = Header(None),
             token = authorization[7:]  # Remove "Bearer " prefix
 
         if token:
-            result = service.logout(token)
+            result = await service.logout(token)
 
         return {
             "success": True,
@@ -99,7 +99,7 @@ async def verify_token(authorization: Optional[str] = Header(None),
         if not token:
             raise HTTPException(status_code=401, detail="No token provided")
 
-        result = service.verify_token_and_get_user(token)
+        result = await service.verify_token_and_get_user(token)
         if result:
             return result
         else:
@@ -17,7 +17,7 @@ async def create_comment(
     comment_service = CommentService(aws_clients)
     post_service = PostService(aws_clients)
 
-    if not post_service.get_post(post_id):
+    if not await post_service.aget_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
     try:
@@ -37,7 +37,7 @@ async def get_comments(
     comment_service = CommentService(aws_clients)
     post_service = PostService(aws_clients)
 
-    if not post_service.get_post(post_id):
+    if not await post_service.aget_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
     try:
@@ -1,7 +1,9 @@
-from fastapi import Depends, HTTPException, Body
-from typing import List
+from fastapi import Depends, HTTPException, Body, Query, Response
+from datetime import datetime
+from typing import List, Literal, Optional
 from services.aws_clients import AWSClients, get_aws_clients
 from services.post_service import PostService
+from services.task_supervisor import get_task_supervisor
 from schemas.forum_schemas import PostCreate, PostResponse
 
 
@@ -16,7 +18,7 @@ async def create_post(
     """Create a new post"""
     service = PostService(aws_clients)
     try:
-        new_post = service.create_post(
+        new_post = await service.create_post(
             author_id=post_data.author_id,
             title=post_data.title,
             content=post_data.content,
@@ -25,10 +27,17 @@ async def create_post(
             is_anonymous=post_data.is_anonymous
         )
 
-        service.add_summary(
-            post_id=new_post['post_id'],
-            attachments=post_data.attachments
-        )
+        # Summary jobs are queued off the request path; a full queue makes
+        # the request wait rather than dropping the jobs, and during
+        # shutdown they are queued inline
+        if not await get_task_supervisor().submit_wait(
+            "summaries", service.add_summary, new_post['post_id'],
+            post_data.attachments
+        ):
+            service.add_summary(
+                post_id=new_post['post_id'],
+                attachments=post_data.attachments
+            )
 
         return {"message": "Post created successfully", "post": new_post}
     except ValueError as e:
@@ -39,12 +48,44 @@ async def create_post(
 
 
 async def get_posts(
+    response: Response,
+    sort: Optional[Literal["new", "top", "hot", "commented"]] = Query(
+        None, description="Page order (default new)"
+    ),
+    tag: Optional[List[str]] = Query(
+        None, description="Only posts with any of these tags (repeatable)"
+    ),
+    author: Optional[str] = Query(None, description="Only this author's posts"),
+    has_attachments: Optional[bool] = Query(
+        None, description="Only posts with (true) or without (false) files"
+    ),
+    since: Optional[datetime] = Query(
+        None, description="Only posts created after this time"
+    ),
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    cursor: Optional[str] = Query(
+        None, description="Value of a previous X-Next-Cursor header"
+    ),
     aws_clients: AWSClients = Depends(get_aws_clients)
 ) -> List[PostResponse]:
-    """Retrieve all posts"""
+    """Retrieve a page of posts, or all posts when no listing parameter
+    is given"""
     service = PostService(aws_clients)
     try:
-        return service.get_posts()
+        if not any(param is not None and param != [] for param in
+                   (sort, tag, author, has_attachments, since, cursor)):
+            return service.get_posts()
+
+        posts, next_cursor = service.list_posts(
+            sort=sort or "new", tags=tag, author=author,
+            has_attachments=has_attachments, since=since,
+            limit=limit, cursor=cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return posts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -56,7 +97,7 @@ async def get_post(
     """Retrieve a single post by ID"""
     service = PostService(aws_clients)
     try:
-        post = service.get_post(post_id)
+        post = await service.aget_post(post_id)
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
         return post
@@ -66,6 +107,23 @@ async def get_post(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def get_post_summary(
+    post_id: str,
+    aws_clients: AWSClients = Depends(get_aws_clients)
+) -> dict:
+    """Retrieve a post's summary and its summary job status"""
+    service = PostService(aws_clients)
+    try:
+        status = service.get_summary_status(post_id)
+        if not status:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return status
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 async def update_post(
     post_id: str,
     post_data: PostCreate,
@@ -77,7 +135,7 @@ async def update_post(
         if not service.get_post(post_id):
             raise HTTPException(status_code=404, detail="Post not found")
 
-        updated_post = service.update_post(
+        updated_post = await service.update_post(
             post_id=post_id,
             title=post_data.title,
             content=post_data.content,
@@ -104,7 +162,7 @@ async def patch_post(
     try:
         if not service.get_post(post_id):
             raise HTTPException(status_code=404, detail="Post not found")
-        updated_post = service.patch_post(post_id, fields)
+        updated_post = await service.patch_post(post_id, fields)
         return {"message": "Post patched successfully", "post": updated_post}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
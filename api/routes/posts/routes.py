@@ -21,6 +21,12 @@ POST_ROUTES: dict = {
         "endpoint": handlers.get_post,
         "dependencies": [Depends(get_aws_clients)]
     },
+    "GET_POST_SUMMARY": {
+        "methods": ["GET"],
+        "path": "/posts/{post_id}/summary",
+        "endpoint": handlers.get_post_summary,
+        "dependencies": [Depends(get_aws_clients)]
+    },
     "UPDATE_POST": {
         "methods": ["PUT"],
         "path": "/posts/{post_id}",
@@ -9,6 +9,7 @@ from routes.votes.router import router as votes_router
 from routes.attachments.router import router as attachments_router
 from routes.utility.router import router as utility_router
 from routes.auth.router import router as auth_router
+from routes.stream.router import router as stream_router
 
 # Create a new APIRouter instance
 router: APIRouter = APIRouter()
@@ -19,3 +20,4 @@ router.include_router(comments_router)
 router.include_router(votes_router)
 router.include_router(attachments_router)
 router.include_router(utility_router)
+router.include_router(stream_router)
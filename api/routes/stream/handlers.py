@@ -0,0 +1,49 @@
+from typing import AsyncIterator, Dict, Optional
+from fastapi import Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from services.event_bus import (FEED_CHANNEL, encode, get_event_bus,
+                                post_channel)
+
+HEARTBEAT_INTERVAL = 15  # seconds; keeps proxies from closing idle streams
+RECONNECT_DELAY_MS = 3000
+MAX_POSTS = 50
+
+
+def _format_event(event: Dict) -> str:
+    data = encode({"channel": event["channel"], **event["data"]})
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def stream(
+    posts: Optional[str] = Query(None,
+                                 description="Comma-separated post ids"),
+    feed: bool = Query(True, description="Include post list changes"),
+    last_event_id: Optional[str] = Header(None)
+) -> StreamingResponse:
+    post_ids = [post_id for post_id in (posts or "").split(",") if post_id]
+    if len(post_ids) > MAX_POSTS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_POSTS} posts per stream")
+    channels = {post_channel(post_id) for post_id in post_ids}
+    if feed:
+        channels.add(FEED_CHANNEL)
+    if not channels:
+        raise HTTPException(status_code=400, detail="No channels selected")
+
+    async def events() -> AsyncIterator[str]:
+        subscription = get_event_bus().subscribe(channels, last_event_id)
+        try:
+            yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+            while True:
+                event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+                yield ": keep-alive\n\n" if event is None \
+                    else _format_event(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache",
+                 "X-Accel-Buffering": "no"},
+    )
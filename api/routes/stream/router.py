@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from routes.stream.routes import STREAM_ROUTES
+
+# Create a new APIRouter instance
+router: APIRouter = APIRouter()
+
+for api_route in STREAM_ROUTES.values():
+    router.add_api_route(**api_route)
@@ -0,0 +1,24 @@
+from fastapi.responses import StreamingResponse
+from routes.stream import handlers
+
+# =============================
+# |       STREAM ROUTES       |
+# =============================
+STREAM_ROUTES: dict = {
+    "GET_STREAM": {
+        "methods": ["GET"],
+        "path": "/stream",
+        "endpoint": handlers.stream,
+        "tags": ["Stream"],
+        "summary": "Live updates (Server-Sent Events)",
+        "description": (
+            "Streams changes as they happen instead of polling. `feed` "
+            "events (`post_created`, `post_updated`, `post_deleted`, "
+            "`votes`, `comment_count`) cover the post list; for each id in "
+            "`posts`, its votes and `comment_created`, `comment_updated` "
+            "and `comment_deleted` events follow too. Reconnects resume "
+            "from `Last-Event-ID`; a `resync` event means some were missed "
+            "and the client should reload."),
+        "response_class": StreamingResponse
+    },
+}
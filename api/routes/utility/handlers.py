@@ -1,37 +1,62 @@
-from fastapi import Query, Depends
-from typing import List, Dict
+import os
+from fastapi import Query, Depends, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+from typing import List, Dict, Optional
 from services.utility_service import UtilityService
-from services.aws_clients import AWSClients
+from services.aws_clients import AWSClients, get_aws_clients
 from schemas.forum_schemas import PostBase
+from services.metrics import registry
 
 
 async def health_check() -> Dict[str, str]:
     return {"status": "ok", "message": "API is running"}
 
 
+async def get_metrics(
+    authorization: Optional[str] = Header(None)
+) -> PlainTextResponse:
+    token = os.getenv("METRICS_TOKEN")
+    if token and authorization != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(registry.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
 async def search_posts(
     q: str = Query(..., min_length=1, max_length=100, 
                    description="Search query for posts"),
     limit: int = Query(10, ge=1, le=50, description="Max number of results"),
-    aws_clients: AWSClients = Depends()
+    aws_clients: AWSClients = Depends(get_aws_clients)
 ) -> List[PostBase]:
     service = UtilityService(aws_clients)
     return service.search_posts(query=q, limit=limit)
 
 
+def _set_snapshot_age(response: Response, age: float) -> None:
+    response.headers["X-Snapshot-Age"] = f"{age:.1f}"
+
+
 async def get_trending(
+    response: Response,
     limit: int = Query(10, ge=1, le=50, 
                        description="Max number of trending posts"),
-    aws_clients: AWSClients = Depends()
+    aws_clients: AWSClients = Depends(get_aws_clients)
 ) -> List[PostBase]:
     service = UtilityService(aws_clients)
-    return service.get_trending_posts(limit=limit)
+    posts, age = await service.aget_trending_posts(limit=limit)
+    _set_snapshot_age(response, age)
+    return posts
 
 
 async def get_recent_posts(
+    response: Response,
     limit: int = Query(10, ge=1, le=50, 
                        description="Max number of recent posts"),
-    aws_clients: AWSClients = Depends()
+    tag: Optional[str] = Query(None, max_length=50,
+                               description="Only posts with this tag"),
+    aws_clients: AWSClients = Depends(get_aws_clients)
 ) -> List[PostBase]:
     service = UtilityService(aws_clients)
-    return service.get_recent_posts(limit=limit)
+    posts, age = await service.aget_recent_posts(limit=limit, tag=tag)
+    _set_snapshot_age(response, age)
+    return posts
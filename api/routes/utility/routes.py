@@ -14,6 +14,17 @@ UTILITY_ROUTES: dict = {
         "description": "Returns a simple health check message.",
         "response_model": Dict[str, str]
     },
+    "GET_METRICS": {
+        "methods": ["GET"],
+        "path": "/metrics",
+        "endpoint": handlers.get_metrics,
+        "tags": ["Utility"],
+        "summary": "Prometheus metrics",
+        "description": ("Request latency, AWS calls and consumed DynamoDB "
+                        "capacity per route, in Prometheus text format. "
+                        "Requires `Bearer $METRICS_TOKEN` when it is set."),
+        "include_in_schema": False
+    },
     "SEARCH_POSTS": {
         "methods": ["GET"],
         "path": "/search",
@@ -31,7 +42,9 @@ UTILITY_ROUTES: dict = {
         "endpoint": handlers.get_trending,
         "tags": ["Utility"],
         "summary": "Get trending posts",
-        "description": "Returns trending posts sorted by engagement.",
+        "description": ("Returns trending posts sorted by engagement, from "
+                        "a snapshot refreshed in the background; "
+                        "`X-Snapshot-Age` is its age in seconds."),
         "response_model": List[PostBase]
     },
     "GET_RECENT_POSTS": {
@@ -41,7 +54,10 @@ UTILITY_ROUTES: dict = {
         "endpoint": handlers.get_recent_posts,
         "tags": ["Utility"],
         "summary": "Get recent posts",
-        "description": "Returns the most recent posts.",
+        "description": ("Returns the most recent posts, optionally only "
+                        "those with `tag`, from a snapshot refreshed in the "
+                        "background; `X-Snapshot-Age` is its age in "
+                        "seconds."),
         "response_model": List[PostBase]
     },
 }
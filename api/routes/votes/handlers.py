@@ -18,7 +18,7 @@ async def vote_post(
     vote_service = VoteService(aws_clients)
     post_service = PostService(aws_clients)
 
-    if not post_service.get_post(post_id):
+    if not await post_service.aget_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
     try:
@@ -35,7 +35,7 @@ async def remove_post_vote(
     vote_service = VoteService(aws_clients)
     post_service = PostService(aws_clients)
 
-    if not post_service.get_post(post_id):
+    if not await post_service.aget_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
     try:
@@ -0,0 +1,174 @@
+"""
+Production launcher for the API.
+
+Runs gunicorn with uvicorn workers (uvloop and httptools when installed),
+one per CPU by default. The app, its AWS clients and the profanity
+lexicons are loaded once in the master before it forks, so workers start
+fast and share those pages copy-on-write::
+
+    cd api
+    python server.py                 # all cores, port 8000
+    WEB_CONCURRENCY=4 PORT=9000 python server.py
+
+``uvicorn main:app --reload`` (or ``python main.py``) remains the
+development server. Platforms without ``fork`` (Windows) fall back to
+uvicorn's own multi-process mode, without preloading.
+
+Settings come from the environment, or the matching command-line flags:
+
+- ``HOST`` / ``PORT`` (``0.0.0.0:8000``)
+- ``WEB_CONCURRENCY``: worker processes (CPUs available to the container)
+- ``KEEP_ALIVE``: seconds an idle keep-alive connection stays open (``65``,
+  longer than a load balancer's usual 60 s, so the balancer closes first)
+- ``GRACEFUL_TIMEOUT``: seconds workers get to finish requests and run
+  shutdown hooks after SIGTERM (``30``)
+- ``WORKER_TIMEOUT``: seconds a blocked worker may go silent before it is
+  restarted (``60``)
+- ``MAX_REQUESTS``: recycle a worker after this many requests (``0``, off)
+"""
+import argparse
+import logging
+import os
+from typing import Any, Dict
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # no fork (Windows) or gunicorn not installed
+    BaseApplication = UvicornWorker = None
+
+logger = logging.getLogger(__name__)
+
+# Worker and stream shutdown must finish before gunicorn's hard kill
+SHUTDOWN_MARGIN = 5  # seconds
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _module_available(name: str) -> bool:
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def event_loop() -> str:
+    return "uvloop" if _module_available("uvloop") else "asyncio"
+
+
+def http_parser() -> str:
+    return "httptools" if _module_available("httptools") else "h11"
+
+
+if UvicornWorker is not None:
+    class Worker(UvicornWorker):
+        """Uvicorn worker with uvloop/httptools and a bounded shutdown."""
+
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_parser()}
+
+    class Server(BaseApplication):
+        """Gunicorn serving an app object loaded in this process."""
+
+        def __init__(self, app, options: Dict[str, Any]) -> None:
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def preload():
+    """Build the app and everything workers should share before fork."""
+    from main import app
+    from services.profanity import checker
+
+    # Compiled automaton and lexicon data, shared copy-on-write
+    checker.lexicon.engine
+    return app
+
+
+def warn_about_shared_state(workers: int) -> None:
+    """Per-process backends stop being correct once there are workers."""
+    if workers < 2:
+        return
+    defaults = {"RATE_LIMIT_STORE": "memory", "EVENT_BUS_BACKEND": "memory"}
+    for variable, default in defaults.items():
+        if os.getenv(variable, default).lower() == "memory":
+            logger.warning(f"{variable}=memory keeps state per worker; set "
+                           f"it to dynamodb to share it between the "
+                           f"{workers} workers")
+
+
+def gunicorn_options(args) -> Dict[str, Any]:
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": Worker,
+        "preload_app": True,
+        "keepalive": args.keep_alive,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.worker_timeout,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "backlog": 2048,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int,
+                        default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("WEB_CONCURRENCY",
+                                              str(_cpu_count()))))
+    parser.add_argument("--keep-alive", type=int,
+                        default=int(os.getenv("KEEP_ALIVE", "65")))
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--worker-timeout", type=int,
+                        default=int(os.getenv("WORKER_TIMEOUT", "60")))
+    parser.add_argument("--max-requests", type=int,
+                        default=int(os.getenv("MAX_REQUESTS", "0")))
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    warn_about_shared_state(args.workers)
+    # Long-lived responses (GET /stream) are cut off before gunicorn's
+    # hard kill, so lifespan shutdown hooks still get to run
+    shutdown_timeout = max(1, args.graceful_timeout - SHUTDOWN_MARGIN)
+
+    if BaseApplication is None:
+        import uvicorn
+        logger.warning("gunicorn is unavailable; starting uvicorn workers "
+                       "without preloading")
+        uvicorn.run("main:app", host=args.host, port=args.port,
+                    workers=args.workers, loop=event_loop(),
+                    http=http_parser(),
+                    timeout_keep_alive=args.keep_alive,
+                    timeout_graceful_shutdown=shutdown_timeout)
+        return
+
+    Worker.CONFIG_KWARGS = {**Worker.CONFIG_KWARGS,
+                            "timeout_graceful_shutdown": shutdown_timeout}
+    Server(preload(), gunicorn_options(args)).run()
+
+
+if __name__ == "__main__":
+    main()
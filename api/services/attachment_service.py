@@ -1,4 +1,5 @@
 from urllib import response
+import hashlib
 import uuid
 import re
 import mimetypes
@@ -7,8 +8,11 @@ from fastapi import HTTPException, UploadFile
 from models.forum_models import get_timestamp, post_pk
 from services.aws_clients import AWSClients
 from services.post_service import PostService
+from services.post_index import PostIndex
+from services.search_index import SearchIndex, attachment_source
 
 MAX_FILE_SIZE = 15 * 1024 * 1024  # 10 MB
+HASH_CHUNK_SIZE = 1024 * 1024
 
 class AttachmentService:
     """Service for managing post attachments in S3 and DynamoDB."""
@@ -17,7 +21,8 @@ class AttachmentService:
         self.table = aws_clients.table
         self.s3 = aws_clients.s3
         self.bucket = aws_clients.s3_bucket
-
+        self.post_index = PostIndex(aws_clients)
+        self.search_index = SearchIndex(aws_clients)
 
     def upload_file(self, post_id: str, file: UploadFile, user_id: str):
         """Upload file to S3 and store metadata in DynamoDB with validations."""
@@ -28,6 +33,13 @@ class AttachmentService:
             raise HTTPException(status_code=413,
                                 detail="File too large (max 10 MB)")
 
+        # Content hash, so identical documents can share one summary
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file.file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        file.file.seek(0)
+        sha256 = digest.hexdigest()
+
         sanitized_filename = re.sub(r"[^\w\-.]", "_", file.filename)
         file_id = str(uuid.uuid4())
         key = f"attachments/{post_id}/{file_id}-{sanitized_filename}"
@@ -45,12 +57,15 @@ class AttachmentService:
                 "file_id": file_id,
                 "filename": sanitized_filename,
                 "s3_key": key,
+                "sha256": sha256,
                 "uploaded_by": user_id,
                 "created_at": get_timestamp(),
             }
             self.table.put_item(Item=item)
+            self._count_attachment(post_id, 1)
 
-            return {"message": "File uploaded", "file_id": file_id}
+            return {"message": "File uploaded", "file_id": file_id,
+                    "s3_key": key, "sha256": sha256}
         except ClientError as e:
             raise HTTPException(
                 status_code=500,
@@ -59,6 +74,25 @@ class AttachmentService:
         except Exception as e:
             raise e
 
+    def _count_attachment(self, post_id: str, delta: int) -> None:
+        """Keep the post's ``attachment_count`` and its index items current."""
+        try:
+            response = self.table.update_item(
+                Key={"PK": post_pk(post_id), "SK": "METADATA"},
+                UpdateExpression="ADD attachment_count :delta",
+                ConditionExpression="attribute_exists(PK)",
+                ExpressionAttributeValues={":delta": delta},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return
+            raise
+
+        post = response["Attributes"]
+        previous = {**post, "attachment_count": post["attachment_count"] - delta}
+        self.post_index.update_post(previous, post)
+
     def get_post_files(self, post_id: str):
         """Retrieve all files attached to a post."""
         try:
@@ -87,6 +121,9 @@ class AttachmentService:
             self.s3.delete_object(Bucket=self.bucket, Key=s3_key)
             self.table.delete_item(Key={"PK": post_pk(post_id),
                                         "SK": f"FILE#{file_id}"})
+            self._count_attachment(post_id, -1)
+            self.search_index.remove_source(post_id,
+                                            attachment_source(s3_key))
             return {"message": "File deleted"}
         except ClientError as e:
             raise HTTPException(status_code=500,
@@ -100,8 +137,6 @@ class AttachmentService:
                 ExpressionAttributeValues={":sk": f"FILE#{file_id}"},
             )
 
-            print(f"Response from DynamoDB: {response}")
-
             items = response.get("Items", [])
             if not items:
                 raise HTTPException(status_code=404,
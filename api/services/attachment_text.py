@@ -0,0 +1,49 @@
+import gzip
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+
+from services.aws_clients import AWSClients
+
+TEXT_PREFIX = "attachment-text"
+PAGE_SEPARATOR = "\f"
+
+
+def text_key(sha256: str) -> str:
+    return f"{TEXT_PREFIX}/{sha256}.txt.gz"
+
+
+class AttachmentTextStore:
+    """
+    Extracted attachment text, gzip-compressed in S3.
+
+    Objects are keyed by the SHA-256 of the attachment bytes, so identical
+    documents share one copy and the text outlives any single upload.
+    Pages are separated by form feeds.
+    """
+
+    def __init__(self, aws_clients: AWSClients) -> None:
+        self.s3 = aws_clients.s3
+        self.bucket = aws_clients.s3_bucket
+
+    def get(self, sha256: str) -> Optional[List[str]]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket,
+                                          Key=text_key(sha256))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+
+        text = gzip.decompress(response["Body"].read()).decode("utf-8")
+        return text.split(PAGE_SEPARATOR)
+
+    def put(self, sha256: str, pages: List[str]) -> None:
+        body = gzip.compress(PAGE_SEPARATOR.join(pages).encode("utf-8"))
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=text_key(sha256),
+            Body=body,
+            ContentType="text/plain; charset=utf-8",
+            ContentEncoding="gzip",
+        )
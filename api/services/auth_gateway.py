@@ -0,0 +1,140 @@
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+REQUEST_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+POOL_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+
+class AuthGatewayError(ValueError):
+    """Raised when Supabase Auth rejects a request."""
+
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SupabaseAuthGateway:
+    """
+    Process-wide async gateway to the Supabase Auth (GoTrue) REST API.
+
+    A single pooled HTTP client is shared by every request. The gateway
+    holds no user session: calls that act on behalf of a user take that
+    user's access token explicitly, so concurrent requests never see each
+    other's session state.
+    """
+
+    def __init__(self, supabase_url: str, anon_key: str) -> None:
+        if not supabase_url or not anon_key:
+            raise ValueError(
+                "SUPABASE_URL and SUPABASE_ANON_KEY must be set"
+            )
+
+        self.base_url = f"{supabase_url.rstrip('/')}/auth/v1"
+        self.anon_key = anon_key
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, recreated if it was closed at shutdown."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"apikey": self.anon_key},
+                timeout=REQUEST_TIMEOUT,
+                limits=POOL_LIMITS,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _headers(self, access_token: Optional[str] = None) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {access_token or self.anon_key}"}
+
+    async def _request(self, method: str, path: str,
+                       access_token: Optional[str] = None,
+                       **kwargs: Any) -> Dict:
+        response = await self.client.request(
+            method, path, headers=self._headers(access_token), **kwargs
+        )
+
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            message = (body.get("msg") or body.get("error_description")
+                       or body.get("message") or body.get("error")
+                       or response.text)
+            raise AuthGatewayError(message, response.status_code)
+
+        if not response.content:
+            return {}
+        return response.json()
+
+    @staticmethod
+    def _parse_auth_response(data: Dict) -> Dict:
+        """Normalize GoTrue responses to ``{"user": ..., "session": ...}``."""
+        if "access_token" in data:
+            return {"user": data.get("user"), "session": data}
+        return {"user": data.get("user", data) or None, "session": None}
+
+    # =========================
+    # |     AUTH ACTIONS      |
+    # =========================
+    async def sign_up(self, email: str, password: str,
+                      metadata: Optional[Dict] = None) -> Dict:
+        data = await self._request("POST", "/signup", json={
+            "email": email,
+            "password": password,
+            "data": metadata or {},
+        })
+        return self._parse_auth_response(data)
+
+    async def sign_in_with_password(self, email: str, password: str) -> Dict:
+        data = await self._request(
+            "POST", "/token",
+            params={"grant_type": "password"},
+            json={"email": email, "password": password},
+        )
+        return self._parse_auth_response(data)
+
+    async def sign_out(self, access_token: str) -> None:
+        await self._request("POST", "/logout", access_token=access_token)
+
+    async def get_user(self, access_token: str) -> Dict:
+        return await self._request("GET", "/user", access_token=access_token)
+
+    async def update_user(self, access_token: str, attributes: Dict) -> Dict:
+        return await self._request("PUT", "/user", access_token=access_token,
+                                   json=attributes)
+
+    async def resend(self, email: str, type: str = "signup") -> None:
+        await self._request("POST", "/resend",
+                            json={"type": type, "email": email})
+
+    async def reset_password_for_email(self, email: str) -> None:
+        await self._request("POST", "/recover", json={"email": email})
+
+
+_gateway: Optional[SupabaseAuthGateway] = None
+
+
+def get_auth_gateway() -> SupabaseAuthGateway:
+    """Return the process-wide auth gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        _gateway = SupabaseAuthGateway(
+            supabase_url=os.getenv("SUPABASE_URL"),
+            anon_key=os.getenv("SUPABASE_ANON_KEY"),
+        )
+    return _gateway
+
+
+async def close_auth_gateway() -> None:
+    if _gateway is not None:
+        await _gateway.aclose()
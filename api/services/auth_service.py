@@ -1,30 +1,48 @@
 # api/services/auth_service.py
-import supabase
+import asyncio
+import jwt
 from typing import Dict, Optional
 from models.forum_models import user_pk, UserRole, get_timestamp
 from services.aws_clients import AWSClients
-import os
+from services.auth_gateway import get_auth_gateway
+from services.bookkeeping_writer import get_bookkeeping_writer
+from services.cache import TTLCache
+from services.token_verifier import get_token_verifier, token_cache_key
+
+SESSION_CACHE_SIZE = 4096
+SESSION_CACHE_TTL = 300  # seconds
+# Sessions Supabase vouched for are re-checked sooner, since revoking a
+# token there takes effect only after this
+REMOTE_SESSION_CACHE_TTL = 60  # seconds
+USERNAME_CACHE_SIZE = 4096
+USERNAME_CACHE_TTL = 900  # seconds
+
+# Verified token -> formatted session, shared by every AuthService instance
+_session_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+# Username -> email, so repeat logins skip the profile scan
+_email_by_username = TTLCache(maxsize=USERNAME_CACHE_SIZE,
+                              ttl=USERNAME_CACHE_TTL)
 
 class AuthService:
     def __init__(self, aws_clients: AWSClients):
         self.table = aws_clients.table
-        
-        # Initialize Supabase client
-        self.supabase_url = os.getenv("SUPABASE_URL")
-        self.supabase_key = os.getenv("SUPABASE_ANON_KEY")
-        self.supabase = supabase.create_client(self.supabase_url, self.supabase_key)
 
-    def _extract_user_data_from_supabase(self, supabase_user) -> Dict:
-        """Extract user data from Supabase user object"""
+        # Shared, process-wide Supabase Auth gateway
+        self.auth = get_auth_gateway()
+
+    def _extract_user_data_from_supabase(self, supabase_user: Dict) -> Dict:
+        """Extract user data from a Supabase user payload"""
+        metadata = supabase_user.get("user_metadata") or {}
         return {
-            "user_id": supabase_user.user.id,
-            "email": supabase_user.user.email,
-            "username": supabase_user.user.user_metadata.get("username", supabase_user.user.email.split("@")[0]),
-            "role": supabase_user.user.user_metadata.get("role", UserRole.STUDENT),
-            "student_id": supabase_user.user.user_metadata.get("student_id"),
-            "is_verified": supabase_user.user.email_confirmed_at is not None,
-            "created_at": supabase_user.user.created_at,
-            "updated_at": supabase_user.user.updated_at
+            "user_id": supabase_user["id"],
+            "email": supabase_user["email"],
+            "username": metadata.get("username", supabase_user["email"].split("@")[0]),
+            "role": metadata.get("role", UserRole.STUDENT),
+            "student_id": metadata.get("student_id"),
+            "is_verified": supabase_user.get("email_confirmed_at") is not None,
+            "created_at": supabase_user.get("created_at"),
+            "updated_at": supabase_user.get("updated_at")
         }
 
     def _format_user_session(self, user_data: Dict, access_token: str) -> Dict:
@@ -45,32 +63,26 @@ class AuthService:
             "token": access_token
         }
 
-    def register(self, username: str, email: str, password: str, 
+    async def register(self, username: str, email: str, password: str, 
                  role: UserRole = UserRole.STUDENT, 
                  student_id: Optional[str] = None) -> Dict:
         """Register a new user using Supabase Auth"""
         try:
             # Sign up with Supabase
-            auth_response = self.supabase.auth.sign_up({
-                "email": email,
-                "password": password,
-                "options": {
-                    "data": {
-                        "username": username,
-                        "role": role.value,
-                        "student_id": student_id
-                    }
-                }
+            auth_response = await self.auth.sign_up(email, password, {
+                "username": username,
+                "role": role.value,
+                "student_id": student_id
             })
             
-            if auth_response.user is None:
+            if auth_response["user"] is None:
                 raise ValueError("Registration failed")
             
             # Extract user data
-            user_data = self._extract_user_data_from_supabase(auth_response)
+            user_data = self._extract_user_data_from_supabase(auth_response["user"])
             
             # Store additional user data in DynamoDB
-            user_id = auth_response.user.id
+            user_id = auth_response["user"]["id"]
             timestamp = get_timestamp()
             
             user_item = {
@@ -81,7 +93,7 @@ class AuthService:
                 "email": email,
                 "role": role,
                 "student_id": student_id,
-                "is_verified": auth_response.user.email_confirmed_at is not None,
+                "is_verified": user_data["is_verified"],
                 "created_at": timestamp,
                 "updated_at": timestamp
             }
@@ -90,9 +102,10 @@ class AuthService:
             self.table.put_item(Item=user_item)
             
             # Handle session token based on email confirmation requirement
-            if auth_response.session and auth_response.session.access_token:
+            session = auth_response["session"]
+            if session and session.get("access_token"):
                 # User is automatically logged in (email confirmation disabled)
-                access_token = auth_response.session.access_token
+                access_token = session["access_token"]
                 return self._format_user_session(user_data, access_token)
             else:
                 # Email confirmation required - return user info without session
@@ -111,80 +124,91 @@ class AuthService:
             
             raise ValueError(f"Registration failed: {str(e)}")
 
-    def login(self, username: str, password: str) -> Dict:
+    async def login(self, username: str, password: str) -> Dict:
         """Login user with username and password using Supabase Auth"""
         try:
             # First, get the user by username to find their email
-            user_profile = self.get_user_by_username(username)
-            if not user_profile:
-                raise ValueError("Invalid username or password")
-            
-            email = user_profile["email"]
+            email = _email_by_username.get(username)
+            if email is None:
+                user_profile = self.get_user_by_username(username)
+                if not user_profile:
+                    raise ValueError("Invalid username or password")
+
+                email = user_profile["email"]
+                _email_by_username.set(username, email)
             
             # Sign in with Supabase using email (since Supabase uses email for auth)
-            auth_response = self.supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            auth_response = await self.auth.sign_in_with_password(email, password)
             
-            if auth_response.user is None:
+            if auth_response["user"] is None:
                 raise ValueError("Invalid username or password")
             
             # Check if session exists
-            if auth_response.session is None or auth_response.session.access_token is None:
+            session = auth_response["session"]
+            if session is None or session.get("access_token") is None:
                 raise ValueError("Login failed - no session created")
             
             # Extract user data
-            user_data = self._extract_user_data_from_supabase(auth_response)
+            user_data = self._extract_user_data_from_supabase(auth_response["user"])
             
-            # Update last login in DynamoDB
-            user_id = auth_response.user.id
-            try:
-                self.table.update_item(
-                    Key={"PK": user_pk(user_id), "SK": "PROFILE"},
-                    UpdateExpression="SET last_login = :last_login, updated_at = :updated_at",
-                    ExpressionAttributeValues={
-                        ":last_login": get_timestamp(),
-                        ":updated_at": get_timestamp()
-                    }
-                )
-            except:
-                # If user doesn't exist in DynamoDB, create profile
-                self._sync_user_to_dynamodb(auth_response.user)
+            # Record last login in the background; the writer creates the
+            # DynamoDB profile if the user doesn't have one yet
+            get_bookkeeping_writer(self.table).record_login(
+                user_id=user_data["user_id"],
+                timestamp=get_timestamp(),
+                profile=self._build_profile_item(auth_response["user"])
+            )
             
             # Return formatted session data
-            return self._format_user_session(user_data, auth_response.session.access_token)
+            return self._format_user_session(user_data, session["access_token"])
             
         except Exception as e:
             raise ValueError(f"Invalid username or password: {str(e)}")
 
-    def logout(self, token: str) -> bool:
+    async def logout(self, token: str) -> bool:
         """Logout user using Supabase Auth"""
+        _session_cache.pop(token_cache_key(token))
         try:
-            # Set the session token for the logout request
-            self.supabase.auth.set_session(token, None)
-            self.supabase.auth.sign_out()
+            # The token is sent with the request; no shared session is touched
+            await self.auth.sign_out(token)
             return True
         except Exception as e:
             # Even if logout fails, we can consider it successful from client perspective
             return True
 
-    def _sync_user_to_dynamodb(self, supabase_user) -> None:
+    def _build_profile_item(self, supabase_user: Dict) -> Dict:
+        """Build a DynamoDB profile item from a Supabase user payload"""
+        user_data = self._extract_user_data_from_supabase(supabase_user)
+        return {
+            "PK": user_pk(user_data["user_id"]),
+            "SK": "PROFILE",
+            **user_data,
+            "updated_at": get_timestamp()
+        }
+
+    def _sync_user_to_dynamodb(self, supabase_user: Dict) -> None:
         """Sync user data from Supabase to DynamoDB"""
+        self.table.put_item(Item=self._build_profile_item(supabase_user))
+
+    def _sync_claims_to_dynamodb(self, claims: Dict) -> Dict:
+        """Create a DynamoDB profile from verified token claims"""
+        metadata = claims.get("user_metadata") or {}
+        email = claims.get("email", "")
         timestamp = get_timestamp()
         user_item = {
-            "PK": user_pk(supabase_user.id),
+            "PK": user_pk(claims["sub"]),
             "SK": "PROFILE",
-            "user_id": supabase_user.id,
-            "username": supabase_user.user_metadata.get("username", supabase_user.email.split("@")[0]),
-            "email": supabase_user.email,
-            "role": supabase_user.user_metadata.get("role", UserRole.STUDENT),
-            "student_id": supabase_user.user_metadata.get("student_id"),
-            "is_verified": supabase_user.email_confirmed_at is not None,
-            "created_at": supabase_user.created_at,
+            "user_id": claims["sub"],
+            "username": metadata.get("username", email.split("@")[0]),
+            "email": email,
+            "role": metadata.get("role", UserRole.STUDENT),
+            "student_id": metadata.get("student_id"),
+            "is_verified": bool(metadata.get("email_verified", False)),
+            "created_at": timestamp,
             "updated_at": timestamp
         }
         self.table.put_item(Item=user_item)
+        return user_item
 
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email address from DynamoDB"""
@@ -219,29 +243,91 @@ class AuthService:
         )
         return response.get("Item")
 
-    def verify_token_and_get_user(self, token: str) -> Optional[Dict]:
-        """Verify Supabase token and return user data"""
+    async def verify_token_and_get_user(self, token: str) -> Optional[Dict]:
+        """Verify Supabase token and return user data
+
+        Tokens are verified locally against the project's JWT secret or
+        JWKS, falling back to Supabase when there is no local key for the
+        token's algorithm. The resulting session is cached until the token
+        expires (bounded by SESSION_CACHE_TTL).
+        """
+        cache_key = token_cache_key(token)
+        session = _session_cache.get(cache_key)
+        if session is not None:
+            return session
+
+        verifier = get_token_verifier()
+        if not verifier.is_configured:
+            return await self._verify_token_remotely(token)
+
+        try:
+            # May fetch the JWKS, so keep it off the event loop
+            claims = await asyncio.to_thread(verifier.verify, token)
+        except (jwt.PyJWKClientError, jwt.InvalidAlgorithmError):
+            # JWKS endpoint unreachable, or no local key for the token's
+            # algorithm (HS256 without SUPABASE_JWT_SECRET): let Supabase
+            # decide
+            return await self._verify_token_remotely(token)
+        except jwt.InvalidTokenError:
+            # Bad signature, expired, wrong audience or issuer
+            return None
+
+        user = await asyncio.to_thread(self._get_or_sync_claims_user, claims)
+        session = self._format_user_session(user, token)
+        _session_cache.set(cache_key, session,
+                           ttl=verifier.seconds_until_expiry(claims))
+        return session
+
+    def _get_or_sync_claims_user(self, claims: Dict) -> Dict:
+        """DynamoDB profile of the token's user, created from the claims
+        if there is none"""
+        user = self.get_user_by_id(claims["sub"])
+        if not user:
+            user = self._sync_claims_to_dynamodb(claims)
+        return user
+
+    async def _verify_token_remotely(self, token: str) -> Optional[Dict]:
+        """Verify token with a Supabase round trip
+
+        The session is cached for REMOTE_SESSION_CACHE_TTL seconds (or
+        until the token expires, if sooner).
+        """
         try:
             # Verify token with Supabase
-            user_response = self.supabase.auth.get_user(token)
+            supabase_user = await self.auth.get_user(token)
             
-            if not user_response.user:
+            if not supabase_user.get("id"):
                 return None
             
-            # Get user data from DynamoDB
-            user = self.get_user_by_id(user_response.user.id)
-            if not user:
-                # Sync user from Supabase if not in DynamoDB
-                self._sync_user_to_dynamodb(user_response.user)
-                user = self.get_user_by_id(user_response.user.id)
-            
-            if user:
-                return self._format_user_session(user, token)
-            
-            return None
+            user = await asyncio.to_thread(self._get_or_sync_supabase_user,
+                                           supabase_user)
         except Exception as e:
             return None
 
+        if not user:
+            return None
+
+        session = self._format_user_session(user, token)
+        ttl = REMOTE_SESSION_CACHE_TTL
+        try:
+            # Supabase has verified the token; only its expiry is read here
+            claims = jwt.decode(token, options={"verify_signature": False})
+            ttl = min(ttl, get_token_verifier().seconds_until_expiry(claims))
+        except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+            pass
+        _session_cache.set(token_cache_key(token), session, ttl=ttl)
+        return session
+
+    def _get_or_sync_supabase_user(self, supabase_user: Dict
+                                   ) -> Optional[Dict]:
+        """DynamoDB profile of a Supabase user, synced if there is none"""
+        user = self.get_user_by_id(supabase_user["id"])
+        if not user:
+            # Sync user from Supabase if not in DynamoDB
+            self._sync_user_to_dynamodb(supabase_user)
+            user = self.get_user_by_id(supabase_user["id"])
+        return user
+
     def update_user(self, user_id: str, fields: Dict) -> Optional[Dict]:
         """Update user fields in DynamoDB"""
         if not fields:
@@ -267,36 +353,31 @@ class AuthService:
         )
         return response.get("Attributes")
 
-    def change_password(self, user_id: str, current_password: str, new_password: str) -> bool:
-        """Change user password using Supabase Auth"""
+    async def change_password(self, access_token: str, new_password: str) -> bool:
+        """Change the password of the user owning ``access_token``"""
         try:
-            # Get current user session (would need to be passed from the API endpoint)
-            # For now, we'll update the password directly
-            update_response = self.supabase.auth.update_user({
+            updated_user = await self.auth.update_user(access_token, {
                 "password": new_password
             })
             
-            if update_response.user:
+            if updated_user.get("id"):
                 return True
             return False
         except Exception as e:
             raise ValueError(f"Password change failed: {str(e)}")
 
-    def resend_confirmation(self, email: str) -> bool:
+    async def resend_confirmation(self, email: str) -> bool:
         """Resend email confirmation"""
         try:
-            self.supabase.auth.resend({
-                "type": "signup",
-                "email": email
-            })
+            await self.auth.resend(email, type="signup")
             return True
         except Exception as e:
             raise ValueError(f"Failed to resend confirmation: {str(e)}")
 
-    def reset_password(self, email: str) -> bool:
+    async def reset_password(self, email: str) -> bool:
         """Send password reset email using Supabase"""
         try:
-            self.supabase.auth.reset_password_for_email(email)
+            await self.auth.reset_password_for_email(email)
             return True
         except Exception as e:
             raise ValueError(f"Password reset failed: {str(e)}")
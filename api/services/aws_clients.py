@@ -1,4 +1,6 @@
 import os
+import threading
+from typing import Dict, Optional
 
 import boto3
 from boto3.resources.base import ServiceResource
@@ -14,8 +16,9 @@ class AWSClients:
 
     def __init__(self) -> None:
         """Initialize AWS clients and resources."""
-        self.dynamodb: ServiceResource = boto3.resource("dynamodb")
-        self.s3: BaseClient = boto3.client("s3")
+        self.dynamodb: ServiceResource = boto3.resource("dynamodb",
+                                                        **client_config())
+        self.s3: BaseClient = create_s3_client()
 
         self._init_table()
         self._init_s3_bucket()
@@ -30,6 +33,11 @@ class AWSClients:
             )
 
         self.table: Table = self.dynamodb.Table(table_name)
+        # Search postings are kept out of the main table when a table is
+        # named for them, so Scans of the main table don't read them
+        self.search_table: Table = self.dynamodb.Table(
+            os.getenv("SEARCH_INDEX_TABLE") or table_name
+        )
 
     def _init_s3_bucket(self) -> None:
         """Initialize S3 bucket."""
@@ -42,6 +50,71 @@ class AWSClients:
 
         self.s3_bucket = bucket_name
 
+
+def client_config() -> Dict[str, str]:
+    """Endpoint and region every AWS client is built with.
+
+    ``AWS_ENDPOINT_URL`` points them at DynamoDB Local / LocalStack.
+    """
+    config = {}
+    endpoint_url = os.getenv("AWS_ENDPOINT_URL")
+    if endpoint_url:
+        config["endpoint_url"] = endpoint_url
+    region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
+    if region:
+        config["region_name"] = region
+    return config
+
+
+def create_s3_client() -> BaseClient:
+    """A new S3 client configured like ``AWSClients.s3``.
+
+    For processes that can't share the app's clients, such as the PDF
+    extraction workers (boto3 clients can't cross forks).
+    """
+    return boto3.client("s3", **client_config())
+
+
+STORAGE_BACKENDS = ("aws", "memory")
+
+
+def storage_backend() -> str:
+    """The backend named by ``STORAGE_BACKEND``; ``aws`` by default."""
+    return os.getenv("STORAGE_BACKEND", "aws").strip().lower()
+
+
+def create_clients() -> AWSClients:
+    """Clients for the backend named by ``STORAGE_BACKEND``.
+
+    ``aws`` (the default) talks to DynamoDB and S3; ``memory`` keeps
+    everything in this process, for local profiling and load tests.
+    """
+    backend = storage_backend()
+    if backend == "memory":
+        from services.storage import MemoryClients
+
+        return MemoryClients()
+    if backend != "aws":
+        raise ValueError(f"STORAGE_BACKEND must be one of "
+                         f"{', '.join(STORAGE_BACKENDS)}, not {backend!r}")
+    return AWSClients()
+
+
+_clients: Optional[AWSClients] = None
+_clients_lock = threading.Lock()
+
+
 # Dependency function
 def get_aws_clients() -> AWSClients:
-    return AWSClients()
\ No newline at end of file
+    """Process-wide clients, created on first use.
+
+    boto3 clients are thread-safe and pool their connections, so building
+    them once saves per-request setup; the memory backend only works if
+    every request shares it.
+    """
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                _clients = create_clients()
+    return _clients
\ No newline at end of file
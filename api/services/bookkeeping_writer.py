@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+from mypy_boto3_dynamodb.service_resource import Table
+
+from models.forum_models import user_pk
+from services.task_supervisor import get_task_supervisor
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 2.0  # seconds
+MAX_BATCH_SIZE = 25
+
+
+class BookkeepingWriter:
+    """
+    In-process background writer for login bookkeeping.
+
+    Logins only enqueue a ``last_login`` stamp. Repeated logins by the same
+    user within a flush window are coalesced into one write, and pending
+    writes are flushed in batches by the task supervisor's ``bookkeeping``
+    workers, and on shutdown through its flush hook. Users without a
+    DynamoDB profile get one created from their Supabase payload.
+    """
+
+    def __init__(self, table: Table,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 max_batch_size: int = MAX_BATCH_SIZE) -> None:
+        self.table = table
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+
+        self._pending: Dict[str, Dict] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def record_login(self, user_id: str, timestamp: str,
+                     profile: Dict) -> None:
+        """Queue a last_login update; ``profile`` is used if none exists."""
+        self._pending[user_id] = {"timestamp": timestamp, "profile": profile}
+
+        if len(self._pending) >= self.max_batch_size:
+            self._submit_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._submit_flush)
+
+    def _submit_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        if not get_task_supervisor().submit("bookkeeping", self.flush):
+            # Backlogged: keep coalescing and try again next window
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._submit_flush)
+
+    async def flush(self) -> None:
+        """Write every pending update now."""
+        while self._pending:
+            batch = {}
+            for user_id in list(self._pending)[:self.max_batch_size]:
+                batch[user_id] = self._pending.pop(user_id)
+            await asyncio.to_thread(self._write_batch, batch)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _write_batch(self, batch: Dict[str, Dict]) -> None:
+        missing_profiles = []
+        for user_id, entry in batch.items():
+            try:
+                self.table.update_item(
+                    Key={"PK": user_pk(user_id), "SK": "PROFILE"},
+                    UpdateExpression=("SET last_login = :last_login, "
+                                      "updated_at = :updated_at"),
+                    ConditionExpression="attribute_exists(PK)",
+                    ExpressionAttributeValues={
+                        ":last_login": entry["timestamp"],
+                        ":updated_at": entry["timestamp"]
+                    }
+                )
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code == "ConditionalCheckFailedException":
+                    missing_profiles.append(
+                        {**entry["profile"], "last_login": entry["timestamp"]}
+                    )
+                else:
+                    logger.error(f"Error recording login for {user_id}: {e}")
+
+        if not missing_profiles:
+            return
+
+        try:
+            with self.table.batch_writer() as writer:
+                for item in missing_profiles:
+                    writer.put_item(Item=item)
+        except ClientError as e:
+            logger.error(f"Error syncing user profiles: {e}")
+
+
+_writer: Optional[BookkeepingWriter] = None
+
+
+def get_bookkeeping_writer(table: Table) -> BookkeepingWriter:
+    """Return the process-wide writer, creating it on first use."""
+    global _writer
+    if _writer is None:
+        _writer = BookkeepingWriter(table)
+        # Pending logins are written before the process or invocation ends
+        get_task_supervisor().add_flush_hook(_writer.flush)
+    return _writer
@@ -1,9 +1,11 @@
 import uuid
 from typing import Dict, Any, List
 from botocore.exceptions import ClientError
+from services import event_bus
 from services.aws_clients import AWSClients
 from models.forum_models import get_timestamp
-from services.profanity.checker import check_text
+from services.profanity.checker import acheck_many
+from services.single_flight import single_flight
 
 
 class CommentService:
@@ -13,12 +15,11 @@ class CommentService:
     async def create_comment(self, post_id: str,
                              data: Dict[str, Any]) -> Dict[str, Any]:
         # ✅ Profanity Check
-        content_check = check_text(data["content"])
-        if content_check["has_profanity"]:
+        check = await acheck_many({"content": data["content"]})
+        if check["has_profanity"]:
             raise ValueError({
                 "error": "Profanity detected in comment",
-                "hits": content_check.get("english_hits", [])
-                + content_check.get("tagalog_hits", [])
+                "hits": check["hits"]["content"]
             })
 
         comment_id = str(uuid.uuid4())
@@ -33,9 +34,45 @@ class CommentService:
             "updated_at": get_timestamp(),
         }
         self.table.put_item(Item=item)
+        self._publish(post_id, "comment_created", item)
+        self._count_comment(post_id, 1)
         return item
 
+    def _count_comment(self, post_id: str, delta: int) -> None:
+        """Keep the post's ``comment_count`` (used for sorting) current."""
+        try:
+            resp = self.table.update_item(
+                Key={"PK": f"POST#{post_id}", "SK": "METADATA"},
+                UpdateExpression="ADD comment_count :delta",
+                ConditionExpression="attribute_exists(PK)",
+                ExpressionAttributeValues={":delta": delta},
+                ReturnValues="UPDATED_NEW"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return
+        count = {"post_id": post_id,
+                 "comment_count": resp["Attributes"]["comment_count"]}
+        for channel in (event_bus.post_channel(post_id),
+                        event_bus.FEED_CHANNEL):
+            event_bus.publish(channel, "comment_count", count)
+
+    @staticmethod
+    def _publish(post_id: str, event_type: str,
+                 comment: Dict[str, Any]) -> None:
+        event_bus.publish(event_bus.post_channel(post_id), event_type,
+                          {"post_id": post_id,
+                           **{key: value for key, value in comment.items()
+                              if key not in ("PK", "SK")}})
+
     async def get_comments(self, post_id: str) -> List[Dict[str, Any]]:
+        # Concurrent requests for one post's comments share a query
+        return await single_flight.do("get_comments",
+                                      (self.table.name, post_id),
+                                      self._query_comments, post_id)
+
+    def _query_comments(self, post_id: str) -> List[Dict[str, Any]]:
         resp = self.table.query(
             KeyConditionExpression="PK = :pk AND begins_with(SK, :sk)",
             ExpressionAttributeValues={":pk": f"POST#{post_id}",
@@ -52,12 +89,11 @@ class CommentService:
     async def update_comment(self, post_id: str, comment_id: str,
                              data: Dict[str, Any]) -> Dict[str, Any]:
         # ✅ Profanity Check
-        content_check = check_text(data["content"])
-        if content_check["has_profanity"]:
+        check = await acheck_many({"content": data["content"]})
+        if check["has_profanity"]:
             raise ValueError({
                 "error": "Profanity in updated comment",
-                "hits": content_check.get("english_hits", [])
-                + content_check.get("tagalog_hits", [])
+                "hits": check["hits"]["content"]
             })
 
         update_expr = "SET content = :c, updated_at = :u"
@@ -68,17 +104,17 @@ class CommentService:
             ExpressionAttributeValues=expr_vals,
             ReturnValues="ALL_NEW"
         )
+        self._publish(post_id, "comment_updated", resp["Attributes"])
         return resp["Attributes"]
 
     async def patch_comment(self, post_id: str, comment_id: str,
                             data: Dict[str, Any]) -> Dict[str, Any]:
         if "content" in data:
-            content_check = check_text(data["content"])
-            if content_check["has_profanity"]:
+            check = await acheck_many({"content": data["content"]})
+            if check["has_profanity"]:
                 raise ValueError({
                     "error": "Profanity in patched comment",
-                    "hits": content_check.get("english_hits", [])
-                    + content_check.get("tagalog_hits", [])
+                    "hits": check["hits"]["content"]
                 })
 
         update_parts = []
@@ -93,6 +129,7 @@ class CommentService:
             ExpressionAttributeValues=expr_vals,
             ReturnValues="ALL_NEW"
         )
+        self._publish(post_id, "comment_updated", resp["Attributes"])
         return resp["Attributes"]
 
     async def delete_comment(self, post_id: str,
@@ -101,4 +138,8 @@ class CommentService:
             Key={"PK": f"POST#{post_id}", "SK": f"COMMENT#{comment_id}"},
             ReturnValues="ALL_OLD"
         )
+        if "Attributes" in resp:
+            self._publish(post_id, "comment_deleted",
+                          {"id": resp["Attributes"]["id"]})
+            self._count_comment(post_id, -1)
         return resp.get("Attributes")
@@ -0,0 +1,359 @@
+"""
+In-process publish/subscribe for live updates.
+
+Services publish small deltas (a new vote count, a new comment, a deleted
+post) after a write succeeds; ``GET /stream`` subscribers receive the ones
+on their channels. Channels are ``feed`` for changes to the post list and
+``post:<post_id>`` for one post's votes and comments.
+
+Delivery inside a process is immediate. With several workers, a fan-out
+backend (``EVENT_BUS_BACKEND``) carries events between them:
+
+- ``memory`` (default): this process only.
+- ``dynamodb``: events are written to the ``EVENTS`` partition of the main
+  table (expiring through the ``expires_at`` TTL attribute) and every
+  worker with subscribers polls it every ``EVENT_BUS_POLL_INTERVAL``
+  seconds.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from services.aws_clients import get_aws_clients
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = "feed"
+HISTORY_SIZE = 512          # events kept for Last-Event-ID replay
+QUEUE_SIZE = 256            # events buffered per subscriber
+POLL_INTERVAL = float(os.getenv("EVENT_BUS_POLL_INTERVAL", "1"))
+EVENT_TTL = 120             # seconds events stay in the dynamodb backend
+POLL_OVERLAP = 5.0          # seconds re-read per poll to absorb clock skew
+EVENTS_PK = "EVENTS"
+
+
+def post_channel(post_id: str) -> str:
+    return f"post:{post_id}"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() \
+            else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(data: Any) -> str:
+    """JSON for an event payload; DynamoDB numbers and sets included."""
+    return json.dumps(data, default=_json_default, separators=(",", ":"))
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue of events on a set of channels.
+
+    A subscriber that falls more than ``QUEUE_SIZE`` events behind is not
+    allowed to hold up publishers: its queue is emptied and it receives a
+    single ``resync`` event telling the client to reload.
+    """
+
+    def __init__(self, bus: "EventBus", channels: Iterable[str],
+                 maxsize: int = QUEUE_SIZE) -> None:
+        self.bus = bus
+        self.channels = frozenset(channels)
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = \
+            asyncio.Queue(maxsize=maxsize)
+        self._loop = asyncio.get_running_loop()
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Queue ``event``; safe to call from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(event)
+        else:
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.drain()
+            self._queue.put_nowait({"id": event["id"], "channel": None,
+                                    "type": "resync", "data": {}})
+
+    async def get(self, timeout: Optional[float] = None
+                  ) -> Optional[Dict[str, Any]]:
+        """Next event, or None if ``timeout`` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> int:
+        """Discard queued events; returns how many there were."""
+        return len(self.get_all_nowait())
+
+    def get_all_nowait(self) -> List[Dict[str, Any]]:
+        """Every queued event, without waiting."""
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Process-wide event fan-out to subscribers, local and via ``backend``.
+
+    ``publish`` never blocks on subscribers or on the backend, and can be
+    called from request handlers and worker threads alike. The last
+    ``HISTORY_SIZE`` events are kept so a reconnecting client can resume
+    from its ``Last-Event-ID``.
+    """
+
+    def __init__(self, backend=None, history: int = HISTORY_SIZE) -> None:
+        self.origin = uuid.uuid4().hex[:12]
+        self.backend = backend or MemoryBackend()
+        self._sequence = itertools.count(1)
+        self._subscriptions: List[Subscription] = []
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._seen: Deque[str] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.backend.attach(self)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def publish(self, channel: str, event_type: str,
+                data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send ``data`` as ``event_type`` to ``channel`` subscribers."""
+        event = {
+            "id": f"{self.origin}-{next(self._sequence)}",
+            "channel": channel,
+            "type": event_type,
+            # Round-tripped so Decimals and sets are plain JSON values
+            "data": json.loads(encode(data)),
+            "origin": self.origin,
+            "published_at": time.time(),
+        }
+        self.deliver(event)
+        self.backend.publish(event)
+        return event
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Hand ``event`` to local subscribers once, whatever its origin."""
+        with self._lock:
+            if event["id"] in self._seen:
+                return
+            self._seen.append(event["id"])
+            self._history.append(event)
+            subscriptions = [subscription
+                             for subscription in self._subscriptions
+                             if event["channel"] in subscription.channels]
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def subscribe(self, channels: Iterable[str],
+                  last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Subscribe to ``channels`` from a running event loop.
+
+        With ``last_event_id``, events after it still in history are
+        queued first; if it has already dropped out of history the
+        subscriber gets a ``resync`` event instead.
+        """
+        subscription = Subscription(self, channels)
+        with self._lock:
+            if last_event_id:
+                ids = [event["id"] for event in self._history]
+                if last_event_id in ids:
+                    start = ids.index(last_event_id) + 1
+                    for event in list(self._history)[start:]:
+                        if event["channel"] in subscription.channels:
+                            subscription.offer(event)
+                else:
+                    # Resume point for the client's next reconnect
+                    latest = self._history[-1]["id"] if self._history else ""
+                    subscription.offer({"id": latest, "channel": None,
+                                        "type": "resync", "data": {}})
+            self._subscriptions.append(subscription)
+        self.backend.wake()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+class MemoryBackend:
+    """No fan-out beyond this process; the default for a single worker."""
+
+    def attach(self, bus: EventBus) -> None:
+        self.bus = bus
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        pass
+
+    def wake(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class DynamoDBBackend:
+    """
+    Fan-out between workers through the ``EVENTS`` table partition.
+
+    Published events are batched into the table off the request path.
+    While this worker has subscribers it polls for events newer than its
+    last poll (minus ``POLL_OVERLAP`` for clock skew between writers) and
+    delivers those from other workers; the bus drops repeats.
+    """
+
+    def __init__(self, table, poll_interval: float = POLL_INTERVAL,
+                 ttl: int = EVENT_TTL) -> None:
+        self.table = table
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        self._since = time.time()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, bus: EventBus) -> None:
+        self.bus = bus
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._pending_lock:
+            self._pending.append(event)
+        self.wake()
+
+    def wake(self) -> None:
+        """Start the flush/poll task if it isn't running."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self.wake)
+            return
+        if self._task is None or self._task.done():
+            self._loop = loop
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending or self.bus.has_subscribers:
+            try:
+                await self.flush()
+                if self.bus.has_subscribers:
+                    for event in await asyncio.to_thread(self._poll):
+                        self.bus.deliver(event)
+            except ClientError as e:
+                logger.error(f"Event bus backend error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def flush(self) -> None:
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        with self.table.batch_writer() as writer:
+            for event in batch:
+                writer.put_item(Item={
+                    "PK": EVENTS_PK,
+                    "SK": f"{event['published_at']:017.6f}#{event['id']}",
+                    "event": encode(event),
+                    "expires_at": int(event["published_at"]) + self.ttl,
+                })
+
+    def _poll(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        since = f"{self._since - POLL_OVERLAP:017.6f}"
+        events: List[Dict[str, Any]] = []
+        query_kwargs: Dict[str, Any] = {
+            "KeyConditionExpression": (Key("PK").eq(EVENTS_PK)
+                                       & Key("SK").gt(since)),
+        }
+        while True:
+            response = self.table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                event = json.loads(item["event"])
+                if event["origin"] != self.bus.origin:
+                    events.append(event)
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        self._since = now
+        return events
+
+    async def close(self) -> None:
+        """Write outstanding events and stop polling."""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def create_backend():
+    """Backend named by ``EVENT_BUS_BACKEND`` (``memory`` or ``dynamodb``)."""
+    backend = os.getenv("EVENT_BUS_BACKEND", "memory").lower()
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "dynamodb":
+        return DynamoDBBackend(get_aws_clients().table)
+    raise ValueError(f"Unknown EVENT_BUS_BACKEND: {backend}")
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Return the process-wide bus, creating it on first use."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus(create_backend())
+    return _bus
+
+
+def publish(channel: str, event_type: str, data: Dict[str, Any]) -> None:
+    """Publish on the process-wide bus; failures never fail the write."""
+    try:
+        get_event_bus().publish(channel, event_type, data)
+    except Exception as e:
+        logger.error(f"Error publishing {event_type} on {channel}: {e}")
+
+
+async def close_event_bus() -> None:
+    if _bus is not None:
+        await _bus.close()
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.aws_clients import AWSClients, get_aws_clients
+from services.event_bus import FEED_CHANNEL, get_event_bus
+from services.post_index import (PostFilter, PostIndex, batch_get_posts,
+                                 normalize_tag, normalize_tags)
+from services.post_snapshot import post_snapshot, vote_activity
+from services.single_flight import single_flight
+from services.task_supervisor import get_task_supervisor
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50  # the largest page /recent and /trending serve
+REFRESH_INTERVAL = float(os.getenv("FEED_SNAPSHOT_INTERVAL", "15"))
+MIN_REFRESH_INTERVAL = float(os.getenv("FEED_SNAPSHOT_MIN_INTERVAL", "1"))
+MAX_TAG_PAGES = 64
+MAX_RETRY_DELAY = 30.0  # seconds
+# Lambda freezes the process between invocations, so pages are rebuilt on
+# the request that finds them stale instead of by a background service
+BACKGROUND_REFRESH = not os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+
+PageKey = Tuple[str, Optional[str]]
+RECENT: PageKey = ("recent", None)
+TRENDING: PageKey = ("trending", None)
+
+
+class FeedPage:
+    """A precomputed front page and when it was built."""
+
+    def __init__(self, posts: List[Dict[str, Any]]) -> None:
+        self.posts = posts
+        self.built_at = time.time()
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.built_at)
+
+
+class FeedSnapshots:
+    """
+    Recent, trending and per-tag front pages, rebuilt in the background.
+
+    Requests read a prebuilt page and never wait on DynamoDB, except for
+    the first request for a page, which builds it. A supervised
+    background service applies the changes announced on the event bus's
+    ``feed`` channel, at most every ``min_interval`` seconds:
+
+    - the post snapshot is patched in place; only new and edited posts
+      are read back, with one BatchGet
+    - trending is re-ranked from the patched snapshot, without reads
+    - recent pages are queried again only when a post joins or leaves
+      them (a new or deleted post, a changed tag); vote and comment
+      counts are patched into the pages that show the post
+
+    Everything is rebuilt, and the post snapshot reloaded, at start,
+    after a ``resync`` (missed events), after a failure, and every
+    ``interval`` seconds. The periodic rebuild picks up writes this
+    worker heard no event for: those made through other workers while
+    the event bus is process-local. If DynamoDB
+    throttles or fails, the last good pages are served, their age keeps
+    growing, and the full rebuild is retried with backoff. Tag pages are
+    kept for the ``MAX_TAG_PAGES`` most recently requested tags.
+
+    Without ``background`` (on Lambda), nothing runs between requests: a
+    page older than ``interval`` is rebuilt by the request that reads it.
+    With several workers, every worker sees every change only with
+    ``EVENT_BUS_BACKEND=dynamodb``.
+    """
+
+    def __init__(self, interval: float = REFRESH_INTERVAL,
+                 min_interval: float = MIN_REFRESH_INTERVAL,
+                 max_tags: int = MAX_TAG_PAGES,
+                 background: bool = BACKGROUND_REFRESH) -> None:
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_tags = max_tags
+        self.background = background
+        self._pages: Dict[PageKey, FeedPage] = {}
+        self._tags: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._clients: Optional[AWSClients] = None
+
+    async def page(self, aws_clients: AWSClients, name: str,
+                   tag: Optional[str] = None) -> FeedPage:
+        """The current ``recent`` or ``trending`` page (``tag`` for recent
+        only)."""
+        tag = normalize_tag(tag) if tag else None
+        key = (name, tag or None)
+        if tag:
+            self._track_tag(tag)
+        page = self._pages.get(key)
+        if page is None or (not self.background and page.age > self.interval):
+            page = await single_flight.do("feed_snapshot", key, self._build,
+                                          aws_clients, key)
+        self.start(aws_clients)
+        return page
+
+    def _track_tag(self, tag: str) -> None:
+        with self._lock:
+            self._tags[tag] = None
+            self._tags.move_to_end(tag)
+            while len(self._tags) > self.max_tags:
+                evicted, _ = self._tags.popitem(last=False)
+                self._pages.pop(("recent", evicted), None)
+
+    def _build(self, aws_clients: AWSClients, key: PageKey) -> FeedPage:
+        name, tag = key
+        if name == "trending":
+            posts, _ = post_snapshot.ranked(aws_clients, vote_activity,
+                                            PAGE_SIZE)
+        else:
+            post_filter = PostFilter(tags=[tag]) if tag else None
+            posts, _ = PostIndex(aws_clients).list_posts("new", post_filter,
+                                                         limit=PAGE_SIZE)
+        page = FeedPage(posts)
+        with self._lock:
+            if tag is None or tag in self._tags:
+                self._pages[key] = page
+        return page
+
+    def refresh(self, aws_clients: AWSClients,
+                reload_posts: bool = False) -> bool:
+        """Rebuild every page now, keeping the old one if a rebuild fails.
+        Returns whether everything was rebuilt."""
+        ok = True
+        if reload_posts:
+            try:
+                post_snapshot.refresh(aws_clients)
+            except Exception as e:
+                ok = False
+                logger.warning(f"Post snapshot reload failed, serving the "
+                               f"previous one: {e}")
+        with self._lock:
+            keys = list(self._pages) or [RECENT, TRENDING]
+        return self._rebuild(aws_clients, keys) and ok
+
+    def _rebuild(self, aws_clients: AWSClients, keys) -> bool:
+        ok = True
+        for key in keys:
+            try:
+                self._build(aws_clients, key)
+            except Exception as e:
+                ok = False
+                logger.warning(f"Feed snapshot {key} refresh failed, "
+                               f"serving the previous one: {e}")
+        return ok
+
+    def apply(self, aws_clients: AWSClients,
+              events: List[Dict[str, Any]]) -> bool:
+        """Bring the post snapshot and the pages ``events`` touch up to
+        date. Returns whether everything was updated."""
+        changes: Dict[str, Optional[Dict[str, Any]]] = {}
+        reread = set()
+        for event in events:
+            data = event.get("data") or {}
+            post_id = data.get("post_id")
+            if not post_id:
+                continue
+            if event["type"] == "post_deleted":
+                changes[post_id] = None
+                reread.discard(post_id)
+            elif event["type"] in ("post_created", "post_updated"):
+                # Feed events leave out the body; read the whole item
+                reread.add(post_id)
+            elif changes.get(post_id, {}) is not None:
+                changes.setdefault(post_id, {}).update(
+                    {key: value for key, value in data.items()
+                     if key != "post_id"})
+        try:
+            posts = batch_get_posts(aws_clients, reread) if reread else {}
+        except Exception as e:
+            logger.warning(f"Feed snapshot update failed: {e}")
+            return False
+        for post_id in reread:
+            changes[post_id] = posts.get(post_id)
+
+        changed = post_snapshot.patch(aws_clients, changes)
+        if changed is None:
+            return self.refresh(aws_clients, reload_posts=True)
+
+        rebuild = {TRENDING} if changed else set()
+        patched: Dict[str, Dict[str, Any]] = {}
+        for post_id, (old, new) in changed.items():
+            before = set(normalize_tags(old.get("tags"))) if old else set()
+            after = set(normalize_tags(new.get("tags"))) if new else set()
+            if old is None or new is None:
+                # A new or deleted post joins or leaves its pages
+                rebuild.add(RECENT)
+                rebuild.update(("recent", tag) for tag in before | after)
+            else:
+                patched[post_id] = new
+                rebuild.update(("recent", tag) for tag in before ^ after)
+
+        with self._lock:
+            keys = [key for key in self._pages if key in rebuild]
+            for key, page in list(self._pages.items()):
+                if key in rebuild or not any(post.get("id") in patched
+                                             for post in page.posts):
+                    continue
+                self._pages[key] = FeedPage(
+                    [patched.get(post.get("id"), post) for post in page.posts])
+        return self._rebuild(aws_clients, keys)
+
+    def start(self, aws_clients: AWSClients) -> None:
+        """Start the background refresher if it isn't running."""
+        if not self.background:
+            return
+        self._clients = aws_clients
+        get_task_supervisor().start_service("feed_snapshots", self._run)
+
+    async def _run(self) -> None:
+        subscription = get_event_bus().subscribe([FEED_CHANNEL])
+        supervisor = get_task_supervisor()
+        events: List[Dict[str, Any]] = []
+        full = True
+        failures = 0
+        refreshed_at = 0.0
+        try:
+            while True:
+                if full:
+                    ok = await supervisor.run("cache_refresh", self.refresh,
+                                              self._clients, True)
+                    refreshed_at = time.monotonic()
+                else:
+                    ok = await supervisor.run("cache_refresh", self.apply,
+                                              self._clients, events)
+                if not ok:
+                    # Retried as a full rebuild, which covers the events
+                    # since, backing off while DynamoDB keeps failing
+                    failures += 1
+                    full = True
+                    await asyncio.sleep(min(
+                        MAX_RETRY_DELAY, self.min_interval * 2 ** failures))
+                    subscription.drain()
+                    continue
+                failures = 0
+
+                # Writes during the pause are folded into the next update
+                await asyncio.sleep(self.min_interval)
+                due = refreshed_at + self.interval - time.monotonic()
+                event = await subscription.get(timeout=due) if due > 0 \
+                    else None
+                if event is None:
+                    # Rebuild everything on schedule; it covers any events
+                    # queued since
+                    full = True
+                    subscription.drain()
+                    continue
+                events = [event] + subscription.get_all_nowait()
+                full = any(event["type"] == "resync" for event in events)
+        finally:
+            subscription.close()
+
+
+feed_snapshots = FeedSnapshots()
+
+
+async def start_feed_snapshots() -> None:
+    feed_snapshots.start(get_aws_clients())
@@ -0,0 +1,293 @@
+import argparse
+import logging
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from models.forum_models import get_timestamp, job_sk, post_pk
+from services.aws_clients import AWSClients, get_aws_clients
+
+logger = logging.getLogger(__name__)
+
+
+class JobType:
+    SUMMARY = "summary"
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+LEASE_SECONDS = 300
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+READY_PK = "JOBS#READY"
+
+
+def ready_sk(due: int, job_id: str) -> str:
+    """Sort key of a job's ready-queue entry, ordered by due time."""
+    return f"{due:010d}#{job_id}"
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given attempt count."""
+    ceiling = min(BACKOFF_MAX_SECONDS,
+                  BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class JobQueue:
+    """
+    Durable background job queue stored in the forum table.
+
+    Jobs live in their post's partition (``POST#<post_id>`` /
+    ``JOB#<job_id>``) so their status can be queried per post. Workers
+    claim a job with a conditional write that takes a time-limited lease;
+    a job whose worker dies becomes claimable again once the lease
+    expires. Failed jobs are retried with exponential backoff until they
+    run out of attempts.
+
+    Every unfinished job also has an entry in the ``JOBS#READY``
+    partition, sorted by when it is next due (its retry time, or its
+    lease expiry while it runs), so workers find due jobs with one Query
+    instead of scanning the table. The job's ``ready_sk`` names its
+    current entry; entries left behind by an interrupted worker are
+    removed the next time a claim on them fails.
+    """
+
+    def __init__(self, aws_clients: AWSClients):
+        self.table = aws_clients.table
+        self.dynamodb = aws_clients.dynamodb
+
+    def enqueue(self, post_id: str, job_type: str, payload: Dict[str, Any],
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        now = int(time.time())
+        item = {
+            "PK": post_pk(post_id),
+            "SK": job_sk(job_id),
+            "job_id": job_id,
+            "post_id": post_id,
+            "job_type": job_type,
+            "payload": payload,
+            "job_status": JobStatus.PENDING,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "next_attempt_at": now,
+            "ready_sk": ready_sk(now, job_id),
+            "created_at": get_timestamp(),
+            "updated_at": get_timestamp(),
+        }
+        # Together, so a job is never stored without its ready-queue entry
+        self.dynamodb.meta.client.transact_write_items(TransactItems=[
+            {"Put": {"TableName": self.table.name, "Item": item}},
+            {"Put": {"TableName": self.table.name,
+                     "Item": self._entry(item, item["ready_sk"])}},
+        ])
+        return item
+
+    def get_post_jobs(self, post_id: str) -> List[Dict[str, Any]]:
+        response = self.table.query(
+            KeyConditionExpression=(Key("PK").eq(post_pk(post_id))
+                                    & Key("SK").begins_with("JOB#"))
+        )
+        return response.get("Items", [])
+
+    def _claimable(self, now: int):
+        return ((Attr("job_status").eq(JobStatus.PENDING)
+                 & Attr("next_attempt_at").lte(now))
+                | (Attr("job_status").eq(JobStatus.RUNNING)
+                   & Attr("lease_until").lt(now)))
+
+    def find_ready(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` jobs that are due to run, earliest first.
+
+        The results are ready-queue references (the job's key, ``job_id``,
+        ``post_id`` and ``ready_sk``); ``claim`` returns the full job.
+        """
+        response = self.table.query(
+            KeyConditionExpression=(
+                Key("PK").eq(READY_PK)
+                & Key("SK").lt(ready_sk(int(time.time()) + 1, ""))
+            ),
+            Limit=limit,
+        )
+        return [{"PK": post_pk(entry["post_id"]),
+                 "SK": job_sk(entry["job_id"]),
+                 "job_id": entry["job_id"],
+                 "post_id": entry["post_id"],
+                 "ready_sk": entry["SK"]}
+                for entry in response.get("Items", [])]
+
+    @staticmethod
+    def _entry(job: Dict[str, Any], sk: str) -> Dict[str, Any]:
+        return {"PK": READY_PK, "SK": sk,
+                "job_id": job["job_id"], "post_id": job["post_id"]}
+
+    def _put_entry(self, job: Dict[str, Any], sk: str) -> None:
+        self.table.put_item(Item=self._entry(job, sk))
+
+    def _move_entry(self, job: Dict[str, Any], old_sk: Optional[str],
+                    new_sk: Optional[str]) -> None:
+        """Replace the job's ready-queue entry (None: no entry)."""
+        if new_sk is not None:
+            self._put_entry(job, new_sk)
+        if old_sk is not None and old_sk != new_sk:
+            self.table.delete_item(Key={"PK": READY_PK, "SK": old_sk})
+
+    def _drop_stale_entry(self, job: Dict[str, Any]) -> None:
+        """Delete the entry ``job`` was found through if the job has since
+        moved on (claimed elsewhere, finished, or rescheduled)."""
+        if not job.get("ready_sk"):
+            return
+        current = self.table.get_item(
+            Key={"PK": job["PK"], "SK": job["SK"]}
+        ).get("Item")
+        if current is None or current.get("ready_sk") != job["ready_sk"]:
+            self.table.delete_item(Key={"PK": READY_PK,
+                                        "SK": job["ready_sk"]})
+
+    def claim(self, job: Dict[str, Any],
+              worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease ``job`` for ``worker_id``; None if another worker won."""
+        now = int(time.time())
+        lease_until = now + LEASE_SECONDS
+        # Due again when the lease runs out, in case this worker dies
+        entry_sk = ready_sk(lease_until, job["job_id"])
+        try:
+            response = self.table.update_item(
+                Key={"PK": job["PK"], "SK": job["SK"]},
+                UpdateExpression=("SET job_status = :running, "
+                                  "lease_owner = :owner, "
+                                  "lease_until = :lease_until, "
+                                  "ready_sk = :ready_sk, "
+                                  "updated_at = :ts ADD attempts :one"),
+                ConditionExpression=self._claimable(now),
+                ExpressionAttributeValues={
+                    ":running": JobStatus.RUNNING,
+                    ":owner": worker_id,
+                    ":lease_until": lease_until,
+                    ":ready_sk": entry_sk,
+                    ":ts": get_timestamp(),
+                    ":one": 1,
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                self._drop_stale_entry(job)
+                return None
+            raise
+        claimed = response["Attributes"]
+        self._move_entry(claimed, job.get("ready_sk"), entry_sk)
+        return claimed
+
+    def complete(self, job: Dict[str, Any], worker_id: str,
+                 result: Optional[Dict[str, Any]] = None) -> None:
+        if self._finish(job, worker_id, {
+            ":status": JobStatus.SUCCEEDED,
+            ":result": result or {},
+        }, "SET job_status = :status, job_result = :result, updated_at = :ts "
+           "REMOVE lease_owner, lease_until, last_error, ready_sk"):
+            self._move_entry(job, job.get("ready_sk"), None)
+
+    def fail(self, job: Dict[str, Any], worker_id: str, error: str) -> None:
+        """Schedule a retry with backoff, or fail the job for good."""
+        attempts = int(job.get("attempts", 0))
+        if attempts >= int(job.get("max_attempts", DEFAULT_MAX_ATTEMPTS)):
+            status, next_attempt_at, entry_sk = JobStatus.FAILED, 0, None
+        else:
+            status = JobStatus.PENDING
+            next_attempt_at = int(time.time() + backoff_delay(attempts))
+            entry_sk = ready_sk(next_attempt_at, job["job_id"])
+
+        values = {
+            ":status": status,
+            ":error": error[:1000],
+            ":next": next_attempt_at,
+        }
+        update_expr = ("SET job_status = :status, last_error = :error, "
+                       "next_attempt_at = :next, updated_at = :ts")
+        if entry_sk is None:
+            update_expr += " REMOVE lease_owner, lease_until, ready_sk"
+        else:
+            values[":ready_sk"] = entry_sk
+            update_expr += (", ready_sk = :ready_sk "
+                            "REMOVE lease_owner, lease_until")
+        if self._finish(job, worker_id, values, update_expr):
+            self._move_entry(job, job.get("ready_sk"), entry_sk)
+
+    def _finish(self, job: Dict[str, Any], worker_id: str,
+                values: Dict[str, Any], update_expr: str) -> bool:
+        """Apply ``update_expr`` if ``worker_id`` still holds the lease."""
+        try:
+            self.table.update_item(
+                Key={"PK": job["PK"], "SK": job["SK"]},
+                UpdateExpression=update_expr,
+                ConditionExpression=Attr("lease_owner").eq(worker_id),
+                ExpressionAttributeValues={**values, ":ts": get_timestamp()},
+            )
+            return True
+        except ClientError as e:
+            # Lease lost to another worker; its outcome wins
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return False
+
+
+def rebuild_ready_queue(aws_clients: AWSClients) -> int:
+    """Give every unfinished job a ready-queue entry; return how many.
+
+    For jobs enqueued before the ready queue existed. Safe to rerun.
+    """
+    queue = JobQueue(aws_clients)
+    scan_kwargs: Dict[str, Any] = {
+        "FilterExpression": (Attr("SK").begins_with("JOB#")
+                             & Attr("job_status").is_in([JobStatus.PENDING,
+                                                         JobStatus.RUNNING]))
+    }
+    queued = 0
+
+    while True:
+        response = aws_clients.table.scan(**scan_kwargs)
+        for job in response.get("Items", []):
+            due = int(job.get("next_attempt_at") or 0)
+            if job["job_status"] == JobStatus.RUNNING:
+                due = int(job.get("lease_until") or due)
+            entry_sk = ready_sk(due, job["job_id"])
+            aws_clients.table.update_item(
+                Key={"PK": job["PK"], "SK": job["SK"]},
+                UpdateExpression="SET ready_sk = :ready_sk",
+                ExpressionAttributeValues={":ready_sk": entry_sk},
+            )
+            queue._move_entry(job, job.get("ready_sk"), entry_sk)
+            queued += 1
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    return queued
+
+
+def main() -> None:
+    """Rebuild the job ready queue: ``python -m services.job_queue``"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    argparse.ArgumentParser(description=main.__doc__).parse_args()
+
+    queued = rebuild_ready_queue(get_aws_clients())
+    logger.info(f"Queued {queued} unfinished job(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import random
+from typing import Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# OpenRouter's free models allow 20 requests per minute
+RATE_LIMIT_PER_MINUTE = float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("LLM_RATE_LIMIT_BURST", "5"))
+
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+CONNECT_TIMEOUT = 10.0
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    """Raised when a completion fails after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retryable: bool = False,
+                 retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _retry_after(error: APIStatusError) -> Optional[float]:
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry number."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+class LLMClient:
+    """
+    Process-wide async client for the OpenAI-compatible chat API.
+
+    Every call shares one pooled HTTP client and one token bucket, so
+    concurrent summaries reuse connections and stay within the provider's
+    quota together. Calls have a timeout and are retried with jittered
+    backoff on timeouts, rate limiting and server errors; anything still
+    failing raises ``LLMError``.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 timeout: float = REQUEST_TIMEOUT,
+                 max_retries: int = MAX_RETRIES) -> None:
+        if not api_key:
+            raise ValueError("AI_API_KEY environment variable is not set")
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or TokenBucket(
+            RATE_LIMIT_PER_MINUTE / 60, RATE_LIMIT_BURST
+        )
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Pooled API client, recreated if it was closed at shutdown."""
+        if self._client is None or self._client.is_closed():
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                # Retries are ours, so they also go through the rate limiter
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout,
+                                          connect=CONNECT_TIMEOUT),
+                    limits=POOL_LIMITS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def complete(self, model: str, prompt: str,
+                       timeout: Optional[float] = None) -> str:
+        """Send a single-message prompt and return the reply text."""
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                return await self._complete_once(model, prompt, timeout)
+            except LLMError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                delay = e.retry_after or _backoff_delay(attempt)
+                logger.warning(f"LLM call failed ({e}); retrying in "
+                               f"{delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _complete_once(self, model: str, prompt: str,
+                             timeout: Optional[float]) -> str:
+        try:
+            completion = await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout or self.timeout,
+            )
+        except APIStatusError as e:
+            raise LLMError(str(e), e.status_code,
+                           retryable=e.status_code in RETRYABLE_STATUS,
+                           retry_after=_retry_after(e)) from e
+        except APIConnectionError as e:
+            # Includes timeouts
+            raise LLMError(str(e), retryable=True) from e
+
+        # OpenRouter can answer 200 with no choices when upstream fails
+        if not completion.choices or not completion.choices[0].message.content:
+            raise LLMError("Empty completion", retryable=True)
+        return completion.choices[0].message.content.strip()
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            api_key=os.getenv("AI_API_KEY"),
+            base_url=os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL),
+        )
+    return _client
+
+
+async def close_llm_client() -> None:
+    if _client is not None:
+        await _client.aclose()
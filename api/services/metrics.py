@@ -0,0 +1,265 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import Counter as CallCounter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import boto3
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+CAPACITY_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+# DynamoDB operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = frozenset({
+    "GetItem", "PutItem", "UpdateItem", "DeleteItem", "Query", "Scan",
+    "BatchGetItem", "BatchWriteItem", "TransactGetItems",
+    "TransactWriteItems",
+})
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels, in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str,
+                 labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Sequence[str] = (), amount: float = 1.0) -> None:
+        key = tuple(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value of every label set."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} "
+                f"{_format_value(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, in Prometheus text format."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts + overflow, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Sequence[str], value: float) -> None:
+        key = tuple(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count)
+                            in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),),
+                                           counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket"
+                             f"{_format_labels(self.labelnames, key, le)} "
+                             f"{cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"),
+))
+aws_call_duration = registry.register(Histogram(
+    "aws_call_duration_seconds", "AWS API call latency by operation.",
+    ("service", "operation"),
+))
+aws_calls = registry.register(Counter(
+    "aws_calls_total", "AWS API calls by route and operation.",
+    ("route", "service", "operation"),
+))
+aws_calls_per_request = registry.register(Histogram(
+    "aws_calls_per_request", "AWS API calls made while serving a request.",
+    ("route", "service"), buckets=CALL_COUNT_BUCKETS,
+))
+dynamodb_capacity_per_request = registry.register(Histogram(
+    "dynamodb_consumed_capacity_per_request",
+    "DynamoDB capacity units consumed while serving a request.",
+    ("route",), buckets=CAPACITY_BUCKETS,
+))
+
+
+class RequestStats:
+    """AWS usage attributed to the request being served."""
+
+    def __init__(self) -> None:
+        self.calls: CallCounter = CallCounter()
+        self.capacity = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = \
+    contextvars.ContextVar("request_stats", default=None)
+
+
+def start_request() -> Tuple[RequestStats, contextvars.Token]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token: contextvars.Token, stats: RequestStats,
+                   method: str, route: str, status: int,
+                   duration: float) -> None:
+    _current.reset(token)
+    http_request_duration.observe((method, route, str(status)), duration)
+
+    per_service = CallCounter()
+    for (service, operation), count in stats.calls.items():
+        aws_calls.inc((route, service, operation), count)
+        per_service[service] += count
+    for service in ("dynamodb", "s3"):
+        aws_calls_per_request.observe((route, service), per_service[service])
+    if per_service["dynamodb"]:
+        dynamodb_capacity_per_request.observe((route,), stats.capacity)
+
+
+# ---------- botocore hooks ----------
+def _operation(event_name: str) -> Tuple[str, str]:
+    # e.g. "before-call.dynamodb.GetItem"
+    _, service, operation = event_name.split(".", 2)
+    return service, operation
+
+
+def _request_capacity(params, event_name, **kwargs) -> None:
+    _, operation = _operation(event_name)
+    if operation in CAPACITY_OPERATIONS:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _before_call(context, **kwargs) -> None:
+    context["metrics_started"] = time.perf_counter()
+
+
+def record_call(service: str, operation: str, duration: Optional[float],
+                capacity: float = 0.0) -> None:
+    """Count one AWS call against the request being served, if any."""
+    if duration is not None:
+        aws_call_duration.observe((service, operation), duration)
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.calls[(service, operation)] += 1
+    stats.capacity += capacity
+
+
+def _after_call(event_name, context, parsed=None, **kwargs) -> None:
+    service, operation = _operation(event_name)
+    started = context.pop("metrics_started", None)
+
+    capacity = 0.0
+    if service == "dynamodb" and parsed:
+        consumed = parsed.get("ConsumedCapacity")
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        for entry in consumed or []:
+            capacity += float(entry.get("CapacityUnits", 0))
+
+    record_call(service, operation,
+                time.perf_counter() - started if started is not None
+                else None, capacity)
+
+
+def instrument(session: Optional[boto3.session.Session] = None) -> None:
+    """Hook call counting, latency and consumed capacity into ``session``.
+
+    Clients copy their session's event hooks when created, so this must
+    run before the clients to be measured are built. Defaults to the
+    boto3 default session that ``boto3.client``/``boto3.resource`` use.
+    """
+    if session is None:
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        session = boto3.DEFAULT_SESSION
+
+    events = session.events
+    events.register("provide-client-params.dynamodb.*", _request_capacity,
+                    unique_id="metrics-capacity")
+    for service in ("dynamodb", "s3"):
+        events.register(f"before-call.{service}.*", _before_call,
+                        unique_id=f"metrics-before-{service}")
+        events.register(f"after-call.{service}.*", _after_call,
+                        unique_id=f"metrics-after-{service}")
+        events.register(f"after-call-error.{service}.*", _after_call,
+                        unique_id=f"metrics-error-{service}")
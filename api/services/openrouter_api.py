@@ -1,66 +1,141 @@
-from openai import OpenAI
-from PyPDF2 import PdfReader
+from services.llm_client import close_llm_client, get_llm_client
+from services.pdf_extractor import (MAX_CHARS, MAX_DOCUMENT_CHARS,
+                                    TRUNCATION_MARKER, extract_pages)
+from typing import List
+import asyncio
+import logging
 import os
 
-MAX_CHARS = 20_000
+logger = logging.getLogger(__name__)
+
 API_MODEL = "microsoft/mai-ds-r1:free"
+# Bump whenever the summary prompts change, so cached summaries are redone
+PROMPT_VERSION = "2"
+
+CHUNK_CHARS = MAX_CHARS
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+MAX_REDUCE_ROUNDS = 3
+
+SUMMARY_PROMPT = (
+    "Please summarize the following document "
+    "in a concise and bulleted manner and "
+    "a brief description of what it is about:\n\n{text}"
+)
+CHUNK_PROMPT = (
+    "The following is part {part} of {parts} of a longer document. "
+    "Summarize this part in concise bullet points, keeping key facts, "
+    "definitions and deadlines:\n\n{text}"
+)
+REDUCE_PROMPT = (
+    "The following are bulleted summaries of consecutive parts of one "
+    "document. Combine them into a single concise bulleted summary with "
+    "a brief description of what the document is about:\n\n{text}"
+)
+
+def summarize_pdf(pdf_path):
+    """Read PDF and get AI summary, chunking long documents.
 
-def extract_text_from_pdf(pdf):
-    """Extract text from PDF file"""
+    For scripts only (see tests/pdfsummary.py): it runs its own event
+    loop, so it raises ``RuntimeError`` if called from async code, which
+    should await ``summarize_document`` instead. Raises ``LLMError`` if
+    the model calls fail.
+    """
+
+    # Extract text from PDF
     try:
-        pdf_reader = PdfReader(pdf)
-        text = iterate_pages(pdf_reader)
+        pages = extract_pages(pdf_path, MAX_DOCUMENT_CHARS)
     except Exception as e:
-        print(f"Error opening PDF file: {e}")
-        return None
+        logger.error(f"Error opening PDF file: {e}")
+        pages = []
+    if not "".join(pages).strip():
+        return "Could not extract text from PDF"
 
-    return text
+    async def run():
+        try:
+            return await summarize_document(pages)
+        finally:
+            # The pooled client is bound to this short-lived event loop
+            await close_llm_client()
 
-def iterate_pages(pdf_reader):
-    """Iterate through PDF pages and extract text"""
-    text = ""
+    return asyncio.run(run())
 
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
+async def complete(prompt):
+    """Send a single-message prompt to the model and return its reply.
 
-    return text
+    Raises ``LLMError`` once the client's retries are exhausted.
+    """
+    return await get_llm_client().complete(API_MODEL, prompt)
 
-def summarize_pdf(pdf_path):
-    """Read PDF and get AI summary"""
+# =========================
+# |  MAP-REDUCE SUMMARY   |
+# =========================
+def chunk_pages(pages: List[str], chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """Group consecutive pages into chunks of at most ``chunk_chars``.
 
-    # Setup API key and client
-    ai_api_key = os.getenv("AI_API_KEY")
-    if not ai_api_key:
-        raise ValueError("AI_API_KEY environment variable is not set")
+    Chunks break on page boundaries; a single page longer than the limit
+    is split on its own.
+    """
+    chunks = []
+    current = ""
 
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=ai_api_key,
-    )
+    for page in pages:
+        while len(page) > chunk_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(page[:chunk_chars])
+            page = page[chunk_chars:]
 
-    # Extract text from PDF
-    pdf_text = extract_text_from_pdf(pdf_path)
-    if not pdf_text:
-        return "Could not extract text from PDF"
+        if len(current) + len(page) > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current += page
 
-    # Truncate text if too long
-    if len(pdf_text) > MAX_CHARS:
-        pdf_text = pdf_text[:MAX_CHARS] + "..."
+    if current.strip():
+        chunks.append(current)
+    return chunks
 
-    message = [
-        {
-            "role": "user",
-            "content": f"Please summarize the following document"
-                    f"in a concise and bulleted manner and "
-                    f"a brief description of what it is about:\n\n{pdf_text}"
-        },
-    ]
+async def summarize_document(pages: List[str],
+                             concurrency: int = SUMMARY_CONCURRENCY) -> str:
+    """Summarize a document of any length with bounded parallel calls.
 
-    try:
-        completion = client.chat.completions.create(
-            model=API_MODEL,
-            messages=message
-        )
-        return completion.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error during API call: {e}"
\ No newline at end of file
+    Short documents take one call. Longer ones are split into page-aligned
+    chunks that are summarized concurrently (at most ``concurrency`` calls
+    in flight), then the partial summaries are reduced into one.
+
+    Raises ``LLMError`` if any model call fails.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(prompt):
+        async with slots:
+            return await complete(prompt)
+
+    chunks = chunk_pages(pages)
+    if not chunks:
+        raise ValueError("Document has no text to summarize")
+    if len(chunks) == 1:
+        return await run(SUMMARY_PROMPT.format(text=chunks[0]))
+
+    partials = await asyncio.gather(*(
+        run(CHUNK_PROMPT.format(part=index, parts=len(chunks), text=chunk))
+        for index, chunk in enumerate(chunks, 1)
+    ))
+
+    # Reduce; very long documents may need more than one round, but
+    # summaries that don't shrink are cut short after MAX_REDUCE_ROUNDS
+    for _ in range(MAX_REDUCE_ROUNDS - 1):
+        groups = chunk_pages([partial + "\n\n" for partial in partials])
+        if len(groups) == 1:
+            return await run(REDUCE_PROMPT.format(text=groups[0]))
+        partials = await asyncio.gather(*(
+            run(REDUCE_PROMPT.format(text=group)) for group in groups
+        ))
+
+    text = "".join(partial + "\n\n" for partial in partials)
+    if len(text) > CHUNK_CHARS:
+        logger.warning(f"Partial summaries still {len(text)} characters "
+                       f"after {MAX_REDUCE_ROUNDS - 1} reduce rounds; "
+                       f"truncating")
+        text = text[:CHUNK_CHARS] + TRUNCATION_MARKER
+    return await run(REDUCE_PROMPT.format(text=text))
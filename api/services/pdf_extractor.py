@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import IO, Iterator, List, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+from services import metrics
+from services.aws_clients import (create_s3_client, get_aws_clients,
+                                  storage_backend)
+from services.process_pool import process_pools
+
+MAX_CHARS = 20_000
+MAX_DOCUMENT_CHARS = 200_000  # budget for chunked (map-reduce) summaries
+MAX_PDF_BYTES = 15 * 1024 * 1024  # same limit as attachment uploads
+SPOOL_MAX_SIZE = 5 * 1024 * 1024  # bytes kept in memory before spilling
+STREAM_CHUNK_SIZE = 256 * 1024
+TRUNCATION_MARKER = "..."
+
+POOL_NAME = "pdf"
+POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", "2"))
+
+_s3_client = None
+_s3_client_pid: Optional[int] = None
+
+
+def _get_s3_client():
+    """S3 client for the current process, configured like the app's
+    (clients can't cross forks)."""
+    global _s3_client, _s3_client_pid
+    if _s3_client is None or _s3_client_pid != os.getpid():
+        _s3_client = create_s3_client()
+        _s3_client_pid = os.getpid()
+    return _s3_client
+
+
+def _init_worker() -> None:
+    """Process pool initializer: count the worker's S3 calls like the
+    app's, which needs the hooks before its client is built."""
+    metrics.instrument()
+
+
+def iter_page_texts(pdf: IO[bytes]) -> Iterator[str]:
+    """Yield the text of each page, parsing pages only as they are read."""
+    for page in PdfReader(pdf).pages:
+        yield page.extract_text() or ""
+
+
+def extract_pages(pdf: IO[bytes], max_chars: int = MAX_CHARS) -> List[str]:
+    """Extract page texts totalling at most ``max_chars`` characters.
+
+    Parsing stops as soon as the budget is reached; the last page is cut
+    short and marked as truncated.
+    """
+    pages = []
+    remaining = max_chars
+
+    for page_text in iter_page_texts(pdf):
+        if len(page_text) + 1 > remaining:
+            pages.append(page_text[:remaining] + TRUNCATION_MARKER)
+            break
+        pages.append(page_text + "\n")
+        remaining -= len(page_text) + 1
+
+    return pages
+
+
+def extract_text(pdf: IO[bytes], max_chars: int = MAX_CHARS) -> str:
+    """Extract at most ``max_chars`` characters, stopping at the budget."""
+    return "".join(extract_pages(pdf, max_chars))
+
+
+def download_to_buffer(s3, bucket: str, key: str,
+                       max_bytes: int = MAX_PDF_BYTES,
+                       digest=None) -> IO[bytes]:
+    """Stream an S3 object into a bounded, seekable spooled buffer.
+
+    If ``digest`` (a hashlib object) is given it is fed every chunk.
+    """
+    response = s3.get_object(Bucket=bucket, Key=key)
+    if response.get("ContentLength", 0) > max_bytes:
+        raise ValueError(f"Attachment {key} exceeds {max_bytes} bytes")
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    size = 0
+    try:
+        for chunk in response["Body"].iter_chunks(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Attachment {key} exceeds {max_bytes} bytes")
+            buffer.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+
+    buffer.seek(0)
+    return buffer
+
+
+def extract_s3_pdf_pages(bucket: str, key: str,
+                         max_chars: int = MAX_DOCUMENT_CHARS,
+                         s3=None) -> Tuple[List[str], str]:
+    """Stream a PDF from S3 and extract up to ``max_chars`` of its pages.
+
+    Returns the page texts and the SHA-256 hex digest of the object bytes.
+    Uses this process's own S3 client unless ``s3`` is given.
+    """
+    digest = hashlib.sha256()
+    with download_to_buffer(s3 or _get_s3_client(), bucket, key,
+                            digest=digest) as pdf:
+        return extract_pages(pdf, max_chars), digest.hexdigest()
+
+
+async def extract_s3_pdf_pages_async(bucket: str, key: str,
+                                     max_chars: int = MAX_DOCUMENT_CHARS
+                                     ) -> Tuple[List[str], str]:
+    """``extract_s3_pdf_pages`` in a worker process, off the event loop."""
+    if storage_backend() != "aws":
+        # Worker processes can't see this process's in-memory objects
+        return await asyncio.to_thread(extract_s3_pdf_pages, bucket, key,
+                                       max_chars, get_aws_clients().s3)
+    return await process_pools.run(POOL_NAME, POOL_WORKERS, _init_worker,
+                                   extract_s3_pdf_pages, bucket, key,
+                                   max_chars)
@@ -0,0 +1,346 @@
+import argparse
+import base64
+import heapq
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Key
+from dotenv import load_dotenv
+
+from models.forum_models import post_pk, timeline_sk, user_pk
+from services.aws_clients import AWSClients, get_aws_clients
+from services.post_snapshot import SORT_SCORES, post_snapshot
+
+logger = logging.getLogger(__name__)
+
+FEED_PK = "FEED"
+BATCH_GET_SIZE = 100
+MAX_FILTER_TAGS = 5
+MAX_QUERIES_PER_PAGE = 10  # read budget for filtered timeline pages
+
+SORTS = ("new",) + tuple(SORT_SCORES)
+
+
+def tag_pk(tag: str) -> str:
+    return f"TAG#{tag}"
+
+
+def author_pk(author_id: str) -> str:
+    return f"AUTHOR#{user_pk(author_id)}"
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lower()
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    return list(dict.fromkeys(normalize_tag(tag) for tag in tags or []
+                              if normalize_tag(tag)))
+
+
+def index_sk(post: Dict[str, Any]) -> str:
+    """Time-ordered sort key shared by every index partition."""
+    return timeline_sk(post["created_at"], post["id"])
+
+
+def has_attachments(post: Dict[str, Any]) -> bool:
+    """Whether a post (or its index item) has attachments."""
+    if "has_attachments" in post:
+        return bool(post["has_attachments"])
+    return bool(post.get("attachments")) or int(
+        post.get("attachment_count") or 0
+    ) > 0
+
+
+def normalize_since(since: Optional[datetime]) -> Optional[str]:
+    """``since`` as a timestamp comparable with stored ``created_at``."""
+    if since is None:
+        return None
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since.astimezone(timezone.utc).isoformat()
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(
+        json.dumps(position).encode("utf-8")
+    ).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Position encoded in ``cursor``; ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(position, dict) or "sk" not in position:
+            raise ValueError
+        return position
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def batch_get_posts(aws_clients: AWSClients,
+                    post_ids: Iterable[str]) -> Dict[str, Dict]:
+    """BatchGet post items, keyed by post id."""
+    table = aws_clients.table
+    keys = [{"PK": post_pk(post_id), "SK": "METADATA"}
+            for post_id in dict.fromkeys(post_ids)]
+    posts: Dict[str, Dict] = {}
+
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table.name: {"Keys": keys[start:start + BATCH_GET_SIZE]}}
+        while request:
+            response = aws_clients.dynamodb.batch_get_item(
+                RequestItems=request
+            )
+            for item in response["Responses"].get(table.name, []):
+                posts[item["id"]] = item
+            request = response.get("UnprocessedKeys")
+
+    return posts
+
+
+class BudgetExhausted(Exception):
+    """A filtered timeline page used up its Query budget."""
+
+
+class QueryBudget:
+    """Number of Queries one listing page may still issue."""
+
+    def __init__(self, queries: int) -> None:
+        self.remaining = queries
+
+    def spend(self) -> None:
+        if self.remaining <= 0:
+            raise BudgetExhausted
+        self.remaining -= 1
+
+
+class PostFilter:
+    """Filters shared by every way of listing posts."""
+
+    def __init__(self, tags: Optional[List[str]] = None,
+                 author: Optional[str] = None,
+                 has_attachments: Optional[bool] = None,
+                 since: Optional[datetime] = None) -> None:
+        self.tags = normalize_tags(tags)
+        if len(self.tags) > MAX_FILTER_TAGS:
+            raise ValueError(f"At most {MAX_FILTER_TAGS} tags can be "
+                             "combined")
+        self.author = author
+        self.has_attachments = has_attachments
+        self.since = normalize_since(since)
+
+    def matches(self, post: Dict[str, Any]) -> bool:
+        """Whether a post (or one of its index items) passes the filter."""
+        if self.author and post.get("author_id") != self.author:
+            return False
+        if self.tags and not set(self.tags) & set(
+                normalize_tags(post.get("tags"))):
+            return False
+        if (self.has_attachments is not None
+                and has_attachments(post) != self.has_attachments):
+            return False
+        if self.since and post["created_at"] <= self.since:
+            return False
+        return True
+
+
+class PostIndex:
+    """
+    Fan-out index items that let posts be listed with Queries.
+
+    Every post gets an item in the ``FEED`` partition, its author's
+    ``AUTHOR#USER#<id>`` partition and one ``TAG#<tag>`` partition per tag,
+    all with the sort key ``<created_at>#<post_id>`` so partitions read
+    newest first. Items carry the attributes the list filters need, and
+    pages are resolved with one BatchGet. Orders that depend on votes or
+    comments change too often to index and are ranked from the shared
+    post snapshot instead.
+    """
+
+    def __init__(self, aws_clients: AWSClients):
+        self.clients = aws_clients
+        self.table = aws_clients.table
+
+    # ---------- Writes ----------
+    @staticmethod
+    def _partitions(post: Dict[str, Any]) -> set:
+        partitions = {FEED_PK, author_pk(post["author_id"])}
+        partitions.update(tag_pk(tag) for tag in normalize_tags(post.get("tags")))
+        return partitions
+
+    @staticmethod
+    def _projection(post: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "post_id": post["id"],
+            "created_at": post["created_at"],
+            "author_id": post["author_id"],
+            "tags": normalize_tags(post.get("tags")),
+            "has_attachments": has_attachments(post),
+        }
+
+    def add_post(self, post: Dict[str, Any]) -> None:
+        self.update_post(None, post)
+
+    def update_post(self, old: Optional[Dict[str, Any]],
+                    new: Optional[Dict[str, Any]]) -> None:
+        """Bring index items in line with a post's change ``old -> new``.
+
+        Either side may be None, for a created or deleted post.
+        """
+        before = self._partitions(old) if old else set()
+        after = self._partitions(new) if new else set()
+        projection = self._projection(new) if new else None
+
+        writes = after
+        if old and new and projection == self._projection(old):
+            writes = after - before  # unchanged items stay as they are
+
+        with self.table.batch_writer(overwrite_by_pkeys=["PK", "SK"]) as batch:
+            for pk in before - after:
+                batch.delete_item(Key={"PK": pk, "SK": index_sk(old)})
+            for pk in writes:
+                batch.put_item(Item={"PK": pk, "SK": index_sk(new),
+                                     **projection})
+
+    def remove_post(self, post: Dict[str, Any]) -> None:
+        self.update_post(post, None)
+
+    # ---------- Queries ----------
+    def _iter_partition(self, pk: str, before: Optional[str],
+                        since: Optional[str], page_size: int,
+                        budget: "QueryBudget") -> Iterator[Dict[str, Any]]:
+        """Newest-first items of a partition between ``since`` and
+        ``before``, read a page at a time while ``budget`` lasts."""
+        if before and since:
+            condition = Key("PK").eq(pk) & Key("SK").between(since, before)
+        elif before:
+            condition = Key("PK").eq(pk) & Key("SK").lt(before)
+        elif since:
+            condition = Key("PK").eq(pk) & Key("SK").gt(since)
+        else:
+            condition = Key("PK").eq(pk)
+        query_kwargs = {"KeyConditionExpression": condition,
+                        "ScanIndexForward": False, "Limit": page_size}
+
+        while True:
+            budget.spend()
+            response = self.table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                if item["SK"] != before:  # between() is inclusive
+                    yield item
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                return
+            query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def _timeline(self, post_filter: PostFilter, limit: int,
+                  before: Optional[str]
+                  ) -> Tuple[List[Dict[str, Any]], Optional[Dict]]:
+        """Newest-first page from the narrowest partition(s) that cover
+        the filter; the rest of the filter is applied to index items."""
+        if post_filter.author:
+            partitions = [author_pk(post_filter.author)]
+        elif post_filter.tags:
+            partitions = [tag_pk(tag) for tag in post_filter.tags]
+        else:
+            partitions = [FEED_PK]
+
+        budget = QueryBudget(MAX_QUERIES_PER_PAGE)
+        merged = heapq.merge(
+            *(self._iter_partition(pk, before, post_filter.since, limit + 1,
+                                   budget)
+              for pk in partitions),
+            key=lambda item: item["SK"], reverse=True,
+        )
+
+        page: List[Dict[str, Any]] = []
+        last_sk = None
+        try:
+            for item in merged:
+                if item["SK"] == last_sk:
+                    continue  # same post under several of the tags
+                last_sk = item["SK"]
+                if not post_filter.matches(item):
+                    continue
+                if len(page) == limit:
+                    return page, {"sk": page[-1]["SK"]}
+                page.append(item)
+        except BudgetExhausted:
+            # Resume after the last item examined, matched or not
+            return page, {"sk": last_sk} if last_sk else None
+        return page, None
+
+    def list_posts(self, sort: str = "new",
+                   post_filter: Optional[PostFilter] = None,
+                   limit: int = 20, cursor: Optional[str] = None
+                   ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of posts in ``sort`` order, and the next page's cursor.
+
+        ``new`` pages are read from the index partitions with Queries;
+        ``top``, ``hot`` and ``commented`` are ranked from the post
+        snapshot with a bounded heap. The cursor is None on the last page.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        post_filter = post_filter or PostFilter()
+        position = decode_cursor(cursor) if cursor else None
+
+        if sort == "new":
+            items, next_position = self._timeline(
+                post_filter, limit, position["sk"] if position else None
+            )
+            posts = batch_get_posts(self.clients,
+                                    [item["post_id"] for item in items])
+            page = [posts[item["post_id"]] for item in items
+                    if item["post_id"] in posts]
+        else:
+            score = SORT_SCORES[sort]
+            after = ((position["score"], position["sk"])
+                     if position and "score" in position else None)
+            page, more = post_snapshot.ranked(self.clients, score, limit,
+                                              post_filter.matches, after)
+            next_position = None
+            if more and page:
+                next_position = {"score": score(page[-1]),
+                                 "sk": index_sk(page[-1])}
+
+        return page, encode_cursor(next_position) if next_position else None
+
+
+def rebuild_index(aws_clients: AWSClients) -> int:
+    """Write index items for every post; return how many were indexed."""
+    index = PostIndex(aws_clients)
+    scan_kwargs: Dict[str, Any] = {
+        "FilterExpression": "begins_with(PK, :pk) AND SK = :sk",
+        "ExpressionAttributeValues": {":pk": "POST#", ":sk": "METADATA"},
+    }
+    indexed = 0
+
+    while True:
+        response = aws_clients.table.scan(**scan_kwargs)
+        for post in response.get("Items", []):
+            index.add_post(post)
+            indexed += 1
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    return indexed
+
+
+def main() -> None:
+    """Rebuild the post index: ``python -m services.post_index``"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    argparse.ArgumentParser(description=main.__doc__).parse_args()
+
+    indexed = rebuild_index(get_aws_clients())
+    logger.info(f"Indexed {indexed} post(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,130 @@
+import asyncio
+import logging
+
 from botocore.exceptions import ClientError
+from services import event_bus
 from services.aws_clients import AWSClients
 from models.forum_models import PostModel, post_pk, get_timestamp
-from services.profanity.checker import check_text
-from services.openrouter_api import summarize_pdf
-from asyncio import create_task
+from services.profanity.checker import acheck_many
+from services.job_queue import JobQueue, JobType
+from services.post_index import PostFilter, PostIndex
+from services.search_index import SearchIndex
+from services.single_flight import single_flight
+from services.task_supervisor import get_task_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Too large to push to every feed subscriber; clients load it on demand
+FEED_OMITTED_FIELDS = {"PK", "SK", "content", "summary"}
+
+
+def publish_post_event(event_type: str, post_id: str, fields: dict) -> None:
+    """ Send a post change to its own channel and, minus the body, to the
+    feed """
+    data = {"post_id": post_id, **fields}
+    event_bus.publish(event_bus.post_channel(post_id), event_type,
+                      {key: value for key, value in data.items()
+                       if key not in ("PK", "SK")})
+    event_bus.publish(event_bus.FEED_CHANNEL, event_type,
+                      {key: value for key, value in data.items()
+                       if key not in FEED_OMITTED_FIELDS})
 
 class PostService:
     def __init__(self, aws_clients: AWSClients):
         self.table = aws_clients.table
-        self._tasks = []
+        self.jobs = JobQueue(aws_clients)
+        self.post_index = PostIndex(aws_clients)
+        self.search_index = SearchIndex(aws_clients)
 
-    def create_post(self, author_id: str, title: str, content: str,
+    async def _index(self, post_id: str, fields: dict) -> None:
+        """ Update the post's search postings off the request path; the
+        post is already written, so indexing errors don't fail the request """
+        supervisor = get_task_supervisor()
+        if not fields or supervisor.submit(
+                "search_index", self.search_index.index_post, post_id, fields):
+            return
+        if not supervisor.draining:
+            # Never hold the request for the queue; `python -m
+            # services.search_index` brings skipped posts up to date
+            logger.warning(f"Search index queue full, post {post_id} not "
+                           f"reindexed")
+            return
+        try:
+            # Shutting down: index inline rather than lose the update
+            await asyncio.to_thread(self.search_index.index_post, post_id,
+                                    fields)
+        except ClientError as e:
+            logger.error(f"Error indexing post {post_id}: {e}")
+
+    async def create_post(self, author_id: str, title: str, content: str,
                     tags=None, attachments=None, is_anonymous=False):
 
         # ✅ Profanity Check
-        title_check = check_text(title)
-        content_check = check_text(content)
-        if title_check["has_profanity"] or content_check["has_profanity"]:
+        check = await acheck_many({"title": title, "content": content})
+        if check["has_profanity"]:
             raise ValueError({
                 "error": "Profanity detected in post creation",
-                "title_hits": title_check.get("english_hits", []) +
-                title_check.get("tagalog_hits", []),
-                "content_hits": content_check.get("english_hits", []) +
-                content_check.get("tagalog_hits", [])
+                "title_hits": check["hits"]["title"],
+                "content_hits": check["hits"]["content"]
             })
 
         post = PostModel(author_id, title, content, tags,
                          attachments, is_anonymous)
         try:
-            self.table.put_item(Item=post.to_item())
-            return {"message": "Post created successfully",
-                    "post_id": post.post_id}
+            item = post.to_item()
+            self.table.put_item(Item=item)
+            self.post_index.add_post(item)
+            publish_post_event("post_created", post.post_id, item)
         except ClientError as e:
             raise RuntimeError(f"Error creating post: {e}")
+
+        await self._index(post.post_id, {"title": title, "content": content})
+        return {"message": "Post created successfully",
+                "post_id": post.post_id}
         
-    def add_summary(self, post_id: str, attachments: list):
-        if not attachments:
+    def add_summary(self, post_id: str, attachments: list,
+                    digests: dict = None):
+        """ Queue summary jobs for the post's PDF attachments (S3 keys)
+
+        ``digests`` optionally maps S3 keys to the SHA-256 of their bytes,
+        letting the worker reuse a cached summary without downloading.
+        """
+        digests = digests or {}
+        pdf_keys = [key for key in attachments or []
+                    if isinstance(key, str) and key.lower().endswith(".pdf")]
+        if not pdf_keys:
             return {"message": "No attachments to summarize"}
-        
-        task = create_task(self.process_summary(post_id, attachments))
-        self._tasks.append(task)
-        task.add_done_callback(lambda t: self._tasks.remove(t))
 
-    async def process_summary(self, post_id, attachments):
-        """ Generate summary for the post attachments asynchronously """
         try:
-            summary = await summarize_pdf(attachments)
-            await self.patch_post(
-                post_id=post_id,
-                fields={"summary": summary}
-            )
-        except Exception as e:
-            print(f"Error generating summary: {str(e)}")
+            jobs = [self.jobs.enqueue(post_id, JobType.SUMMARY,
+                                      {"s3_key": key,
+                                       "sha256": digests.get(key)})
+                    for key in pdf_keys]
+            return {"message": "Summary queued",
+                    "job_ids": [job["job_id"] for job in jobs]}
+        except ClientError as e:
+            raise RuntimeError(f"Error queueing summary: {e}")
+
+    def get_summary_status(self, post_id: str):
+        """ Summary and summary job status of a post """
+        post = self.get_post(post_id)
+        if not post:
+            return None
+
+        jobs = [
+            {
+                "job_id": job["job_id"],
+                "status": job["job_status"],
+                "attempts": job.get("attempts", 0),
+                "last_error": job.get("last_error"),
+                "attachment": job.get("payload", {}).get("s3_key"),
+                "updated_at": job.get("updated_at"),
+            }
+            for job in self.jobs.get_post_jobs(post_id)
+            if job.get("job_type") == JobType.SUMMARY
+        ]
+        return {"post_id": post_id, "summary": post.get("summary"),
+                "jobs": jobs}
     
     def get_posts(self):
         try:
@@ -63,6 +136,18 @@ class PostService:
         except ClientError as e:
             raise RuntimeError(f"Error fetching posts: {e}")
 
+    def list_posts(self, sort: str = "new", tags=None, author: str = None,
+                   has_attachments: bool = None, since=None,
+                   limit: int = 20, cursor: str = None):
+        """ One page of posts in ``sort`` order matching the filters, and
+        the cursor of the next page """
+        post_filter = PostFilter(tags=tags, author=author,
+                                 has_attachments=has_attachments, since=since)
+        try:
+            return self.post_index.list_posts(sort, post_filter, limit, cursor)
+        except ClientError as e:
+            raise RuntimeError(f"Error fetching posts: {e}")
+
     def get_post(self, post_id: str):
         try:
             response = self.table.get_item(Key={"PK": post_pk(post_id),
@@ -71,24 +156,40 @@ class PostService:
         except ClientError as e:
             raise RuntimeError(f"Error fetching post: {e}")
 
-    def update_post(self, post_id: str, title: str, content: str,
+    async def aget_post(self, post_id: str):
+        """ ``get_post`` off the event loop, sharing one read between
+        concurrent requests for the same post """
+        return await single_flight.do("get_post", (self.table.name, post_id),
+                                      self.get_post, post_id)
+
+    async def update_post(self, post_id: str, title: str, content: str,
                     tags=None, attachments=None, is_anonymous=False):
         existing = self.get_post(post_id)
         if not existing:
             return {"error": "Post not found"}
 
-        # ✅ Profanity Check
-        title_check = check_text(title)
-        content_check = check_text(content)
-        if title_check["has_profanity"] or content_check["has_profanity"]:
+        # ✅ Profanity Check (only fields that actually changed)
+        changed = {
+            field: value
+            for field, value in (("title", title), ("content", content))
+            if value != existing.get(field)
+        }
+        check = await acheck_many(changed)
+        if check["has_profanity"]:
             raise ValueError({
                 "error": "Profanity detected in update",
-                "title_hits": title_check.get("english_hits", [])
-                + title_check.get("tagalog_hits", []),
-                "content_hits": content_check.get("english_hits", [])
-                + content_check.get("tagalog_hits", [])
+                "title_hits": check["hits"].get("title", []),
+                "content_hits": check["hits"].get("content", [])
             })
 
+        fields = {
+            "title": title,
+            "content": content,
+            "tags": tags or [],
+            "attachments": attachments or [],
+            "is_anonymous": is_anonymous,
+            "updated_at": get_timestamp()
+        }
         try:
             self.table.update_item(
                 Key={"PK": post_pk(post_id), "SK": "METADATA"},
@@ -96,41 +197,39 @@ class PostService:
                                   "tags = :tags, attachments = :attachments, "
                                   "is_anonymous = :anon, updated_at = :ts"),
                 ExpressionAttributeValues={
-                    ":title": title,
-                    ":content": content,
-                    ":tags": tags or [],
-                    ":attachments": attachments or [],
-                    ":anon": is_anonymous,
-                    ":ts": get_timestamp()
+                    ":title": fields["title"],
+                    ":content": fields["content"],
+                    ":tags": fields["tags"],
+                    ":attachments": fields["attachments"],
+                    ":anon": fields["is_anonymous"],
+                    ":ts": fields["updated_at"]
                 }
             )
-            return {"message": "Post updated successfully"}
+            self.post_index.update_post(existing, {**existing, **fields})
+            publish_post_event("post_updated", post_id, fields)
         except ClientError as e:
             raise RuntimeError(f"Error updating post: {e}")
 
-    def patch_post(self, post_id: str, updates: dict):
+        await self._index(post_id, changed)
+        return {"message": "Post updated successfully"}
+
+    async def patch_post(self, post_id: str, updates: dict):
         existing = self.get_post(post_id)
         if not existing:
             return {"error": "Post not found"}
 
         # ✅ Profanity Check on updated fields
-        if "title" in updates:
-            title_check = check_text(updates["title"])
-            if title_check["has_profanity"]:
-                raise ValueError({
-                    "error": "Profanity in title",
-                    "hits": title_check.get("english_hits", [])
-                    + title_check.get("tagalog_hits", [])
-                })
-
-        if "content" in updates:
-            content_check = check_text(updates["content"])
-            if content_check["has_profanity"]:
-                raise ValueError({
-                    "error": "Profanity in content",
-                    "hits": content_check.get("english_hits", [])
-                    + content_check.get("tagalog_hits", [])
-                })
+        changed = {
+            field: updates[field] for field in ("title", "content")
+            if field in updates and updates[field] != existing.get(field)
+        }
+        check = await acheck_many(changed)
+        if check["has_profanity"]:
+            field = check["flagged"][0]
+            raise ValueError({
+                "error": f"Profanity in {field}",
+                "hits": check["hits"][field]
+            })
 
         update_parts = []
         expr_vals = {":ts": get_timestamp()}
@@ -147,10 +246,15 @@ class PostService:
                 UpdateExpression=update_expr,
                 ExpressionAttributeValues=expr_vals
             )
-            return {"message": "Post patched successfully"}
+            self.post_index.update_post(existing, {**existing, **updates})
+            publish_post_event("post_updated", post_id,
+                               {**updates, "updated_at": expr_vals[":ts"]})
         except ClientError as e:
             raise RuntimeError(f"Error patching post: {e}")
 
+        await self._index(post_id, changed)
+        return {"message": "Post patched successfully"}
+
     def delete_post(self, post_id: str):
         existing = self.get_post(post_id)
         if not existing:
@@ -159,6 +263,12 @@ class PostService:
         try:
             self.table.delete_item(Key={"PK": post_pk(post_id),
                                         "SK": "METADATA"})
+            self.post_index.remove_post(existing)
+            # Postings left behind are harmless: search skips missing posts
+            get_task_supervisor().submit("search_index",
+                                         self.search_index.remove_post,
+                                         post_id)
+            publish_post_event("post_deleted", post_id, {})
             return {"message": "Post deleted successfully"}
         except ClientError as e:
             raise RuntimeError(f"Error deleting post: {e}")
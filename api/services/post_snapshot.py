@@ -0,0 +1,152 @@
+import heapq
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.forum_models import timeline_sk
+from services.aws_clients import AWSClients
+from services.cache import TTLCache
+
+SNAPSHOT_TTL = float(os.getenv("POST_SNAPSHOT_TTL", "30"))  # seconds
+HOT_DECAY_SECONDS = 45000  # one order of magnitude of votes per 12.5 hours
+
+
+def _number(value: Any) -> float:
+    return float(value or 0)
+
+
+def vote_score(post: Dict[str, Any]) -> float:
+    return _number(post.get("upvotes")) - _number(post.get("downvotes"))
+
+
+def vote_activity(post: Dict[str, Any]) -> float:
+    return _number(post.get("upvotes")) + _number(post.get("downvotes"))
+
+
+def hot_score(post: Dict[str, Any]) -> float:
+    """Vote score on a log scale, offset by age so newer posts rise."""
+    score = vote_score(post)
+    order = math.log10(max(abs(score), 1))
+    sign = (score > 0) - (score < 0)
+    created = datetime.fromisoformat(post["created_at"]).timestamp()
+    return round(sign * order + created / HOT_DECAY_SECONDS, 7)
+
+
+def comment_score(post: Dict[str, Any]) -> float:
+    return _number(post.get("comment_count"))
+
+
+SORT_SCORES: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    "top": vote_score,
+    "hot": hot_score,
+    "commented": comment_score,
+}
+
+
+class PostSnapshot:
+    """
+    Process-wide copy of every post, reloaded at most every ``ttl`` seconds.
+
+    Rankings that no index can serve (votes, comments, hotness) are
+    computed from the snapshot with a bounded heap, so a request costs
+    O(n log k) in memory and no reads while the snapshot is fresh.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL) -> None:
+        self._cache = TTLCache(maxsize=8, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def posts(self, aws_clients: AWSClients) -> List[Dict[str, Any]]:
+        table = aws_clients.table
+        posts = self._cache.get(table.name)
+        if posts is None:
+            # One reload at a time; waiters reuse its result
+            with self._lock:
+                posts = self._cache.get(table.name)
+                if posts is None:
+                    posts = self._load(table)
+                    self._cache.set(table.name, posts)
+        return posts
+
+    def refresh(self, aws_clients: AWSClients) -> List[Dict[str, Any]]:
+        """Reload now, e.g. from a background refresher. On failure the
+        current copy is kept until it expires."""
+        table = aws_clients.table
+        with self._lock:
+            posts = self._load(table)
+            self._cache.set(table.name, posts)
+        return posts
+
+    def patch(self, aws_clients: AWSClients,
+              changes: Dict[str, Optional[Dict[str, Any]]]
+              ) -> Optional[Dict[str, Tuple[Optional[Dict[str, Any]],
+                                            Optional[Dict[str, Any]]]]]:
+        """Apply post changes to the current copy instead of reloading it.
+
+        ``changes`` maps post ids to changed fields (a full item for new
+        posts) or to None for deleted posts. Returns the ``(old, new)``
+        version of each changed post, or None if there is no current copy.
+        """
+        table = aws_clients.table
+        with self._lock:
+            posts = self._cache.get(table.name)
+            if posts is None:
+                return None
+            changed = {}
+            patched = []
+            for post in posts:
+                if post["id"] not in changes:
+                    patched.append(post)
+                    continue
+                update = changes[post["id"]]
+                new = None if update is None else {**post, **update}
+                changed[post["id"]] = (post, new)
+                if new is not None:
+                    patched.append(new)
+            for post_id, update in changes.items():
+                # Counters of a post this copy doesn't have are ignored
+                if post_id not in changed and update and "created_at" in update:
+                    changed[post_id] = (None, update)
+                    patched.append(update)
+            self._cache.set(table.name, patched)
+        return changed
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    @staticmethod
+    def _load(table) -> List[Dict[str, Any]]:
+        posts: List[Dict[str, Any]] = []
+        scan_kwargs: Dict[str, Any] = {
+            "FilterExpression": "begins_with(PK, :pk) AND SK = :sk",
+            "ExpressionAttributeValues": {":pk": "POST#", ":sk": "METADATA"},
+        }
+        while True:
+            response = table.scan(**scan_kwargs)
+            posts.extend(response.get("Items", []))
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                break
+            scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+        return posts
+
+    def ranked(self, aws_clients: AWSClients,
+               score: Callable[[Dict[str, Any]], float], limit: int,
+               predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+               after: Optional[Tuple[float, str]] = None
+               ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Top ``limit`` posts by ``(score, sort key)``, and whether more
+        remain. ``after`` resumes below a previously returned position."""
+        def key(post):
+            return (score(post), timeline_sk(post["created_at"], post["id"]))
+
+        candidates = (post for post in self.posts(aws_clients)
+                      if (predicate is None or predicate(post))
+                      and (after is None or key(post) < after))
+        top = heapq.nlargest(limit + 1, candidates, key=key)
+        return top[:limit], len(top) > limit
+
+
+post_snapshot = PostSnapshot()
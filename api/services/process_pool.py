@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPools:
+    """
+    Named, lazily started process pools for CPU-bound work.
+
+    Each pool is created on first use with its own initializer, so workers
+    can preload whatever state they need. Where processes can't be started
+    (AWS Lambda has no /dev/shm) work falls back to a thread so callers
+    never block the event loop either way.
+    """
+
+    def __init__(self) -> None:
+        self._pools: Dict[str, ProcessPoolExecutor] = {}
+        self._unavailable = set()
+
+    def get(self, name: str, max_workers: int,
+            initializer: Optional[Callable] = None
+            ) -> Optional[ProcessPoolExecutor]:
+        if name in self._unavailable:
+            return None
+
+        pool = self._pools.get(name)
+        if pool is None:
+            try:
+                pool = ProcessPoolExecutor(max_workers=max_workers,
+                                           initializer=initializer)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool '{name}' unavailable: {e}")
+                self._unavailable.add(name)
+                return None
+            self._pools[name] = pool
+        return pool
+
+    async def run(self, name: str, max_workers: int,
+                  initializer: Optional[Callable], fn: Callable,
+                  *args: Any) -> Any:
+        """Run ``fn(*args)`` in the named pool, or a thread as fallback."""
+        pool = self.get(name, max_workers, initializer)
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, partial(fn, *args))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time
+            self._pools.pop(name, None)
+            pool.shutdown(wait=False, cancel_futures=True)
+            return await asyncio.to_thread(fn, *args)
+
+    def warm(self, name: str, max_workers: int,
+             initializer: Optional[Callable] = None) -> None:
+        """Start every worker of the pool now instead of on first use."""
+        pool = self.get(name, max_workers, initializer)
+        if pool is not None:
+            for _ in range(max_workers):
+                pool.submit(int)
+
+    def shutdown(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+
+
+process_pools = ProcessPools()
+
+
+def shutdown_process_pools() -> None:
+    process_pools.shutdown()
@@ -1,24 +1,117 @@
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+from services.cache import LRUCache
+from services.process_pool import process_pools
+from .engine import Hit, ProfanityEngine
+from .lexicon import Lexicon
 from .providers.english_filter import EnglishFilter
 from .providers.tagalog_filter import TagalogFilter
 
-english_filter = EnglishFilter()
-tagalog_filter = TagalogFilter()
+RESULT_CACHE_SIZE = 4096
 
-def check_text(text: str) -> dict:
-    """Check text for profanity across multiple languages."""
-    english_hits = english_filter.find_profanities(text)
-    tagalog_hits = tagalog_filter.find_profanities(text)
+# Inputs longer than this are scanned in a worker process
+OFFLOAD_THRESHOLD = int(os.getenv("PROFANITY_OFFLOAD_THRESHOLD", "16384"))
+POOL_NAME = "profanity"
+POOL_WORKERS = int(os.getenv("PROFANITY_POOL_WORKERS", "2"))
+
+# One precompiled automaton over every language, so each check is a single
+# pass; it is swapped in place when the word lists change
+lexicon = Lexicon()
+
+# Content hash -> hits, so unchanged or repeated text is never rescanned
+_hits_cache = LRUCache(maxsize=RESULT_CACHE_SIZE)
+lexicon.on_reload(_hits_cache.clear)
+
+def _content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def _scan_uncached(text: str) -> Tuple[Hit, ...]:
+    return tuple(lexicon.engine.scan(text))
+
+def _init_worker() -> None:
+    """Process pool initializer: make sure the lexicon is loaded."""
+    lexicon.engine
+
+def start_pool() -> None:
+    """Start the moderation workers ahead of the first long input."""
+    process_pools.warm(POOL_NAME, POOL_WORKERS, _init_worker)
+
+def scan(text: str) -> Tuple[Hit, ...]:
+    """Return the profanity hits in text, memoized by content hash."""
+    if not text:
+        return ()
+
+    key = _content_key(text)
+    hits = _hits_cache.get(key)
+    if hits is None:
+        hits = _scan_uncached(text)
+        _hits_cache.set(key, hits)
+    return hits
 
-    cleaned_text = text
-    if english_hits:
-        cleaned_text = english_filter.censor_text(cleaned_text)
-    if tagalog_hits:
-        cleaned_text = tagalog_filter.censor_text(cleaned_text)
+async def ascan(text: str) -> Tuple[Hit, ...]:
+    """Async ``scan`` that moves long inputs off the event loop."""
+    if len(text or "") <= OFFLOAD_THRESHOLD:
+        return scan(text)
 
-    return {
+    key = _content_key(text)
+    hits = _hits_cache.get(key)
+    if hits is None:
+        hits = await process_pools.run(POOL_NAME, POOL_WORKERS, _init_worker,
+                                       _scan_uncached, text)
+        _hits_cache.set(key, hits)
+    return hits
+
+def _words(hits: Tuple[Hit, ...], language: str = None) -> List[str]:
+    return [hit.text for hit in hits
+            if language is None or hit.language == language]
+
+def check_text(text: str, censor: bool = True) -> dict:
+    """Check text for profanity across multiple languages."""
+    hits = scan(text)
+
+    result = {
         "original": text,
-        "cleaned": cleaned_text,
-        "has_profanity": bool(tagalog_hits),
-        "english_hits": english_hits,
-        "tagalog_hits": tagalog_hits
-    }
\ No newline at end of file
+        "has_profanity": bool(hits),
+        "english_hits": _words(hits, EnglishFilter.language),
+        "tagalog_hits": _words(hits, TagalogFilter.language)
+    }
+    if censor:
+        result["cleaned"] = ProfanityEngine.censor(text, hits)
+    return result
+
+def check_many(fields: Dict[str, str], censor: bool = False) -> dict:
+    """Check several named fields at once.
+
+    Returns ``has_profanity``, the hit words per field under ``hits`` and
+    the fields that contain profanity under ``flagged``. Censored copies
+    are only built (under ``cleaned``) when ``censor`` is set.
+    """
+    hits = {name: scan(text) for name, text in fields.items()}
+    return _many_result(fields, hits, censor)
+
+async def acheck_text(text: str, censor: bool = True) -> dict:
+    """Async ``check_text``; long inputs are scanned in a worker process."""
+    await ascan(text)
+    return check_text(text, censor)
+
+async def acheck_many(fields: Dict[str, str], censor: bool = False) -> dict:
+    """Async ``check_many``; long fields are scanned in worker processes."""
+    names = list(fields)
+    scanned = await asyncio.gather(*(ascan(fields[name]) for name in names))
+    return _many_result(fields, dict(zip(names, scanned)), censor)
+
+def _many_result(fields: Dict[str, str], hits: Dict[str, Tuple[Hit, ...]],
+                 censor: bool) -> dict:
+    result = {
+        "has_profanity": any(hits.values()),
+        "hits": {name: _words(field_hits)
+                 for name, field_hits in hits.items()},
+        "flagged": [name for name, field_hits in hits.items() if field_hits]
+    }
+    if censor:
+        result["cleaned"] = {name: ProfanityEngine.censor(fields[name], field_hits)
+                             for name, field_hits in hits.items()}
+    return result
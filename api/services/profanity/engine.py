@@ -0,0 +1,255 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Character substitutions folded into one canonical character, mirroring
+# better_profanity's CHARS_MAPPING ("4" and "@" for "a", "$" for "s", ...).
+# Every mapping is one character to one character, so offsets in the
+# normalized text are offsets in the original text.
+SUBSTITUTIONS = {
+    "@": "a", "4": "a",
+    "1": "i", "l": "i",
+    "0": "o",
+    "v": "u",
+    "3": "e",
+    "$": "s", "5": "s",
+    "7": "t",
+}
+
+
+def _fold(char: str) -> str:
+    lowered = char.lower()
+    if len(lowered) != 1:
+        lowered = char
+    return SUBSTITUTIONS.get(lowered, lowered)
+
+
+# Precomputed table for the characters seen in almost every input
+_ASCII_FOLD = {code: _fold(chr(code)) for code in range(128)}
+
+
+def normalize(text: str) -> str:
+    """Lowercase and fold look-alike characters, preserving length."""
+    if text.isascii():
+        return text.translate(_ASCII_FOLD)
+    return "".join(map(_fold, text))
+
+
+# Affixes that may be attached to a word of a language and still count as
+# that word, as (prefixes, suffixes), longest first. Tagalog joins its
+# linker to the word before it ("gagong bata", "tarantadong") and builds
+# adjectives with prefixes ("nakakagago").
+AFFIXES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "tagalog": (("nakaka", "naka", "ka"), ("ong", "ng")),
+}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum()
+
+
+def _word_start(text: str, start: int, prefixes: Tuple[str, ...]):
+    """Start of the word when one of ``prefixes`` precedes the match at
+    ``start``; None if the match is inside some other word."""
+    for prefix in prefixes:
+        begin = start - len(prefix)
+        if (begin >= 0 and text.startswith(prefix, begin)
+                and (begin == 0 or not _is_word_char(text[begin - 1]))):
+            return begin
+    return None
+
+
+def _word_end(text: str, end: int, suffixes: Tuple[str, ...]):
+    """End of the word when one of ``suffixes`` follows the match ending
+    at ``end``; None if the match is inside some other word."""
+    for suffix in suffixes:
+        stop = end + len(suffix)
+        if (text.startswith(suffix, end)
+                and (stop >= len(text) or not _is_word_char(text[stop]))):
+            return stop
+    return None
+
+
+class Hit(NamedTuple):
+    """A profanity match; ``start``/``end`` index the original text."""
+    start: int
+    end: int
+    text: str
+    language: str
+
+
+class ProfanityEngine:
+    """
+    Multi-language profanity matcher backed by one Aho-Corasick automaton.
+
+    All word lists are compiled into a single deterministic automaton over
+    normalized text, so a check is one O(len(text)) pass no matter how many
+    words or languages are loaded. Word boundaries are enforced on the
+    matches from that same pass, past the language's ``AFFIXES``; a hit
+    spans the whole affixed word.
+    """
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]]) -> None:
+        patterns: Dict[str, str] = {}
+        for language, words in lexicons.items():
+            for word in words:
+                pattern = normalize(word.strip())
+                if pattern:
+                    patterns.setdefault(pattern, language)
+
+        self.patterns: List[Tuple[str, str]] = sorted(patterns.items())
+        self.transitions, self.outputs = self._compile(
+            [pattern for pattern, _ in self.patterns]
+        )
+        self._init_affixes()
+
+    @classmethod
+    def from_tables(cls, tables: Dict) -> "ProfanityEngine":
+        """Rebuild an engine from tables produced by ``to_tables``."""
+        engine = cls.__new__(cls)
+        engine.patterns = tables["patterns"]
+        engine.transitions = tables["transitions"]
+        engine.outputs = tables["outputs"]
+        engine._init_affixes()
+        return engine
+
+    def _init_affixes(self) -> None:
+        # Per pattern: prefixes, suffixes, and the characters that can be
+        # next to the match when one of them is present, to rule most
+        # run-on matches out without trying every affix
+        by_language = {
+            language: (prefixes, suffixes,
+                       frozenset(prefix[-1] for prefix in prefixes),
+                       frozenset(suffix[0] for suffix in suffixes))
+            for language, (prefixes, suffixes) in AFFIXES.items()
+        }
+        none = ((), (), frozenset(), frozenset())
+        self.affixes = [by_language.get(language, none)
+                        for _, language in self.patterns]
+        # States where a match may carry affixes; elsewhere the plain
+        # word-boundary checks are enough
+        self.affixed = [any(self.affixes[index][0] or self.affixes[index][1]
+                            for index in output)
+                        for output in self.outputs]
+
+    def to_tables(self) -> Dict:
+        """Plain-data form of the compiled automaton, for serialization."""
+        return {
+            "patterns": self.patterns,
+            "transitions": self.transitions,
+            "outputs": self.outputs,
+        }
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> Tuple[List[Dict[str, int]],
+                                                List[Tuple[int, ...]]]:
+        """Build the trie, failure links and full transition table."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(index)
+
+        # Breadth-first pass: resolve failure links and fold them into a
+        # complete transition table, so scanning never walks back.
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])]
+        transitions.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            fallback = transitions[fail[state]]
+            outputs[state].extend(outputs[fail[state]])
+
+            # Inherit the failure state's moves, then override with our own
+            transitions[state] = {**fallback, **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = fallback.get(char, 0) if state else 0
+                queue.append(child)
+
+        return transitions, [tuple(output) for output in outputs]
+
+    def scan(self, text: str) -> List[Hit]:
+        """Return non-overlapping whole-word hits, leftmost-longest first."""
+        normalized = normalize(text)
+        transitions = self.transitions
+        outputs = self.outputs
+        patterns = self.patterns
+        affixes = self.affixes
+        affixed = self.affixed
+        length = len(normalized)
+
+        candidates = []
+        state = 0
+        for end, char in enumerate(normalized, 1):
+            state = transitions[state].get(char, 0)
+            if not outputs[state]:
+                continue
+
+            runs_on = end < length and _is_word_char(normalized[end])
+            if not affixed[state]:
+                if runs_on:
+                    continue
+                for index in outputs[state]:
+                    start = end - len(patterns[index][0])
+                    if start and _is_word_char(normalized[start - 1]):
+                        continue
+                    candidates.append((start, end, index))
+                continue
+
+            for index in outputs[state]:
+                prefixes, suffixes, before, after = affixes[index]
+                word_end = end
+                if runs_on:
+                    if normalized[end] not in after:
+                        continue
+                    word_end = _word_end(normalized, end, suffixes)
+                    if word_end is None:
+                        continue
+                start = end - len(patterns[index][0])
+                if start and _is_word_char(normalized[start - 1]):
+                    if normalized[start - 1] not in before:
+                        continue
+                    start = _word_start(normalized, start, prefixes)
+                    if start is None:
+                        continue
+                candidates.append((start, word_end, index))
+
+        hits = []
+        covered = 0
+        for start, end, index in sorted(candidates,
+                                        key=lambda c: (c[0], -c[1])):
+            if start < covered:
+                continue
+            hits.append(Hit(start, end, text[start:end].lower(),
+                            patterns[index][1]))
+            covered = end
+
+        return hits
+
+    def contains_profanity(self, text: str) -> bool:
+        return bool(self.scan(text))
+
+    @staticmethod
+    def censor(text: str, hits: List[Hit], mask_char: str = "*") -> str:
+        """Mask every hit span in ``text``."""
+        if not hits:
+            return text
+
+        parts = []
+        position = 0
+        for hit in hits:
+            parts.append(text[position:hit.start])
+            parts.append(mask_char * (hit.end - hit.start))
+            position = hit.end
+        parts.append(text[position:])
+        return "".join(parts)
@@ -0,0 +1,226 @@
+# Precompiled profanity lexicon. The combined automaton is compiled once into
+# a versioned pickle so cold starts load tables instead of compiling them.
+# Build it ahead of time with `python -m services.profanity.lexicon`.
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .engine import ProfanityEngine
+from .providers import english_filter, tagalog_filter
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+RELOAD_CHECK_INTERVAL = 30.0  # seconds
+ARTIFACT_PATH = os.getenv(
+    "PROFANITY_LEXICON_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "lexicon.pkl")
+)
+ARTIFACT_MAGIC = b"profanity-lexicon\n"
+
+SOURCE_PATHS = [english_filter.WORDLIST_PATH, tagalog_filter.WORDLIST_PATH]
+
+
+def source_digest() -> str:
+    """Digest of the artifact format and every word list it is built from."""
+    digest = hashlib.sha256(f"format:{FORMAT_VERSION}".encode())
+    for path in SOURCE_PATHS:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def fallback_artifact_path() -> Optional[str]:
+    """Artifact path in a private per-user directory under the temp dir,
+    for when the package directory is read-only (Lambda).
+
+    None if the directory can't be made private to this user, e.g. when
+    someone else created it first: anyone who can write the artifact can
+    run code in this process.
+    """
+    if not hasattr(os, "geteuid"):
+        return None
+    directory = os.path.join(tempfile.gettempdir(),
+                             f"profanity-lexicon-{os.geteuid()}")
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.lstat(directory)
+    except OSError:
+        return None
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.geteuid()
+            or info.st_mode & 0o077):
+        logger.warning(f"Not using lexicon cache {directory}: it is not a "
+                       f"directory private to this user")
+        return None
+    return os.path.join(directory, "lexicon.pkl")
+
+
+def artifact_paths() -> List[str]:
+    fallback = fallback_artifact_path()
+    return [ARTIFACT_PATH] + ([fallback] if fallback else [])
+
+
+def compile_engine() -> ProfanityEngine:
+    """Compile the combined automaton from the word lists."""
+    english = english_filter.EnglishFilter()
+    tagalog = tagalog_filter.TagalogFilter()
+    return ProfanityEngine({
+        english.language: english.badwords,
+        tagalog.language: tagalog.badwords,
+    })
+
+
+def build_artifact(path: str = ARTIFACT_PATH) -> ProfanityEngine:
+    """Compile the lexicon and atomically write it to ``path``."""
+    engine = compile_engine()
+    payload = {
+        "format": FORMAT_VERSION,
+        "digest": source_digest(),
+        "built_at": time.time(),
+        "tables": engine.to_tables(),
+    }
+
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(ARTIFACT_MAGIC + hashlib.sha256(data).digest() + data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return engine
+
+
+def load_artifact(path: str, digest: str) -> Optional[ProfanityEngine]:
+    """Load the artifact at ``path`` if it matches the current word lists.
+
+    The pickle is only opened if its bytes match the SHA-256 written in
+    front of them, so a truncated or foreign file is rebuilt instead.
+    """
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+
+    header = len(ARTIFACT_MAGIC) + hashlib.sha256().digest_size
+    data = blob[header:]
+    if (not blob.startswith(ARTIFACT_MAGIC)
+            or blob[len(ARTIFACT_MAGIC):header]
+            != hashlib.sha256(data).digest()):
+        return None
+    try:
+        payload = pickle.loads(data)
+    except (pickle.UnpicklingError, EOFError):
+        return None
+
+    if (payload.get("format") != FORMAT_VERSION
+            or payload.get("digest") != digest):
+        return None
+    return ProfanityEngine.from_tables(payload["tables"])
+
+
+def load_engine() -> ProfanityEngine:
+    """Load the current lexicon, rebuilding the artifact if it is stale."""
+    digest = source_digest()
+    paths = artifact_paths()
+    for path in paths:
+        engine = load_artifact(path, digest)
+        if engine is not None:
+            return engine
+
+    # Package directories are read-only on Lambda, so fall back to a
+    # private directory under /tmp
+    for path in paths:
+        try:
+            return build_artifact(path)
+        except OSError as e:
+            logger.warning(f"Could not write lexicon artifact {path}: {e}")
+
+    return compile_engine()
+
+
+class Lexicon:
+    """
+    Holds the live profanity engine and swaps it when its sources change.
+
+    Word lists and the artifact are polled for modification at most every
+    ``check_interval`` seconds; a change loads the new lexicon and swaps
+    it in atomically without a restart.
+    """
+
+    def __init__(self, check_interval: float = RELOAD_CHECK_INTERVAL) -> None:
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._listeners: List = []
+        self._engine = load_engine()
+        self._mtimes = self._source_mtimes()
+        self._checked_at = time.monotonic()
+
+    @property
+    def engine(self) -> ProfanityEngine:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._reload_if_changed()
+        return self._engine
+
+    def on_reload(self, listener) -> None:
+        """Call ``listener()`` whenever a new engine is swapped in."""
+        self._listeners.append(listener)
+
+    def reload(self) -> ProfanityEngine:
+        """Load the lexicon from its sources and swap it in."""
+        with self._lock:
+            engine = self._swap()
+        self._notify()
+        return engine
+
+    def _swap(self) -> ProfanityEngine:
+        engine = load_engine()
+        self._engine = engine
+        self._mtimes = self._source_mtimes()
+        self._checked_at = time.monotonic()
+        return engine
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()
+        logger.info("Profanity lexicon reloaded")
+
+    def _reload_if_changed(self) -> None:
+        # Requests that find a reload in progress keep the current engine
+        # rather than queueing up to compile the same change again
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            if self._source_mtimes() == self._mtimes:
+                return
+            self._swap()
+        finally:
+            self._lock.release()
+        self._notify()
+
+    @staticmethod
+    def _source_mtimes() -> Dict[str, float]:
+        mtimes = {}
+        for path in SOURCE_PATHS + [ARTIFACT_PATH]:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[path] = 0.0
+        return mtimes
+
+
+if __name__ == "__main__":
+    build_artifact()
+    print(f"Profanity lexicon written to {ARTIFACT_PATH}")
@@ -1,16 +1,39 @@
-from better_profanity import profanity
+import os
+
+import better_profanity
+
+from ..engine import ProfanityEngine
+
+WORDLIST_PATH = os.path.join(
+    os.path.dirname(better_profanity.__file__),
+    "profanity_wordlist.txt"
+)
 
 class EnglishFilter:
     """Filter for English profanity."""
 
+    language = "english"
+
     def __init__(self):
-        """Initialize the English profanity filter."""
-        profanity.load_censor_words()
-    
-    def find_profanities(self, text: str) -> bool:
+        """Load the English word list shipped with better_profanity."""
+        with open(WORDLIST_PATH, "r", encoding="utf-8") as f:
+            self.badwords = [line.strip() for line in f if line.strip()]
+        self._engine = None
+
+    @property
+    def engine(self) -> ProfanityEngine:
+        if self._engine is None:
+            self._engine = ProfanityEngine({self.language: self.badwords})
+        return self._engine
+
+    def contains_profanity(self, text: str) -> bool:
         """Check if text contains English profanity."""
-        return profanity.contains_profanity(text)
+        return self.engine.contains_profanity(text)
+
+    def find_profanities(self, text: str):
+        """Return the English profanity words found in text."""
+        return [hit.text for hit in self.engine.scan(text)]
 
     def censor_text(self, text: str, mask_char: str = '*') -> str:
         """Censor English profanity words in text."""
-        return profanity.censor(text, censor_char=mask_char)
+        return self.engine.censor(text, self.engine.scan(text), mask_char)
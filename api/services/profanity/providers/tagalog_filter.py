@@ -1,31 +1,34 @@
 import json
 import os
-import re
+
+from ..engine import ProfanityEngine
+
+WORDLIST_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "data",
+    "tagalog_bad_words.json"
+)
 
 class TagalogFilter:
+    language = "tagalog"
+
     def __init__(self):
-        data_path = os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "data",
-            "tagalog_bad_words.json"
-        )
-  
-        with open(data_path, "r", encoding="utf-8") as f:
+        with open(WORDLIST_PATH, "r", encoding="utf-8") as f:
             self.badwords = json.load(f)
+        self._engine = None
 
-        # Sort by length for multi-word priority
-        self.badwords.sort(key=len, reverse=True)
-        self.pattern = re.compile(
-            r"(" + "|".join(map(re.escape, self.badwords)) + r")",
-            re.IGNORECASE
-        )
+    @property
+    def engine(self) -> ProfanityEngine:
+        if self._engine is None:
+            self._engine = ProfanityEngine({self.language: self.badwords})
+        return self._engine
 
     def contains_profanity(self, text: str) -> bool:
-        return bool(self.pattern.search(text))
+        return self.engine.contains_profanity(text)
 
     def censor_text(self, text: str, mask_char: str = "*") -> str:
-        return self.pattern.sub(lambda m: mask_char * len(m.group()), text)
+        return self.engine.censor(text, self.engine.scan(text), mask_char)
 
     def find_profanities(self, text: str):
-        return [match.group().lower() for match in self.pattern.finditer(text)]
+        return [hit.text for hit in self.engine.scan(text)]
@@ -0,0 +1,212 @@
+import argparse
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from boto3.dynamodb.conditions import Key
+from dotenv import load_dotenv
+
+from models.forum_models import post_pk
+from services.attachment_text import AttachmentTextStore
+from services.aws_clients import AWSClients, get_aws_clients
+from services.post_index import batch_get_posts
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of a match in each field of a post
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "content": 1.0,
+    "attachment": 0.5,
+}
+
+MAX_TERMS_PER_SOURCE = 100  # most frequent terms kept per field/attachment
+MAX_QUERY_TERMS = 8
+MAX_POSTINGS_PER_TERM = 1000
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with
+    ang ay at mga na nang ng ni sa si ko mo ka ba po
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, without stopwords and single characters."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def term_pk(term: str) -> str:
+    return f"TERM#{term}"
+
+
+def index_sk(source: str) -> str:
+    return f"INDEX#{source}"
+
+
+def attachment_source(s3_key: str) -> str:
+    return f"attachment:{s3_key}"
+
+
+def _field(source: str) -> str:
+    return source.split(":", 1)[0]
+
+
+class SearchIndex:
+    """
+    Inverted index of post text, stored in ``SEARCH_INDEX_TABLE`` (the
+    forum table if unset).
+
+    Each indexed source of a post (its title, its content, or one
+    attachment's extracted text) writes one posting per distinct term:
+    ``TERM#<term>`` / ``POST#<post_id>#<source>`` with the term frequency.
+    The post keeps an ``INDEX#<source>`` item listing the terms it wrote,
+    so reindexing only touches postings that changed. Queries read the
+    postings of each query term and rank posts by weighted frequency;
+    attachment text is never opened at query time.
+    """
+
+    def __init__(self, aws_clients: AWSClients):
+        self.clients = aws_clients
+        self.table = aws_clients.search_table
+
+    # ---------- Writes ----------
+    def index_source(self, post_id: str, source: str, text: str) -> None:
+        """(Re)index one source of a post with its current text."""
+        counts = Counter(tokenize(text or ""))
+        terms = dict(counts.most_common(MAX_TERMS_PER_SOURCE))
+        previous = self._indexed_terms(post_id, source)
+
+        with self.table.batch_writer(overwrite_by_pkeys=["PK", "SK"]) as batch:
+            for term in previous - terms.keys():
+                batch.delete_item(Key={"PK": term_pk(term),
+                                       "SK": f"{post_pk(post_id)}#{source}"})
+            for term, tf in terms.items():
+                batch.put_item(Item={
+                    "PK": term_pk(term),
+                    "SK": f"{post_pk(post_id)}#{source}",
+                    "post_id": post_id,
+                    "field": _field(source),
+                    "tf": tf,
+                })
+            if terms:
+                batch.put_item(Item={"PK": post_pk(post_id),
+                                     "SK": index_sk(source),
+                                     "terms": sorted(terms)})
+            elif previous:
+                batch.delete_item(Key={"PK": post_pk(post_id),
+                                       "SK": index_sk(source)})
+
+    def index_post(self, post_id: str, fields: Dict[str, str]) -> None:
+        """Index the given post fields (e.g. ``title``, ``content``)."""
+        for field, text in fields.items():
+            self.index_source(post_id, field, text)
+
+    def remove_source(self, post_id: str, source: str) -> None:
+        self.index_source(post_id, source, "")
+
+    def remove_post(self, post_id: str) -> None:
+        """Drop every posting written for the post."""
+        response = self.table.query(
+            KeyConditionExpression=(Key("PK").eq(post_pk(post_id))
+                                    & Key("SK").begins_with("INDEX#"))
+        )
+        for item in response.get("Items", []):
+            self.remove_source(post_id, item["SK"][len("INDEX#"):])
+
+    def _indexed_terms(self, post_id: str, source: str) -> set:
+        response = self.table.get_item(
+            Key={"PK": post_pk(post_id), "SK": index_sk(source)}
+        )
+        return set(response.get("Item", {}).get("terms", []))
+
+    # ---------- Queries ----------
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Posts matching ``query``, best first.
+
+        Posts matching more of the query terms rank first; ties are broken
+        by the field-weighted, rarity-weighted term frequency.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        matched = defaultdict(set)
+        scores = defaultdict(float)
+
+        for term in terms:
+            postings = self._postings(term)
+            df = len({posting["post_id"] for posting in postings})
+            idf = 1 + math.log(1 + MAX_POSTINGS_PER_TERM / max(df, 1))
+            for posting in postings:
+                post_id = posting["post_id"]
+                weight = FIELD_WEIGHTS.get(posting["field"], 1.0)
+                matched[post_id].add(term)
+                scores[post_id] += (weight * idf
+                                    * (1 + math.log(int(posting["tf"]))))
+
+        ranked = sorted(scores, key=lambda post_id: (len(matched[post_id]),
+                                                     scores[post_id]),
+                        reverse=True)[:limit]
+        posts = batch_get_posts(self.clients, ranked)
+        return [posts[post_id] for post_id in ranked if post_id in posts]
+
+    def _postings(self, term: str) -> List[Dict[str, Any]]:
+        postings: List[Dict[str, Any]] = []
+        query_kwargs = {"KeyConditionExpression": Key("PK").eq(term_pk(term))}
+
+        while len(postings) < MAX_POSTINGS_PER_TERM:
+            response = self.table.query(**query_kwargs)
+            postings.extend(response.get("Items", []))
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                break
+            query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+        return postings[:MAX_POSTINGS_PER_TERM]
+
+
+def rebuild_index(aws_clients: AWSClients) -> int:
+    """Index every post and its stored attachment text; return post count."""
+    index = SearchIndex(aws_clients)
+    texts = AttachmentTextStore(aws_clients)
+    scan_kwargs: Dict[str, Any] = {}
+    indexed = 0
+
+    while True:
+        response = aws_clients.table.scan(**scan_kwargs)
+        for item in response.get("Items", []):
+            if not item["PK"].startswith("POST#"):
+                continue
+            post_id = item["PK"][len("POST#"):]
+            if item["SK"] == "METADATA":
+                index.index_post(post_id, {"title": item.get("title", ""),
+                                           "content": item.get("content", "")})
+                indexed += 1
+            elif item["SK"].startswith("FILE#") and item.get("sha256"):
+                pages = texts.get(item["sha256"])
+                if pages is not None:
+                    index.index_source(post_id,
+                                       attachment_source(item["s3_key"]),
+                                       " ".join(pages))
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    return indexed
+
+
+def main() -> None:
+    """Rebuild the search index: ``python -m services.search_index``"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    argparse.ArgumentParser(description=main.__doc__).parse_args()
+
+    indexed = rebuild_index(get_aws_clients())
+    logger.info(f"Indexed {indexed} post(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from services.metrics import Counter, registry
+
+single_flight_calls = registry.register(Counter(
+    "single_flight_calls_total",
+    "Coalesced reads by operation: executed ran the backend call, "
+    "collapsed shared one already in flight.",
+    ("operation", "outcome"),
+))
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical reads into one backend call.
+
+    The first caller for a key starts the call (sync functions run in a
+    worker thread, off the event loop); callers arriving while it is in
+    flight await the same result instead of issuing their own. Nothing is
+    cached once the call finishes, so reads are never staler than the call
+    they joined. Results are shared between callers and must not be
+    mutated.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+
+    async def do(self, operation: str, key: Hashable,
+                 function: Callable[..., Any], *args: Any) -> Any:
+        """Result of ``function(*args)``, shared by calls for ``key``."""
+        call_key = (operation, key)
+        call = self._calls.get(call_key)
+        if call is None:
+            if asyncio.iscoroutinefunction(function):
+                call = asyncio.ensure_future(function(*args))
+            else:
+                call = asyncio.ensure_future(
+                    asyncio.to_thread(function, *args))
+            self._calls[call_key] = call
+            call.add_done_callback(
+                lambda done: self._forget(call_key, done))
+            single_flight_calls.inc((operation, "executed"))
+        else:
+            single_flight_calls.inc((operation, "collapsed"))
+
+        # A caller that is cancelled must not cancel the call for the rest
+        return await asyncio.shield(call)
+
+    def _forget(self, call_key: Tuple[str, Hashable],
+                done: asyncio.Future) -> None:
+        if self._calls.get(call_key) is done:
+            del self._calls[call_key]
+        if not done.cancelled():
+            done.exception()  # retrieved, so a failure nobody awaited is quiet
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+single_flight = SingleFlight()
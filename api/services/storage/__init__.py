@@ -0,0 +1,3 @@
+from .clients import MemoryClients
+from .dynamodb import MemoryBatchWriter, MemoryDynamoDB, MemoryTable
+from .s3 import MemoryS3
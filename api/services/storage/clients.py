@@ -0,0 +1,21 @@
+from services.aws_clients import AWSClients
+from services.storage.dynamodb import MemoryDynamoDB
+from services.storage.s3 import MemoryS3
+
+
+class MemoryClients(AWSClients):
+    """
+    AWSClients backed by in-memory DynamoDB and S3 stand-ins.
+
+    Selected with ``STORAGE_BACKEND=memory``. Data lives in this process
+    only and is gone when it exits; other processes (the summary worker,
+    PDF extraction pool) cannot see it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize in-memory clients and resources."""
+        self.dynamodb = MemoryDynamoDB()
+        self.s3 = MemoryS3()
+
+        self._init_table()
+        self._init_s3_bucket()
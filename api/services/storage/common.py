@@ -0,0 +1,29 @@
+import functools
+import time
+
+from botocore.exceptions import ClientError
+
+from services import metrics
+
+
+def client_error(code: str, message: str, operation: str) -> ClientError:
+    """The ClientError boto3 raises for an AWS error response."""
+    return ClientError({"Error": {"Code": code, "Message": message},
+                        "ResponseMetadata": {"HTTPStatusCode": 400}},
+                       operation)
+
+
+def recorded(service: str, operation: str):
+    """Count calls of the decorated method like botocore calls are counted,
+    so metrics and benchmarks see the memory backend's traffic too."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                metrics.record_call(service, operation,
+                                    time.perf_counter() - started)
+        return wrapper
+    return decorator
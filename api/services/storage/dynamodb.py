@@ -0,0 +1,528 @@
+import bisect
+import contextlib
+import copy
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.types import Binary
+from botocore.exceptions import ClientError
+
+from services.storage.common import client_error, recorded
+from services.storage.expressions import (Expressions, apply_update,
+                                          evaluate, key_condition, normalize,
+                                          validation_error)
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+TRANSACT_WRITE_LIMIT = 100
+# Sorts after every character a sort key can hold, for begins_with ranges
+PREFIX_END = "\U0010ffff"
+
+
+def _conditional_check_failed(operation: str):
+    return client_error("ConditionalCheckFailedException",
+                        "The conditional request failed", operation)
+
+
+def _project(item: Dict[str, Any],
+             attributes: Optional[List[str]]) -> Dict[str, Any]:
+    if attributes is None:
+        return copy.deepcopy(item)
+    return {name: copy.deepcopy(item[name]) for name in attributes
+            if name in item}
+
+
+class MemoryTable:
+    """
+    In-memory stand-in for a boto3 DynamoDB ``Table`` resource.
+
+    Items live in per-partition dicts with a sorted list of sort keys, so
+    Queries bisect straight to their key range and page like DynamoDB
+    (``Limit`` counts items read before the filter, ``LastEvaluatedKey``
+    resumes). Values round-trip through DynamoDB's wire types on the way
+    in, so items come back with Decimals and sets exactly as boto3
+    returns them. Conditional writes raise the same ``ClientError`` codes.
+    """
+
+    def __init__(self, name: str, hash_key: str = "PK",
+                 range_key: Optional[str] = "SK") -> None:
+        self.name = name
+        self.table_name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.key_names = (hash_key,) + ((range_key,) if range_key else ())
+        self._partitions: Dict[Any, Dict[Any, Dict[str, Any]]] = {}
+        self._sort_keys: Dict[Any, List[Any]] = {}
+        self._partition_keys: List[Any] = []  # sorted, for Scan paging
+        self._lock = threading.RLock()
+
+    # ---------- Keys ----------
+    def _key(self, key: Dict[str, Any], operation: str,
+             exact: bool = True) -> Tuple[Any, Any]:
+        if exact and set(key) != set(self.key_names):
+            raise validation_error(
+                "The provided key element does not match the schema",
+                operation,
+            )
+        for name in self.key_names:
+            if name not in key:
+                raise validation_error(
+                    "One or more parameter values were invalid: Missing the "
+                    f"key {name} in the item", operation,
+                )
+            if not isinstance(key[name], (str, bytes, Binary, Decimal)):
+                raise validation_error(
+                    f"Invalid type for key attribute {name}", operation,
+                )
+        return (key[self.hash_key],
+                key[self.range_key] if self.range_key else None)
+
+    def _item_key(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: item[name] for name in self.key_names}
+
+    def _get(self, pk: Any, sk: Any) -> Optional[Dict[str, Any]]:
+        return self._partitions.get(pk, {}).get(sk)
+
+    def _store(self, pk: Any, sk: Any, item: Dict[str, Any]) -> None:
+        partition = self._partitions.get(pk)
+        if partition is None:
+            partition = self._partitions[pk] = {}
+            self._sort_keys[pk] = []
+            bisect.insort(self._partition_keys, pk)
+        if sk not in partition:
+            bisect.insort(self._sort_keys[pk], sk)
+        partition[sk] = item
+
+    def _discard(self, pk: Any, sk: Any) -> Optional[Dict[str, Any]]:
+        partition = self._partitions.get(pk)
+        if partition is None or sk not in partition:
+            return None
+        item = partition.pop(sk)
+        sort_keys = self._sort_keys[pk]
+        del sort_keys[bisect.bisect_left(sort_keys, sk)]
+        if not partition:
+            del self._partitions[pk]
+            del self._sort_keys[pk]
+            del self._partition_keys[bisect.bisect_left(self._partition_keys,
+                                                        pk)]
+        return item
+
+    # ---------- Single-item operations ----------
+    @recorded("dynamodb", "GetItem")
+    def get_item(self, Key: Dict[str, Any],
+                 ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                 ConsistentRead: bool = False, **_) -> Dict[str, Any]:
+        expressions = Expressions("GetItem", ExpressionAttributeNames)
+        attributes = expressions.projection(ProjectionExpression)
+        expressions.check_unused()
+        pk, sk = self._key(normalize(Key), "GetItem")
+        with self._lock:
+            item = self._get(pk, sk)
+            return {"Item": _project(item, attributes)} if item else {}
+
+    @recorded("dynamodb", "PutItem")
+    def put_item(self, Item: Dict[str, Any], ConditionExpression=None,
+                 ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                 ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+                 ReturnValues: str = "NONE", **_) -> Dict[str, Any]:
+        item = normalize(Item)
+        pk, sk = self._key(item, "PutItem", exact=False)
+        expressions = Expressions("PutItem", ExpressionAttributeNames,
+                                  ExpressionAttributeValues)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check_unused()
+
+        with self._lock:
+            old = self._get(pk, sk)
+            if condition is not None and not evaluate(condition, old or {}):
+                raise _conditional_check_failed("PutItem")
+            self._store(pk, sk, item)
+        if ReturnValues == "ALL_OLD" and old:
+            return {"Attributes": copy.deepcopy(old)}
+        return {}
+
+    @recorded("dynamodb", "DeleteItem")
+    def delete_item(self, Key: Dict[str, Any], ConditionExpression=None,
+                    ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                    ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+                    ReturnValues: str = "NONE", **_) -> Dict[str, Any]:
+        pk, sk = self._key(normalize(Key), "DeleteItem")
+        expressions = Expressions("DeleteItem", ExpressionAttributeNames,
+                                  ExpressionAttributeValues)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check_unused()
+
+        with self._lock:
+            old = self._get(pk, sk)
+            if condition is not None and not evaluate(condition, old or {}):
+                raise _conditional_check_failed("DeleteItem")
+            self._discard(pk, sk)
+        if ReturnValues == "ALL_OLD" and old:
+            return {"Attributes": old}
+        return {}
+
+    @recorded("dynamodb", "UpdateItem")
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str,
+                    ConditionExpression=None,
+                    ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                    ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+                    ReturnValues: str = "NONE", **_) -> Dict[str, Any]:
+        key = normalize(Key)
+        pk, sk = self._key(key, "UpdateItem")
+        expressions = Expressions("UpdateItem", ExpressionAttributeNames,
+                                  ExpressionAttributeValues)
+        actions = expressions.update(UpdateExpression)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check_unused()
+
+        with self._lock:
+            old = self._get(pk, sk)
+            if condition is not None and not evaluate(condition, old or {}):
+                raise _conditional_check_failed("UpdateItem")
+            new = copy.deepcopy(old) if old else dict(key)
+            touched = apply_update(new, actions, self.key_names, "UpdateItem")
+            # Catch values DynamoDB can't store before committing
+            new = normalize(new)
+            self._store(pk, sk, new)
+
+        if ReturnValues == "ALL_NEW":
+            return {"Attributes": copy.deepcopy(new)}
+        if ReturnValues == "ALL_OLD":
+            return {"Attributes": copy.deepcopy(old)} if old else {}
+        if ReturnValues in ("UPDATED_NEW", "UPDATED_OLD"):
+            source = new if ReturnValues == "UPDATED_NEW" else (old or {})
+            attributes = _project(source, [name for name in touched
+                                           if name in source])
+            return {"Attributes": attributes} if attributes else {}
+        return {}
+
+    # ---------- Reads ----------
+    def _page(self, candidates: Iterator[Dict[str, Any]], filter_node,
+              limit: Optional[int], attributes: Optional[List[str]],
+              select: Optional[str]) -> Dict[str, Any]:
+        items: List[Dict[str, Any]] = []
+        scanned = 0
+        last = None
+        exhausted = True
+        for item in candidates:
+            if limit is not None and scanned == limit:
+                exhausted = False
+                break
+            scanned += 1
+            last = item
+            if filter_node is None or evaluate(filter_node, item):
+                items.append(item)
+
+        response: Dict[str, Any] = {"Count": len(items),
+                                    "ScannedCount": scanned}
+        if select != "COUNT":
+            response["Items"] = [_project(item, attributes)
+                                 for item in items]
+        if not exhausted and last is not None:
+            response["LastEvaluatedKey"] = copy.deepcopy(
+                self._item_key(last))
+        return response
+
+    def _sort_range(self, sort_keys: List[Any],
+                    predicate: Optional[Tuple]) -> Tuple[int, int]:
+        if predicate is None:
+            return 0, len(sort_keys)
+        op, value = predicate[0], predicate[1]
+        if op == "=":
+            return (bisect.bisect_left(sort_keys, value),
+                    bisect.bisect_right(sort_keys, value))
+        if op == "begins_with":
+            return (bisect.bisect_left(sort_keys, value),
+                    bisect.bisect_left(sort_keys, value + PREFIX_END))
+        if op == "between":
+            return (bisect.bisect_left(sort_keys, value),
+                    bisect.bisect_right(sort_keys, predicate[2]))
+        if op == "<":
+            return 0, bisect.bisect_left(sort_keys, value)
+        if op == "<=":
+            return 0, bisect.bisect_right(sort_keys, value)
+        if op == ">":
+            return bisect.bisect_right(sort_keys, value), len(sort_keys)
+        return bisect.bisect_left(sort_keys, value), len(sort_keys)
+
+    @recorded("dynamodb", "Query")
+    def query(self, KeyConditionExpression,
+              FilterExpression=None,
+              ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+              ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+              ScanIndexForward: bool = True, Limit: Optional[int] = None,
+              ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+              ProjectionExpression: Optional[str] = None,
+              Select: Optional[str] = None,
+              IndexName: Optional[str] = None, **_) -> Dict[str, Any]:
+        if IndexName:
+            raise validation_error(
+                f"The table does not have the specified index: {IndexName}",
+                "Query",
+            )
+        expressions = Expressions("Query", ExpressionAttributeNames,
+                                  ExpressionAttributeValues)
+        key_node = expressions.condition(KeyConditionExpression,
+                                         is_key_condition=True)
+        filter_node = expressions.condition(FilterExpression)
+        attributes = expressions.projection(ProjectionExpression)
+        expressions.check_unused()
+        pk, predicate = key_condition(key_node, self.hash_key,
+                                      self.range_key, "Query")
+
+        with self._lock:
+            partition = self._partitions.get(pk, {})
+            sort_keys = self._sort_keys.get(pk, [])
+            start, stop = self._sort_range(sort_keys, predicate)
+            if ExclusiveStartKey:
+                _, after = self._key(normalize(ExclusiveStartKey), "Query")
+                if ScanIndexForward:
+                    start = max(start, bisect.bisect_right(sort_keys, after))
+                else:
+                    stop = min(stop, bisect.bisect_left(sort_keys, after))
+            selected = sort_keys[start:stop]
+            if not ScanIndexForward:
+                selected.reverse()
+            return self._page((partition[sk] for sk in selected), filter_node,
+                              Limit, attributes, Select)
+
+    @recorded("dynamodb", "Scan")
+    def scan(self, FilterExpression=None,
+             ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+             ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+             Limit: Optional[int] = None,
+             ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+             ProjectionExpression: Optional[str] = None,
+             Select: Optional[str] = None, **_) -> Dict[str, Any]:
+        expressions = Expressions("Scan", ExpressionAttributeNames,
+                                  ExpressionAttributeValues)
+        filter_node = expressions.condition(FilterExpression)
+        attributes = expressions.projection(ProjectionExpression)
+        expressions.check_unused()
+
+        with self._lock:
+            start_pk, start_sk = None, None
+            if ExclusiveStartKey:
+                start_pk, start_sk = self._key(normalize(ExclusiveStartKey),
+                                               "Scan")
+            return self._page(self._iter_from(start_pk, start_sk),
+                              filter_node, Limit, attributes, Select)
+
+    def _iter_from(self, start_pk: Any,
+                   start_sk: Any) -> Iterator[Dict[str, Any]]:
+        """Items in key order, after ``(start_pk, start_sk)`` if given."""
+        first = 0
+        if start_pk is not None:
+            first = bisect.bisect_left(self._partition_keys, start_pk)
+        for pk in self._partition_keys[first:]:
+            sort_keys = self._sort_keys[pk]
+            offset = 0
+            if pk == start_pk:
+                offset = bisect.bisect_right(sort_keys, start_sk)
+            partition = self._partitions[pk]
+            for sk in sort_keys[offset:]:
+                yield partition[sk]
+
+    # ---------- Batches ----------
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None
+                     ) -> "MemoryBatchWriter":
+        return MemoryBatchWriter(self, overwrite_by_pkeys)
+
+    @recorded("dynamodb", "BatchWriteItem")
+    def _write_batch(self, requests: List[Dict[str, Any]]) -> None:
+        if len(requests) > BATCH_WRITE_LIMIT:
+            raise validation_error(
+                "Too many items requested for the BatchWriteItem call",
+                "BatchWriteItem",
+            )
+        keys = [self._key(request.get("PutRequest", {}).get("Item")
+                          or request["DeleteRequest"]["Key"],
+                          "BatchWriteItem", exact="DeleteRequest" in request)
+                for request in requests]
+        if len(set(keys)) != len(keys):
+            raise validation_error(
+                "Provided list of item keys contains duplicates",
+                "BatchWriteItem",
+            )
+        with self._lock:
+            for (pk, sk), request in zip(keys, requests):
+                if "PutRequest" in request:
+                    self._store(pk, sk, request["PutRequest"]["Item"])
+                else:
+                    self._discard(pk, sk)
+
+    def _batch_get(self, keys: List[Dict[str, Any]],
+                   attributes: Optional[List[str]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = (self._get(*self._key(key, "BatchGetItem"))
+                     for key in keys)
+            return [_project(item, attributes) for item in items if item]
+
+
+class MemoryBatchWriter:
+    """``Table.batch_writer()`` look-alike: buffers writes, de-duplicates
+    them by ``overwrite_by_pkeys`` and flushes in BatchWriteItem-sized
+    groups."""
+
+    def __init__(self, table: MemoryTable,
+                 overwrite_by_pkeys: Optional[List[str]] = None) -> None:
+        self.table = table
+        self.overwrite_by_pkeys = overwrite_by_pkeys
+        self._buffer: List[Dict[str, Any]] = []
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        self._add({"PutRequest": {"Item": normalize(Item)}})
+
+    def delete_item(self, Key: Dict[str, Any]) -> None:
+        self._add({"DeleteRequest": {"Key": normalize(Key)}})
+
+    def _add(self, request: Dict[str, Any]) -> None:
+        if self.overwrite_by_pkeys:
+            key = self._dedupe_key(request)
+            self._buffer = [pending for pending in self._buffer
+                            if self._dedupe_key(pending) != key]
+        self._buffer.append(request)
+        if len(self._buffer) >= BATCH_WRITE_LIMIT:
+            self._flush()
+
+    def _dedupe_key(self, request: Dict[str, Any]) -> Tuple:
+        values = (request["PutRequest"]["Item"] if "PutRequest" in request
+                  else request["DeleteRequest"]["Key"])
+        return tuple(values.get(name) for name in self.overwrite_by_pkeys)
+
+    def _flush(self) -> None:
+        while self._buffer:
+            batch = self._buffer[:BATCH_WRITE_LIMIT]
+            self._buffer = self._buffer[BATCH_WRITE_LIMIT:]
+            self.table._write_batch(batch)
+
+    def __enter__(self) -> "MemoryBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._flush()
+
+
+class MemoryDynamoDBClient:
+    """
+    In-memory stand-in for ``dynamodb.meta.client``, for the calls the
+    resource doesn't offer.
+
+    Like the client of a boto3 resource, it takes and returns plain
+    Python values rather than DynamoDB wire types.
+    """
+
+    def __init__(self, resource: "MemoryDynamoDB") -> None:
+        self.resource = resource
+
+    @recorded("dynamodb", "TransactWriteItems")
+    def transact_write_items(self, TransactItems: List[Dict[str, Any]],
+                             **_) -> Dict[str, Any]:
+        """All-or-nothing ``Put``, ``Delete`` and ``ConditionCheck``
+        requests, each with an optional ``ConditionExpression``."""
+        operation = "TransactWriteItems"
+        if len(TransactItems) > TRANSACT_WRITE_LIMIT:
+            raise validation_error(
+                "Member must have length less than or equal to "
+                f"{TRANSACT_WRITE_LIMIT}", operation,
+            )
+        writes = []
+        for request in TransactItems:
+            (action, params), = request.items()
+            if action not in ("Put", "Delete", "ConditionCheck"):
+                raise validation_error(
+                    f"Unsupported transaction action: {action}", operation)
+            table = self.resource.Table(params["TableName"])
+            expressions = Expressions(operation,
+                                      params.get("ExpressionAttributeNames"),
+                                      params.get("ExpressionAttributeValues"))
+            condition = expressions.condition(
+                params.get("ConditionExpression"))
+            expressions.check_unused()
+            item = normalize(params["Item"]) if action == "Put" else None
+            pk, sk = table._key(item if item is not None
+                                else normalize(params["Key"]), operation,
+                                exact=item is None)
+            writes.append((table, action, pk, sk, item, condition))
+
+        tables = sorted({id(write[0]): write[0] for write in writes}.values(),
+                        key=lambda table: table.name)
+        with contextlib.ExitStack() as stack:
+            for table in tables:
+                stack.enter_context(table._lock)
+            reasons = [
+                {"Code": "None"}
+                if condition is None
+                or evaluate(condition, table._get(pk, sk) or {})
+                else {"Code": "ConditionalCheckFailed",
+                      "Message": "The conditional request failed"}
+                for table, _, pk, sk, _, condition in writes
+            ]
+            if any(reason["Code"] != "None" for reason in reasons):
+                raise ClientError({
+                    "Error": {"Code": "TransactionCanceledException",
+                              "Message": "Transaction cancelled"},
+                    "CancellationReasons": reasons,
+                    "ResponseMetadata": {"HTTPStatusCode": 400},
+                }, operation)
+            for table, action, pk, sk, item, _ in writes:
+                if action == "Put":
+                    table._store(pk, sk, item)
+                elif action == "Delete":
+                    table._discard(pk, sk)
+        return {}
+
+
+class MemoryMeta:
+    def __init__(self, client: MemoryDynamoDBClient) -> None:
+        self.client = client
+
+
+class MemoryDynamoDB:
+    """
+    In-memory stand-in for the boto3 DynamoDB service resource.
+
+    Tables exist as soon as they are named, with this app's ``PK``/``SK``
+    key schema. Transactions go through ``meta.client``, as with boto3.
+    """
+
+    def __init__(self) -> None:
+        self._tables: Dict[str, MemoryTable] = {}
+        self._lock = threading.Lock()
+        self.meta = MemoryMeta(MemoryDynamoDBClient(self))
+
+    def Table(self, name: str) -> MemoryTable:
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                table = self._tables[name] = MemoryTable(name)
+            return table
+
+    @recorded("dynamodb", "BatchGetItem")
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]],
+                       **_) -> Dict[str, Any]:
+        if sum(len(request["Keys"])
+               for request in RequestItems.values()) > BATCH_GET_LIMIT:
+            raise validation_error(
+                "Too many items requested for the BatchGetItem call",
+                "BatchGetItem",
+            )
+        responses = {}
+        for name, request in RequestItems.items():
+            expressions = Expressions("BatchGetItem",
+                                      request.get("ExpressionAttributeNames"))
+            attributes = expressions.projection(
+                request.get("ProjectionExpression"))
+            expressions.check_unused()
+            responses[name] = self.Table(name)._batch_get(
+                [normalize(key) for key in request["Keys"]], attributes)
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]],
+                         **_) -> Dict[str, Any]:
+        for name, requests in RequestItems.items():
+            self.Table(name)._write_batch([normalize(request)
+                                           for request in requests])
+        return {"UnprocessedItems": {}}
@@ -0,0 +1,594 @@
+"""
+Parser and evaluator for DynamoDB expressions, used by the memory backend.
+
+Conditions cover what key conditions, filters and conditional writes
+accept: comparisons, ``BETWEEN``, ``IN``, ``AND``/``OR``/``NOT`` and the
+functions ``attribute_exists``, ``attribute_not_exists``,
+``attribute_type``, ``begins_with``, ``contains`` and ``size``. Update
+expressions cover ``SET`` (with ``+``, ``-``, ``if_not_exists`` and
+``list_append``), ``REMOVE``, ``ADD`` and ``DELETE``. boto3 ``Key``/``Attr``
+objects are rendered to strings by boto3's own builder first.
+"""
+import re
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from boto3.dynamodb.conditions import (ConditionBase,
+                                       ConditionExpressionBuilder)
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from services.storage.common import client_error
+
+MISSING = object()
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<placeholder>[#:][A-Za-z0-9_]+)
+      | (?P<number>\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><>|<=|>=|[=<>(),.\[\]+\-])
+    )""", re.VERBOSE)
+
+COMPARATORS = {"=", "<>", "<", "<=", ">", ">="}
+UPDATE_CLAUSES = {"SET", "REMOVE", "ADD", "DELETE"}
+TYPE_NAMES = {"S", "N", "B", "BOOL", "NULL", "SS", "NS", "BS", "L", "M"}
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def normalize(value: Any) -> Any:
+    """``value`` as the boto3 resource would store and return it.
+
+    Round-trips through DynamoDB's wire types, so ints become Decimals,
+    floats are rejected like boto3 rejects them, and the result shares
+    nothing with the input.
+    """
+    return _deserializer.deserialize(_serializer.serialize(value))
+
+
+def validation_error(message: str, operation: str):
+    return client_error("ValidationException", message, operation)
+
+
+# ---------- Parsing ----------
+class Expressions:
+    """
+    Placeholders for the expressions of one request.
+
+    Every expression of a request shares one builder, so rendered boto3
+    conditions never reuse a placeholder, and placeholders are tracked so
+    unused ones are rejected as DynamoDB rejects them.
+    """
+
+    def __init__(self, operation: str,
+                 names: Optional[Dict[str, str]] = None,
+                 values: Optional[Dict[str, Any]] = None) -> None:
+        self.operation = operation
+        self.names = dict(names or {})
+        self.values = {key: normalize(value)
+                       for key, value in (values or {}).items()}
+        self._builder = ConditionExpressionBuilder()
+        self._used: Set[str] = set()
+        self._supplied = set(self.names) | set(self.values)
+
+    def condition(self, expression, is_key_condition: bool = False):
+        """AST of a condition string or boto3 condition object."""
+        if expression is None:
+            return None
+        if isinstance(expression, ConditionBase):
+            built = self._builder.build_expression(
+                expression, is_key_condition=is_key_condition
+            )
+            self.names.update(built.attribute_name_placeholders)
+            self.values.update(
+                (key, normalize(value))
+                for key, value in built.attribute_value_placeholders.items()
+            )
+            expression = built.condition_expression
+        parser = _Parser(expression, self)
+        node = parser.condition()
+        parser.end()
+        return node
+
+    def update(self, expression: str):
+        parser = _Parser(expression, self)
+        actions = parser.update()
+        parser.end()
+        return actions
+
+    def projection(self, expression: Optional[str]) -> Optional[List[str]]:
+        """Top-level attribute names of a projection expression."""
+        if expression is None:
+            return None
+        parser = _Parser(expression, self)
+        paths = [parser.path()]
+        while parser.accept(","):
+            paths.append(parser.path())
+        parser.end()
+        if any(len(path) > 1 for path in paths):
+            raise validation_error(
+                "Nested projections are not supported by the memory backend",
+                self.operation,
+            )
+        return [path[0] for path in paths]
+
+    def resolve_name(self, token: str) -> str:
+        if token.startswith("#"):
+            if token not in self.names:
+                raise validation_error(
+                    f"An expression attribute name used in the document "
+                    f"path is not defined; attribute name: {token}",
+                    self.operation,
+                )
+            self._used.add(token)
+            return self.names[token]
+        return token
+
+    def resolve_value(self, token: str) -> Any:
+        if token not in self.values:
+            raise validation_error(
+                f"An expression attribute value used in expression is not "
+                f"defined; attribute value: {token}", self.operation,
+            )
+        self._used.add(token)
+        return self.values[token]
+
+    def check_unused(self) -> None:
+        unused = self._supplied - self._used
+        if unused:
+            raise validation_error(
+                "Value provided in ExpressionAttributeNames or "
+                "ExpressionAttributeValues unused in expressions: "
+                f"keys: {{{', '.join(sorted(unused))}}}", self.operation,
+            )
+
+
+class _Parser:
+    def __init__(self, expression: str, context: Expressions) -> None:
+        self.expression = expression
+        self.context = context
+        self.tokens = self._tokenize(expression)
+        self.position = 0
+
+    def _tokenize(self, expression: str) -> List[str]:
+        tokens = []
+        position = 0
+        while position < len(expression):
+            match = TOKEN_PATTERN.match(expression, position)
+            if not match or match.end() == position:
+                if expression[position:].strip():
+                    self.fail(f"unexpected {expression[position:]!r}")
+                break
+            tokens.append(match.group(match.lastgroup))
+            position = match.end()
+        return tokens
+
+    def fail(self, message: str):
+        raise validation_error(
+            f"Invalid expression {self.expression!r}: {message}",
+            self.context.operation,
+        )
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, offset: int = 0) -> Optional[str]:
+        token = self.peek(offset)
+        return token.upper() if token else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            self.fail("unexpected end of expression")
+        self.position += 1
+        return token
+
+    def accept(self, token: str) -> bool:
+        if self.keyword() == token.upper():
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, token: str) -> None:
+        if not self.accept(token):
+            self.fail(f"expected {token!r} at {self.peek()!r}")
+
+    def end(self) -> None:
+        if self.peek() is not None:
+            self.fail(f"unexpected {self.peek()!r}")
+
+    # Conditions
+    def condition(self):
+        node = self._and()
+        while self.accept("OR"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self.accept("AND"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self.accept("NOT"):
+            return ("not", self._not())
+        return self._primary()
+
+    def _primary(self):
+        if self.accept("("):
+            node = self.condition()
+            self.expect(")")
+            return node
+
+        name = self.peek()
+        if (self.peek(1) == "(" and name
+                and name.lower() in ("attribute_exists",
+                                     "attribute_not_exists",
+                                     "attribute_type", "begins_with",
+                                     "contains")):
+            self.position += 2
+            args = [self.operand()]
+            while self.accept(","):
+                args.append(self.operand())
+            self.expect(")")
+            return ("func", name.lower(), args)
+
+        left = self.operand()
+        if self.peek() in COMPARATORS:
+            return ("cmp", self.take(), left, self.operand())
+        if self.accept("BETWEEN"):
+            low = self.operand()
+            self.expect("AND")
+            return ("between", left, low, self.operand())
+        if self.accept("IN"):
+            self.expect("(")
+            options = [self.operand()]
+            while self.accept(","):
+                options.append(self.operand())
+            self.expect(")")
+            return ("in", left, options)
+        self.fail(f"expected a comparison at {self.peek()!r}")
+
+    def operand(self):
+        token = self.peek()
+        if token is None:
+            self.fail("expected an operand")
+        if token.startswith(":"):
+            self.position += 1
+            return ("value", self.context.resolve_value(token))
+        if token.lower() == "size" and self.peek(1) == "(":
+            self.position += 2
+            path = self.path()
+            self.expect(")")
+            return ("size", path)
+        return ("path", self.path())
+
+    def path(self) -> List[Any]:
+        token = self.take()
+        if not (token.startswith("#") or token[0].isalpha() or token[0] == "_"):
+            self.fail(f"expected an attribute name at {token!r}")
+        segments: List[Any] = [self.context.resolve_name(token)]
+        while self.peek() in (".", "["):
+            if self.accept("."):
+                segments.append(self.context.resolve_name(self.take()))
+            else:
+                self.take()
+                index = self.take()
+                if not index.isdigit():
+                    self.fail(f"expected a list index at {index!r}")
+                segments.append(int(index))
+                self.expect("]")
+        return segments
+
+    # Updates
+    def update(self) -> List[Tuple]:
+        actions: List[Tuple] = []
+        seen = set()
+        while self.peek() is not None:
+            clause = self.keyword()
+            if clause not in UPDATE_CLAUSES or clause in seen:
+                self.fail(f"expected SET, REMOVE, ADD or DELETE at "
+                          f"{self.peek()!r}")
+            seen.add(clause)
+            self.position += 1
+            while True:
+                actions.append(self._update_action(clause))
+                if not self.accept(","):
+                    break
+        if not actions:
+            self.fail("empty update expression")
+        return actions
+
+    def _update_action(self, clause: str) -> Tuple:
+        path = self.path()
+        if clause == "SET":
+            self.expect("=")
+            return ("set", path, self._set_value())
+        if clause == "REMOVE":
+            return ("remove", path)
+        value = self.operand()
+        if value[0] != "value":
+            self.fail(f"{clause} takes a value placeholder")
+        return (clause.lower(), path, value[1])
+
+    def _set_value(self):
+        left = self._set_operand()
+        if self.accept("+"):
+            return ("plus", left, self._set_operand())
+        if self.accept("-"):
+            return ("minus", left, self._set_operand())
+        return left
+
+    def _set_operand(self):
+        name = (self.peek() or "").lower()
+        if name in ("if_not_exists", "list_append") and self.peek(1) == "(":
+            self.position += 2
+            first = self._set_operand()
+            self.expect(",")
+            second = self._set_operand()
+            self.expect(")")
+            if name == "if_not_exists":
+                if first[0] != "path":
+                    self.fail("if_not_exists takes a path first")
+                return ("if_not_exists", first[1], second)
+            return ("list_append", first, second)
+        return self.operand()
+
+
+# ---------- Evaluation ----------
+def get_path(item: Dict[str, Any], path: List[Any]) -> Any:
+    value: Any = item
+    for segment in path:
+        if isinstance(segment, int):
+            if not isinstance(value, list) or segment >= len(value):
+                return MISSING
+        elif not isinstance(value, dict) or segment not in value:
+            return MISSING
+        value = value[segment]
+    return value
+
+
+def _type_name(value: Any) -> Optional[str]:
+    if value is MISSING:
+        return None
+    return next(iter(_serializer.serialize(value)))
+
+
+def _operand_value(item: Dict[str, Any], node) -> Any:
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "path":
+        return get_path(item, node[1])
+    value = get_path(item, node[1])  # size()
+    if isinstance(value, (str, bytes, bytearray, list, dict, set)):
+        return Decimal(len(value))
+    return MISSING
+
+
+def _comparable(left: Any, right: Any) -> bool:
+    if left is MISSING or right is MISSING:
+        return False
+    left_type, right_type = _type_name(left), _type_name(right)
+    return left_type == right_type and left_type in ("S", "N", "B")
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if op in ("=", "<>"):
+        equal = (left is not MISSING and right is not MISSING
+                 and _type_name(left) == _type_name(right) and left == right)
+        return equal if op == "=" else not equal
+    if not _comparable(left, right):
+        return False
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+def evaluate(node, item: Dict[str, Any]) -> bool:
+    """Whether ``item`` satisfies the condition AST ``node``."""
+    kind = node[0]
+    if kind == "and":
+        return evaluate(node[1], item) and evaluate(node[2], item)
+    if kind == "or":
+        return evaluate(node[1], item) or evaluate(node[2], item)
+    if kind == "not":
+        return not evaluate(node[1], item)
+    if kind == "cmp":
+        return _compare(node[1], _operand_value(item, node[2]),
+                        _operand_value(item, node[3]))
+    if kind == "between":
+        value = _operand_value(item, node[1])
+        return (_compare(">=", value, _operand_value(item, node[2]))
+                and _compare("<=", value, _operand_value(item, node[3])))
+    if kind == "in":
+        value = _operand_value(item, node[1])
+        return any(_compare("=", value, _operand_value(item, option))
+                   for option in node[2])
+
+    name, args = node[1], node[2]
+    first = _operand_value(item, args[0])
+    if name == "attribute_exists":
+        return first is not MISSING
+    if name == "attribute_not_exists":
+        return first is MISSING
+    second = _operand_value(item, args[1])
+    if name == "attribute_type":
+        return second in TYPE_NAMES and _type_name(first) == second
+    if name == "begins_with":
+        return (isinstance(first, (str, bytes))
+                and type(first) is type(second) and first.startswith(second))
+    # contains
+    if isinstance(first, str) and isinstance(second, str):
+        return second in first
+    if isinstance(first, (set, list)):
+        return second in first
+    return False
+
+
+def _sort_predicate(part, range_key: Optional[str]) -> Optional[Tuple]:
+    path = ("path", [range_key])
+    kind = part[0]
+    if (kind == "cmp" and part[1] != "<>" and part[2] == path
+            and part[3][0] == "value"):
+        return (part[1], part[3][1])
+    if (kind == "between" and part[1] == path
+            and part[2][0] == part[3][0] == "value"):
+        return ("between", part[2][1], part[3][1])
+    if (kind == "func" and part[1] == "begins_with" and part[2][0] == path
+            and part[2][1][0] == "value"):
+        return ("begins_with", part[2][1][1])
+    return None
+
+
+def key_condition(node, hash_key: str, range_key: Optional[str],
+                  operation: str) -> Tuple[Any, Optional[Tuple]]:
+    """Split a key condition into the partition key value and the sort
+    key predicate ``(op, *values)``, or None when it has none."""
+    parts = [node[1], node[2]] if node[0] == "and" else [node]
+    partition: Any = MISSING
+    sort = None
+
+    for part in parts:
+        if (part[0] == "cmp" and part[1] == "="
+                and part[2] == ("path", [hash_key])
+                and part[3][0] == "value" and partition is MISSING):
+            partition = part[3][1]
+            continue
+        predicate = _sort_predicate(part, range_key) if sort is None else None
+        if predicate is None:
+            break
+        sort = predicate
+    else:
+        if partition is not MISSING:
+            return partition, sort
+    raise validation_error("Query key condition not supported", operation)
+
+
+# ---------- Updates ----------
+def _set_value(item: Dict[str, Any], node, operation: str) -> Any:
+    kind = node[0]
+    if kind == "if_not_exists":
+        existing = get_path(item, node[1])
+        return (existing if existing is not MISSING
+                else _set_value(item, node[2], operation))
+    if kind == "list_append":
+        first = _set_value(item, node[1], operation)
+        second = _set_value(item, node[2], operation)
+        if not (isinstance(first, list) and isinstance(second, list)):
+            raise validation_error("list_append takes two lists", operation)
+        return first + second
+    if kind in ("plus", "minus"):
+        left = _set_value(item, node[1], operation)
+        right = _set_value(item, node[2], operation)
+        if not (isinstance(left, Decimal) and isinstance(right, Decimal)):
+            raise validation_error(
+                "An operand in the update expression has an incorrect data "
+                "type", operation,
+            )
+        return left + right if kind == "plus" else left - right
+    value = _operand_value(item, node)
+    if value is MISSING:
+        raise validation_error(
+            "The provided expression refers to an attribute that does not "
+            "exist in the item", operation,
+        )
+    return normalize(value)
+
+
+def _parent(item: Dict[str, Any], path: List[Any], operation: str):
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    if parent is MISSING or not isinstance(parent, (dict, list)):
+        raise validation_error(
+            "The document path provided in the update expression is invalid "
+            "for update", operation,
+        )
+    return parent
+
+
+def _assign(item: Dict[str, Any], path: List[Any], value: Any,
+            operation: str) -> None:
+    parent = _parent(item, path, operation)
+    last = path[-1]
+    if isinstance(parent, list):
+        if not isinstance(last, int):
+            raise validation_error("Invalid list path", operation)
+        if last >= len(parent):
+            parent.append(value)
+        else:
+            parent[last] = value
+    else:
+        parent[last] = value
+
+
+def _remove(item: Dict[str, Any], path: List[Any], operation: str) -> None:
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    last = path[-1]
+    if isinstance(parent, dict):
+        parent.pop(last, None)
+    elif isinstance(parent, list) and isinstance(last, int):
+        if last < len(parent):
+            del parent[last]
+
+
+def apply_update(item: Dict[str, Any], actions: List[Tuple],
+                 key_names: Tuple[str, ...], operation: str) -> Set[str]:
+    """Apply parsed update ``actions`` to ``item`` in place; return the
+    top-level attributes touched."""
+    # Right-hand sides see the item as it was before the update
+    original = normalize(item) if item else {}
+    touched: Set[str] = set()
+
+    for action in actions:
+        kind, path = action[0], action[1]
+        if path[0] in key_names:
+            raise validation_error(
+                "One or more parameter values were invalid: Cannot update "
+                f"attribute {path[0]}. This attribute is part of the key",
+                operation,
+            )
+        touched.add(path[0])
+
+        if kind == "set":
+            _assign(item, path, _set_value(original, action[2], operation),
+                    operation)
+        elif kind == "remove":
+            _remove(item, path, operation)
+        elif kind == "add":
+            value = action[2]
+            current = get_path(item, path)
+            if current is MISSING:
+                _assign(item, path, value, operation)
+            elif isinstance(current, Decimal) and isinstance(value, Decimal):
+                _assign(item, path, current + value, operation)
+            elif isinstance(current, set) and isinstance(value, set):
+                _assign(item, path, current | value, operation)
+            else:
+                raise validation_error(
+                    "An operand in the update expression has an incorrect "
+                    "data type", operation,
+                )
+        else:  # delete
+            value = action[2]
+            current = get_path(item, path)
+            if current is MISSING:
+                continue
+            if not (isinstance(current, set) and isinstance(value, set)):
+                raise validation_error(
+                    "An operand in the update expression has an incorrect "
+                    "data type", operation,
+                )
+            remaining = current - value
+            if remaining:
+                _assign(item, path, remaining, operation)
+            else:
+                _remove(item, path, operation)
+
+    return touched
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Optional
+
+from botocore.response import StreamingBody
+
+from services.storage.common import client_error, recorded
+
+
+def _read_body(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    return body.read()
+
+
+class MemoryS3:
+    """
+    In-memory stand-in for the boto3 S3 client.
+
+    Covers the object calls the app makes; bodies come back as botocore
+    ``StreamingBody`` objects, so ``read()`` and ``iter_chunks()`` behave
+    as they do against S3. Buckets exist as soon as they are used.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, name: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self._buckets.setdefault(name, {})
+
+    def _object(self, bucket: str, key: str,
+                operation: str, code: str = "NoSuchKey") -> Dict[str, Any]:
+        stored = self._bucket(bucket).get(key)
+        if stored is None:
+            raise client_error(code, "The specified key does not exist.",
+                               operation)
+        return stored
+
+    def create_bucket(self, Bucket: str, **_) -> Dict[str, Any]:
+        self._bucket(Bucket)
+        return {"Location": f"/{Bucket}"}
+
+    def list_buckets(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"Buckets": [{"Name": name} for name in self._buckets]}
+
+    @recorded("s3", "PutObject")
+    def put_object(self, Bucket: str, Key: str, Body: Any = None,
+                   ContentType: str = "binary/octet-stream",
+                   ContentEncoding: Optional[str] = None,
+                   Metadata: Optional[Dict[str, str]] = None,
+                   **_) -> Dict[str, Any]:
+        data = _read_body(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self._bucket(Bucket)[Key] = {
+            "Body": data,
+            "ContentType": ContentType,
+            "ContentEncoding": ContentEncoding,
+            "Metadata": dict(Metadata or {}),
+            "ETag": etag,
+            "LastModified": datetime.now(timezone.utc),
+        }
+        return {"ETag": etag}
+
+    def upload_fileobj(self, Fileobj: IO[bytes], Bucket: str, Key: str,
+                       ExtraArgs: Optional[Dict[str, Any]] = None,
+                       **_) -> None:
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj,
+                        **(ExtraArgs or {}))
+
+    @recorded("s3", "HeadObject")
+    def head_object(self, Bucket: str, Key: str, **_) -> Dict[str, Any]:
+        stored = self._object(Bucket, Key, "HeadObject", code="404")
+        return self._metadata(stored)
+
+    @recorded("s3", "GetObject")
+    def get_object(self, Bucket: str, Key: str, **_) -> Dict[str, Any]:
+        stored = self._object(Bucket, Key, "GetObject")
+        data = stored["Body"]
+        return {**self._metadata(stored),
+                "Body": StreamingBody(io.BytesIO(data), len(data))}
+
+    def download_fileobj(self, Bucket: str, Key: str,
+                         Fileobj: IO[bytes], **_) -> None:
+        Fileobj.write(self.get_object(Bucket=Bucket, Key=Key)["Body"].read())
+
+    @recorded("s3", "DeleteObject")
+    def delete_object(self, Bucket: str, Key: str, **_) -> Dict[str, Any]:
+        self._bucket(Bucket).pop(Key, None)
+        return {}
+
+    @recorded("s3", "ListObjectsV2")
+    def list_objects_v2(self, Bucket: str, Prefix: str = "",
+                        MaxKeys: int = 1000,
+                        ContinuationToken: Optional[str] = None,
+                        **_) -> Dict[str, Any]:
+        keys = sorted(key for key in list(self._bucket(Bucket))
+                      if key.startswith(Prefix)
+                      and (ContinuationToken is None
+                           or key > ContinuationToken))
+        page = keys[:MaxKeys]
+        bucket = self._bucket(Bucket)
+        response: Dict[str, Any] = {
+            "KeyCount": len(page),
+            "IsTruncated": len(keys) > MaxKeys,
+            "Contents": [{"Key": key, "Size": len(bucket[key]["Body"]),
+                          "ETag": bucket[key]["ETag"],
+                          "LastModified": bucket[key]["LastModified"]}
+                         for key in page if key in bucket],
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+    @staticmethod
+    def _metadata(stored: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = {
+            "ContentLength": len(stored["Body"]),
+            "ContentType": stored["ContentType"],
+            "ETag": stored["ETag"],
+            "LastModified": stored["LastModified"],
+            "Metadata": dict(stored["Metadata"]),
+        }
+        if stored["ContentEncoding"]:
+            metadata["ContentEncoding"] = stored["ContentEncoding"]
+        return metadata
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from models.forum_models import get_timestamp
+from services.aws_clients import AWSClients
+from services.cache import LRUCache
+from services.openrouter_api import API_MODEL, PROMPT_VERSION
+
+FRONT_CACHE_SIZE = 512
+
+# In-process front for the table-backed cache, shared by all instances
+_front_cache = LRUCache(maxsize=FRONT_CACHE_SIZE)
+
+
+def summary_pk(sha256: str) -> str:
+    return f"SUMMARY#{sha256}"
+
+
+class SummaryCache:
+    """
+    Attachment summaries keyed by the SHA-256 of the attachment bytes.
+
+    Entries are scoped to the model and prompt version that produced them,
+    so changing either naturally misses the cache. Reads go through an
+    in-process LRU before the DynamoDB item.
+    """
+
+    def __init__(self, aws_clients: AWSClients,
+                 model: str = API_MODEL,
+                 prompt_version: str = PROMPT_VERSION) -> None:
+        self.table = aws_clients.table
+        self.variant = f"{model}#{prompt_version}"
+
+    def get(self, sha256: str) -> Optional[str]:
+        front_key = (sha256, self.variant)
+        summary = _front_cache.get(front_key)
+        if summary is not None:
+            return summary
+
+        try:
+            response = self.table.get_item(
+                Key={"PK": summary_pk(sha256), "SK": self.variant}
+            )
+        except ClientError:
+            return None
+
+        item = response.get("Item")
+        if not item:
+            return None
+
+        _front_cache.set(front_key, item["summary"])
+        return item["summary"]
+
+    def put(self, sha256: str, summary: str) -> None:
+        self.table.put_item(Item={
+            "PK": summary_pk(sha256),
+            "SK": self.variant,
+            "summary": summary,
+            "created_at": get_timestamp(),
+        })
+        _front_cache.set((sha256, self.variant), summary)
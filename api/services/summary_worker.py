@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+from services.attachment_text import AttachmentTextStore
+from services.aws_clients import AWSClients, get_aws_clients
+from services.job_queue import JobQueue, JobType
+from services.llm_client import close_llm_client
+from services.openrouter_api import summarize_document
+from services.pdf_extractor import extract_s3_pdf_pages_async
+from services.post_service import PostService
+from services.search_index import SearchIndex, attachment_source
+from services.summary_cache import SummaryCache
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.getenv("SUMMARY_WORKER_CONCURRENCY", "2"))
+POLL_INTERVAL = 10.0  # seconds
+
+
+class SummaryWorker:
+    """
+    Drains attachment summary jobs from the job table.
+
+    Jobs are claimed under a lease, so any number of workers can run
+    side by side; at most ``concurrency`` jobs run at once per worker.
+    """
+
+    def __init__(self, aws_clients: AWSClients,
+                 concurrency: int = WORKER_CONCURRENCY,
+                 poll_interval: float = POLL_INTERVAL) -> None:
+        self.clients = aws_clients
+        self.queue = JobQueue(aws_clients)
+        self.summaries = SummaryCache(aws_clients)
+        self.texts = AttachmentTextStore(aws_clients)
+        self.search_index = SearchIndex(aws_clients)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = (f"{socket.gethostname()}-{os.getpid()}-"
+                          f"{uuid.uuid4().hex[:8]}")
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run_once(self) -> int:
+        """Process every job that is currently due; return how many ran."""
+        jobs = await asyncio.to_thread(self.queue.find_ready,
+                                       self.concurrency * 4)
+        results = await asyncio.gather(*(self._process(job) for job in jobs))
+        return sum(results)
+
+    async def run_forever(self) -> None:
+        while True:
+            processed = await self.run_once()
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process(self, job: Dict[str, Any]) -> bool:
+        async with self._slots:
+            claimed = await asyncio.to_thread(self.queue.claim, job,
+                                              self.worker_id)
+            if claimed is None:
+                return False
+
+            try:
+                result = await self.handle(claimed)
+            except Exception as e:
+                logger.exception(f"Job {claimed['job_id']} failed")
+                await asyncio.to_thread(self.queue.fail, claimed,
+                                        self.worker_id, str(e))
+            else:
+                await asyncio.to_thread(self.queue.complete, claimed,
+                                        self.worker_id, result)
+            return True
+
+    async def handle(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if job["job_type"] != JobType.SUMMARY:
+            raise ValueError(f"Unknown job type: {job['job_type']}")
+
+        payload = job["payload"]
+        pages, sha256 = await self._extract(payload)
+        if not "".join(pages).strip():
+            return {"skipped": "No text could be extracted"}
+
+        # Attachment text is searchable even if summarizing fails below
+        await asyncio.to_thread(self.search_index.index_source,
+                                job["post_id"],
+                                attachment_source(payload["s3_key"]),
+                                " ".join(pages))
+
+        summary, cached = await self._summarize(pages, sha256)
+        patched = await PostService(self.clients).patch_post(
+            job["post_id"], {"summary": summary}
+        )
+        if "error" in patched:
+            return {"skipped": patched["error"]}
+        return {"summary_chars": len(summary), "cached": cached}
+
+    async def _extract(self, payload: Dict[str, Any]):
+        """Return ``(pages, sha256)`` for the attachment in payload.
+
+        Text is extracted once per distinct document and kept compressed
+        in S3; later jobs for the same bytes read it back instead of
+        downloading and parsing the PDF again.
+        """
+        sha256 = payload.get("sha256")
+        if sha256:
+            pages = await asyncio.to_thread(self.texts.get, sha256)
+            if pages is not None:
+                return pages, sha256
+
+        pages, sha256 = await extract_s3_pdf_pages_async(
+            self.clients.s3_bucket, payload["s3_key"]
+        )
+        await asyncio.to_thread(self.texts.put, sha256, pages)
+        return pages, sha256
+
+    async def _summarize(self, pages, sha256: str):
+        """Return ``(summary, from_cache)``; identical documents are
+        summarized once."""
+        summary = await asyncio.to_thread(self.summaries.get, sha256)
+        if summary is not None:
+            return summary, True
+
+        # Model failures raise LLMError, so the job is retried
+        summary = await summarize_document(pages)
+        await asyncio.to_thread(self.summaries.put, sha256, summary)
+        return summary, False
+
+
+def main() -> None:
+    """Worker entry point: ``python -m services.summary_worker``"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--once", action="store_true",
+                        help="drain due jobs and exit instead of polling")
+    parser.add_argument("--concurrency", type=int,
+                        default=WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        worker = SummaryWorker(get_aws_clients(), concurrency=args.concurrency)
+        try:
+            if args.once:
+                processed = await worker.run_once()
+                logger.info(f"Processed {processed} job(s)")
+            else:
+                await worker.run_forever()
+        finally:
+            await close_llm_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+App-scoped supervisor for background work.
+
+Work is submitted under a task class, each with a bounded queue and a
+fixed number of workers:
+
+- ``summaries``: queueing PDF summary jobs after a post is created
+- ``search_index``: updating search postings after a post is written
+- ``cache_refresh``: rebuilding feed snapshots
+- ``bookkeeping``: batched login bookkeeping writes
+
+``submit`` rejects work when a class's queue is full; ``submit_wait`` and
+``run`` wait for room instead, pushing back on the caller. Failures are
+logged with their traceback and counted in ``background_tasks_total``.
+
+Long-running loops (the feed snapshot refresher) run as supervised
+services, restarted with backoff if they crash. Components that buffer
+work register a flush hook. On lifespan shutdown ``drain`` stops
+accepting work, flushes those buffers, waits up to ``TASK_DRAIN_TIMEOUT``
+seconds for queued work, and cancels whatever is left.
+
+Lambda runs no lifespan (see ``main.handler``). Instead
+``finish_invocation`` flushes the work a request queued before the
+response is returned, since a frozen process can't run it afterwards.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT = float(os.getenv("TASK_DRAIN_TIMEOUT", "4"))
+MAX_RESTART_DELAY = 30.0  # seconds
+INVOCATION_MARGIN = 1.0  # seconds kept for returning the Lambda response
+
+background_tasks = registry.register(Counter(
+    "background_tasks_total",
+    "Background tasks by class and outcome (completed, failed, rejected, "
+    "dropped).",
+    ("task_class", "outcome"),
+))
+
+
+class TaskClass:
+    """Queue bound and concurrency of one kind of background work."""
+
+    def __init__(self, queue_size: int, concurrency: int) -> None:
+        if queue_size < 1 or concurrency < 1:
+            raise ValueError("queue_size and concurrency must be positive")
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+
+
+TASK_CLASSES: Dict[str, TaskClass] = {
+    "summaries": TaskClass(queue_size=100, concurrency=4),
+    "search_index": TaskClass(queue_size=100, concurrency=2),
+    "cache_refresh": TaskClass(queue_size=4, concurrency=1),
+    "bookkeeping": TaskClass(queue_size=16, concurrency=1),
+}
+
+Work = Tuple[Callable[..., Any], Tuple[Any, ...], Optional[asyncio.Future]]
+
+
+class TaskSupervisor:
+    """
+    Bounded queues and workers per task class, plus supervised services.
+
+    Queues and workers are created lazily on the running event loop and
+    recreated after a drain.
+    """
+
+    def __init__(self, classes: Optional[Dict[str, TaskClass]] = None) -> None:
+        self.classes = classes or TASK_CLASSES
+        self._queues: Dict[str, "asyncio.Queue[Work]"] = {}
+        self._workers: List[asyncio.Task] = []
+        self._services: Dict[str, asyncio.Task] = {}
+        self._flush_hooks: List[Callable[[], Awaitable[Any]]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._draining = False
+
+    @property
+    def draining(self) -> bool:
+        """Whether a drain is in progress and new work is refused."""
+        return self._draining
+
+    def _queue(self, task_class: str) -> "asyncio.Queue[Work]":
+        if task_class not in self.classes:
+            raise ValueError(f"Unknown task class: {task_class}")
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # First use, or a new loop after the old one closed
+            self._queues, self._workers, self._services = {}, [], {}
+            self._loop = loop
+
+        queue = self._queues.get(task_class)
+        if queue is None:
+            settings = self.classes[task_class]
+            queue = asyncio.Queue(maxsize=settings.queue_size)
+            self._queues[task_class] = queue
+            self._workers += [loop.create_task(self._work(task_class, queue))
+                              for _ in range(settings.concurrency)]
+        return queue
+
+    def submit(self, task_class: str, function: Callable[..., Any],
+               *args: Any) -> bool:
+        """Queue ``function(*args)``; False if the queue is full."""
+        if self._draining:
+            background_tasks.inc((task_class, "rejected"))
+            return False
+        try:
+            self._queue(task_class).put_nowait((function, args, None))
+            return True
+        except asyncio.QueueFull:
+            background_tasks.inc((task_class, "rejected"))
+            logger.warning(f"{task_class} queue full, task rejected")
+            return False
+
+    async def submit_wait(self, task_class: str,
+                          function: Callable[..., Any], *args: Any) -> bool:
+        """Queue ``function(*args)``, waiting for room if the queue is full.
+        False while draining, when no new work is accepted."""
+        if self._draining:
+            background_tasks.inc((task_class, "rejected"))
+            return False
+        await self._queue(task_class).put((function, args, None))
+        return True
+
+    async def run(self, task_class: str, function: Callable[..., Any],
+                  *args: Any) -> Any:
+        """Run ``function(*args)`` within the class's limits and return
+        its result. Raises ``RuntimeError`` while draining."""
+        if self._draining:
+            background_tasks.inc((task_class, "rejected"))
+            raise RuntimeError("Task supervisor is shutting down")
+        done = asyncio.get_running_loop().create_future()
+        await self._queue(task_class).put((function, args, done))
+        return await done
+
+    async def _work(self, task_class: str,
+                    queue: "asyncio.Queue[Work]") -> None:
+        while True:
+            function, args, done = await queue.get()
+            try:
+                if asyncio.iscoroutinefunction(function):
+                    result = await function(*args)
+                else:
+                    result = await asyncio.to_thread(function, *args)
+                background_tasks.inc((task_class, "completed"))
+                if done is not None and not done.done():
+                    done.set_result(result)
+            except asyncio.CancelledError:
+                if done is not None:
+                    done.cancel()
+                raise
+            except Exception as e:
+                background_tasks.inc((task_class, "failed"))
+                logger.exception(f"{task_class} task "
+                                 f"{getattr(function, '__qualname__', function)}"
+                                 f" failed")
+                if done is not None and not done.done():
+                    done.set_exception(e)
+            finally:
+                queue.task_done()
+
+    def start_service(self, name: str,
+                      function: Callable[[], Awaitable[Any]]) -> None:
+        """Run ``function()`` until drained, restarting it if it fails."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._queues, self._workers, self._services = {}, [], {}
+            self._loop = loop
+        task = self._services.get(name)
+        if self._draining or (task is not None and not task.done()):
+            return
+        self._services[name] = loop.create_task(
+            self._supervise(name, function))
+
+    @staticmethod
+    async def _supervise(name: str,
+                         function: Callable[[], Awaitable[Any]]) -> None:
+        delay = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                await function()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Background service {name} crashed, "
+                                 f"restarting in {delay:.0f}s")
+            if time.monotonic() - started > MAX_RESTART_DELAY:
+                delay = 1.0
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    def add_flush_hook(self, hook: Callable[[], Awaitable[Any]]) -> None:
+        """Call ``await hook()`` at the start of every flush and drain."""
+        self._flush_hooks.append(hook)
+
+    async def flush(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """Flush buffers and wait for queued work; False on timeout."""
+        deadline = time.monotonic() + timeout
+        for hook in list(self._flush_hooks):
+            try:
+                await asyncio.wait_for(
+                    hook(), max(0.0, deadline - time.monotonic()))
+            except Exception:
+                logger.exception("Background flush hook failed")
+        queues = list(self._queues.values())
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in queues)),
+                max(0.0, deadline - time.monotonic()))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Stop accepting work, finish what is queued within ``timeout``
+        seconds, then cancel services and unfinished work."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._draining = True
+        try:
+            for task in self._services.values():
+                task.cancel()
+            await self.flush(timeout)
+            tasks = self._workers + list(self._services.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for task_class, queue in self._queues.items():
+                if queue.qsize():
+                    background_tasks.inc((task_class, "dropped"),
+                                         queue.qsize())
+                    logger.warning(f"Dropped {queue.qsize()} queued "
+                                   f"{task_class} task(s) at shutdown")
+        finally:
+            self._queues, self._workers, self._services = {}, [], {}
+            self._draining = False
+
+
+_supervisor: Optional[TaskSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_task_supervisor() -> TaskSupervisor:
+    """Return the process-wide supervisor, creating it on first use."""
+    global _supervisor
+    if _supervisor is None:
+        with _supervisor_lock:
+            if _supervisor is None:
+                _supervisor = TaskSupervisor()
+    return _supervisor
+
+
+async def drain_task_supervisor() -> None:
+    if _supervisor is not None:
+        await _supervisor.drain()
+
+
+def finish_invocation(context: Any) -> None:
+    """Give work queued during a Lambda invocation time to finish before
+    the handler returns and the process is frozen.
+
+    Bounded by ``TASK_DRAIN_TIMEOUT`` and the invocation's remaining time.
+    Workers are kept for the next invocation.
+    """
+    if _supervisor is None or _supervisor._loop is None:
+        return
+    timeout = DRAIN_TIMEOUT
+    if context is not None:
+        remaining = context.get_remaining_time_in_millis() / 1000
+        timeout = min(timeout, max(0.0, remaining - INVOCATION_MARGIN))
+    if not _supervisor._loop.run_until_complete(_supervisor.flush(timeout)):
+        logger.warning("Background work still running at the end of the "
+                       "invocation; it resumes with the next one")
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+import jwt
+from jwt import PyJWKClient
+
+HMAC_ALGORITHMS = ["HS256"]
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+DEFAULT_AUDIENCE = "authenticated"
+REQUIRED_CLAIMS = ["exp", "sub", "aud"]
+JWKS_CACHE_LIFESPAN = 600  # seconds
+CLOCK_LEEWAY = 10  # seconds
+
+
+def token_cache_key(token: str) -> str:
+    """Hash a bearer token so raw tokens are never kept as cache keys."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally.
+
+    HS256 tokens are checked against the project's JWT secret and
+    asymmetric tokens against the project's JWKS, which is fetched once
+    and cached, so verification needs no network round trip per request.
+    """
+
+    def __init__(self, supabase_url: Optional[str],
+                 jwt_secret: Optional[str] = None,
+                 audience: str = DEFAULT_AUDIENCE) -> None:
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.issuer = (f"{supabase_url.rstrip('/')}/auth/v1"
+                       if supabase_url else None)
+
+        self.jwks_client: Optional[PyJWKClient] = None
+        if self.issuer:
+            self.jwks_client = PyJWKClient(
+                f"{self.issuer}/.well-known/jwks.json",
+                cache_jwk_set=True,
+                lifespan=JWKS_CACHE_LIFESPAN,
+            )
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.jwt_secret or self.jwks_client)
+
+    def verify(self, token: str) -> Dict:
+        """Verify signature, expiry and claims and return the token claims.
+
+        Raises ``jwt.InvalidAlgorithmError`` if there is no local key for
+        the token's algorithm, and ``jwt.InvalidTokenError`` if the token
+        is not acceptable.
+        """
+        algorithm = jwt.get_unverified_header(token).get("alg")
+
+        if algorithm in HMAC_ALGORITHMS and self.jwt_secret:
+            key = self.jwt_secret
+            algorithms = HMAC_ALGORITHMS
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_client:
+            key = self.jwks_client.get_signing_key_from_jwt(token).key
+            algorithms = ASYMMETRIC_ALGORITHMS
+        else:
+            raise jwt.InvalidAlgorithmError(
+                f"No local key for token algorithm: {algorithm}"
+            )
+
+        return jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=CLOCK_LEEWAY,
+            options={"require": REQUIRED_CLAIMS},
+        )
+
+    @staticmethod
+    def seconds_until_expiry(claims: Dict) -> float:
+        return float(claims["exp"]) - time.time()
+
+
+@lru_cache(maxsize=None)
+def get_token_verifier() -> TokenVerifier:
+    """Return the process-wide verifier so the JWKS cache is shared."""
+    return TokenVerifier(
+        supabase_url=os.getenv("SUPABASE_URL"),
+        jwt_secret=os.getenv("SUPABASE_JWT_SECRET"),
+    )
@@ -1,6 +1,9 @@
-from typing import List, Dict, Any
-from boto3.dynamodb.conditions import Key
+from typing import List, Dict, Any, Optional, Tuple
 from services.aws_clients import AWSClients
+from services.feed_snapshots import feed_snapshots
+from services.post_index import PostIndex
+from services.post_snapshot import post_snapshot, vote_activity
+from services.search_index import SearchIndex
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,11 +14,14 @@ class UtilityService:
     recent posts."""
 
     def __init__(self, aws_clients: AWSClients):
+        self.clients = aws_clients
         self.table = aws_clients.table
+        self.post_index = PostIndex(aws_clients)
+        self.search_index = SearchIndex(aws_clients)
 
     def search_posts(self, query: str, limit: int = 10) -> List[
         Dict[str, Any]]:
-        """Search posts by title or content with validation and limit."""
+        """Search posts by title, content and attachment text."""
         if not isinstance(query, str) or not query.strip():
             raise ValueError("Query must be a non-empty string.")
         if len(query) > 100:
@@ -23,14 +29,7 @@ class UtilityService:
             "characters.")
 
         try:
-            response = self.table.scan(
-                FilterExpression="contains(title, :q) OR contains(content, " \
-                ":q)",
-                ExpressionAttributeValues={":q": query.strip()},
-                Limit=limit
-            )
-            items = response.get("Items", [])
-            return [item for item in items if item.get("SK") == "POST"]
+            return self.search_index.search(query.strip(), limit=limit)
         except Exception as e:
             logger.error(f"Error searching posts: {e}")
             raise
@@ -38,48 +37,34 @@ class UtilityService:
     def get_trending_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get trending posts sorted by vote activity (upvotes + downvotes)."""
         try:
-            posts = []
-            last_evaluated_key = None
-            while True:
-                response = (
-                    self.table.scan(ExclusiveStartKey=last_evaluated_key)
-                    if last_evaluated_key
-                    else self.table.scan()
-                )
-                posts.extend([item for item in response.get("Items", []) 
-                              if item.get("SK") == "POST"])
-                last_evaluated_key = response.get("LastEvaluatedKey")
-                if not last_evaluated_key:
-                    break
-
-            return sorted(
-                posts,
-                key=lambda x: x.get("upvotes", 0) + x.get("downvotes", 0),
-                reverse=True
-            )[:limit]
+            posts, _ = post_snapshot.ranked(self.clients, vote_activity,
+                                            limit)
+            return posts
         except Exception as e:
             logger.error(f"Error fetching trending posts: {e}")
             raise
 
+    async def aget_trending_posts(self, limit: int = 10) -> Tuple[
+        List[Dict[str, Any]], float]:
+        """Trending posts from the background-refreshed feed snapshot, and
+        the snapshot's age in seconds."""
+        page = await feed_snapshots.page(self.clients, "trending")
+        return page.posts[:limit], page.age
+
     def get_recent_posts(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get the most recent posts."""
         try:
-            posts = []
-            last_evaluated_key = None
-            while True:
-                response = (
-                    self.table.scan(ExclusiveStartKey=last_evaluated_key)
-                    if last_evaluated_key
-                    else self.table.scan()
-                )
-                posts.extend([item for item in response.get("Items", []) 
-                              if item.get("SK") == "POST"])
-                last_evaluated_key = response.get("LastEvaluatedKey")
-                if not last_evaluated_key:
-                    break
-
-            return sorted(posts, key=lambda x: x.get("created_at", ""), 
-                          reverse=True)[:limit]
+            posts, _ = self.post_index.list_posts("new", limit=limit)
+            return posts
         except Exception as e:
             logger.error(f"Error fetching recent posts: {e}")
             raise
+
+    async def aget_recent_posts(self, limit: int = 10,
+                                tag: Optional[str] = None) -> Tuple[
+        List[Dict[str, Any]], float]:
+        """Most recent posts, optionally with ``tag``, from the
+        background-refreshed feed snapshot, and the snapshot's age in
+        seconds."""
+        page = await feed_snapshots.page(self.clients, "recent", tag)
+        return page.posts[:limit], page.age
@@ -1,6 +1,7 @@
 import logging
 from typing import Literal
 from botocore.exceptions import ClientError
+from services import event_bus
 from services.aws_clients import AWSClients
 from models.forum_models import get_timestamp, vote_sk, post_pk, comment_sk
 
@@ -25,7 +26,7 @@ class VoteService:
         user_id: str = "Guest",
     ):
         try:
-            self.table.update_item(
+            response = self.table.update_item(
                 Key={"PK": post_pk(post_id), "SK": "METADATA"},
                 UpdateExpression=(
                     "SET #updated_at = :ts ADD #vote_counter :inc"
@@ -38,6 +39,7 @@ class VoteService:
                     ":ts": get_timestamp(),
                     ":inc": 1,
                 },
+                ReturnValues="UPDATED_NEW",
             )
             vote_item = {
                 "PK": post_pk(post_id),
@@ -46,6 +48,7 @@ class VoteService:
                 "created_at": get_timestamp(),
             }
             self.table.put_item(Item=vote_item)
+            self._publish_counts(post_id, response)
             return {"message": f"{vote_type.capitalize()}vote added to post"}
         except ClientError as e:
             logger.error(f"DynamoDB Error (vote_post): {e}")
@@ -54,7 +57,7 @@ class VoteService:
     def remove_post_vote(self, post_id: str, user_id: str,
                          vote_type: Literal["up", "down"]):
         try:
-            self.table.update_item(
+            response = self.table.update_item(
                 Key={"PK": post_pk(post_id), "SK": "METADATA"},
                 UpdateExpression=(
                     "SET #updated_at = :ts ADD #vote_counter :dec"
@@ -67,16 +70,29 @@ class VoteService:
                     ":ts": get_timestamp(),
                     ":dec": -1,
                 },
+                ReturnValues="UPDATED_NEW",
             )
             self.table.delete_item(
                 Key={"PK": post_pk(post_id), "SK": vote_sk(user_id)}
             )
+            self._publish_counts(post_id, response)
             return {"message":
                     f"{vote_type.capitalize()}vote removed from post"}
         except ClientError as e:
             logger.error(f"DynamoDB Error (remove_post_vote): {e}")
             raise
     
+    @staticmethod
+    def _publish_counts(post_id: str, response: dict) -> None:
+        """Send the post's new vote counter to its channel and the feed."""
+        attributes = response.get("Attributes", {})
+        counts = {"post_id": post_id,
+                  **{key: attributes[key] for key in ("upvotes", "downvotes")
+                     if key in attributes}}
+        for channel in (event_bus.post_channel(post_id),
+                        event_bus.FEED_CHANNEL):
+            event_bus.publish(channel, "votes", counts)
+
     def get_post_votes(self, post_id: str):
         try:
             response = self.table.query(